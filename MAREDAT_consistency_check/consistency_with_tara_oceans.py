@@ -25,9 +25,12 @@
 
 import pandas as pd
 import numpy as np
+import sys
+sys.path.insert(0, '../statistics_helper')
+from data_helper import *
 
 # Load data on the total number of reads of each taxon from de Vargas et al.
-data = pd.read_excel('tara_oceans_data.xlsx','de Vargas W6',skiprows=1)
+data = read_excel('tara_oceans_data.xlsx','de Vargas W6',skiprows=1)
 data.head()
 
 
@@ -36,7 +39,7 @@ data.head()
 # In[2]:
 
 #Load data on the total number of reads in each size fraction
-tot_reads = pd.read_excel('tara_oceans_data.xlsx','Total number of reads', skiprows=1)
+tot_reads = read_excel('tara_oceans_data.xlsx','Total number of reads', skiprows=1)
 tot_reads
 
 
@@ -67,7 +70,7 @@ read_data.loc[1]/corrected_total_reads
 # In[4]:
 
 # Load 18S sequecing data of mesozooplankton
-seq_data = pd.read_excel('../animals/arhtropods/marine_arthropods/mesozooplankton_data.xlsx',sheet_name='de Vargas',skiprows=1)
+seq_data = read_excel('../animals/arhtropods/marine_arthropods/mesozooplankton_data.xlsx',sheet_name='de Vargas',skiprows=1)
 
 print('The average fraction of Rhizaria in 18S rDNA sequencing data in surface waters is ' + '{:,.0f}%'.format(seq_data['Rhizaria surface'].mean()*100))
 print('The average fraction of Rhizaria in 18S rDNA sequencing data in the deep chlorophyll maximum is ' + '{:,.0f}%'.format(seq_data['Rhizaria DCM'].mean()*100))
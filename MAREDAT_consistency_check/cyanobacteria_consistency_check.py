@@ -11,9 +11,12 @@
 import pandas as pd
 import numpy as np
 from scipy.stats import gmean
+import sys
+sys.path.insert(0, '../statistics_helper')
+from data_helper import *
 
 # Load data from Buitenhuis et al.
-carbon_content = pd.read_excel('cyanobacteria_data.xlsx',skiprows=1)
+carbon_content = read_excel('cyanobacteria_data.xlsx',skiprows=1)
 
 # Calculate the geometric mean of the carbon content of Prochlorococcus and Synechococcus
 pro_cc = gmean(carbon_content['Prochlorococcus [fg C cell^-1]'].dropna())*1e-15
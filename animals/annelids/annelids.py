@@ -9,9 +9,12 @@
 import pandas as pd
 import numpy as np
 from scipy.stats import gmean
+import sys
+sys.path.insert(0, '../../statistics_helper')
+from data_helper import *
 
 # Load the data taken from Fierer et al.
-data = pd.read_excel('annelid_biomass_data.xlsx','Fierer',skiprows=1)
+data = read_excel('annelid_biomass_data.xlsx','Fierer',skiprows=1)
 data
 
 
@@ -22,7 +25,7 @@ data
 # In[2]:
 
 # Load biome area data
-area = pd.read_excel('annelid_biomass_data.xlsx','Biome area', skiprows=1, index_col='Biome')
+area = read_excel('annelid_biomass_data.xlsx','Biome area', skiprows=1, index_col='Biome')
 
 # For each biome sum the total biomass density of annelids
 total_biomass_density = data.groupby('Biome').sum()
@@ -39,7 +42,7 @@ print('The total biomass of annelids based on Fierer et al. based on median biom
 
 # In[3]:
 
-supp_biome_data = pd.read_excel('annelid_biomass_data.xlsx','Supplementary biomes')
+supp_biome_data = read_excel('annelid_biomass_data.xlsx','Supplementary biomes')
 supp_biome_data
 
 
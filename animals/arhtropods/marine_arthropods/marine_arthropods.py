@@ -34,10 +34,11 @@ from scipy.stats import gmean
 import sys
 sys.path.insert(0, '../../../statistics_helper/')
 from fraction_helper import *
+from data_helper import *
 
 
 # Load 18S sequecing data
-seq_data = pd.read_excel('mesozooplankton_data.xlsx',sheet_name='de Vargas',skiprows=1)
+seq_data = read_excel('mesozooplankton_data.xlsx',sheet_name='de Vargas',skiprows=1)
 
 print('The average fraction of Rhizaria in 18S rDNA sequencing data in surface waters is ' + '{:,.0f}%'.format(seq_data['Rhizaria surface'].mean()*100))
 print('The average fraction of Rhizaria in 18S rDNA sequencing data in the deep chlorophyll maximum is ' + '{:,.0f}%'.format(seq_data['Rhizaria DCM'].mean()*100))
@@ -19,9 +19,11 @@ from scipy.stats import gmean
 import sys
 sys.path.insert(0, '../../../statistics_helper/')
 from CI_helper import *
+from data_helper import *
+from scenario_helper import *
 pd.options.display.float_format = '{:,.1f}'.format
 # Load global stocks data
-gc_data = pd.read_excel('terrestrial_arthropods_data.xlsx','Gist & Crossley',skiprows=1)
+gc_data = read_excel('terrestrial_arthropods_data.xlsx','Gist & Crossley',skiprows=1)
 gc_data.head()
 
 
@@ -29,7 +31,7 @@ gc_data.head()
 
 # In[2]:
 
-bm_data = pd.read_excel('terrestrial_arthropods_data.xlsx','Brockie & Moeed',skiprows=1)
+bm_data = read_excel('terrestrial_arthropods_data.xlsx','Brockie & Moeed',skiprows=1)
 bm_data.head()
 
 
@@ -86,7 +88,7 @@ print('Our best estimate for the biomass density of arthropods in litter is ≈%
 # In[8]:
 
 # Load additional data
-soil_data = pd.read_excel('terrestrial_arthropods_data.xlsx','Soil',index_col='Reference')
+soil_data = read_excel('terrestrial_arthropods_data.xlsx','Soil',index_col='Reference')
 soil_data
 
 
@@ -108,7 +110,7 @@ print('Our best estimate for the biomass density of arthropods in soils is ≈%.
 # In[10]:
 
 # Load the data on the biomass density of canopy arthropods
-canopy_data = pd.read_excel('terrestrial_arthropods_data.xlsx', 'Canopy',index_col='Reference')
+canopy_data = read_excel('terrestrial_arthropods_data.xlsx', 'Canopy',index_col='Reference')
 canopy_data
 
 
@@ -129,7 +131,7 @@ print('Our best estimate for the biomass density of arthropods in canopies is 
 total_denisty = litter_biomass_density+soil_biomass_density+canopy_biomass_density
 
 # Apply the average biomass density across the entire ice-free land surface
-method1_estimate = total_denisty*1.3e14
+method1_estimate = total_denisty*get_constant('land_area')
 
 print('Our best estimate for the biomass of terrestrial arthropods using average biomass densities is ≈%.1f Gt C' %(method1_estimate/1e15))
 
@@ -154,7 +156,7 @@ gc_study
 # In[14]:
 
 # Load additional data sources
-other_carbon_content_data = pd.read_excel('terrestrial_arthropods_data.xlsx', 'Carbon content',index_col='Reference')
+other_carbon_content_data = read_excel('terrestrial_arthropods_data.xlsx', 'Carbon content',index_col='Reference')
 
 other_carbon_content_data
 
@@ -258,13 +260,13 @@ print('Our best projection for the uncertainty associated with the estimate of t
 # In[24]:
 
 # Load termite data
-termite_data = pd.read_excel('terrestrial_arthropods_data.xlsx', 'Sanderson', skiprows=1, index_col=0)
+termite_data = read_excel('terrestrial_arthropods_data.xlsx', 'Sanderson', skiprows=1, index_col=0)
 
 # Multiply biomass density by biome area and sum over biomes
 termite_biomass = (termite_data['Area [m^2]']* termite_data['Biomass density [g wet weight m^-2]']).sum()
 
 # Calculate carbon mass assuming carbon is 15% of wet weight
-termite_biomass *= 0.15
+termite_biomass *= get_constant('wet_weight_carbon_fraction')
 
 print('The estimate of the total biomass of termites based on Sanderson is ≈%.2f Gt C' %(termite_biomass/1e15))
 
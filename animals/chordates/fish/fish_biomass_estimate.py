@@ -25,9 +25,12 @@ from scipy.stats import gmean
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from CI_helper import *
+from random_helper import *
+from data_helper import *
+from scenario_helper import *
 
 # Load scatter data from Irigoien et al.
-scatter = pd.read_excel('irigoien_et_al_data.xlsx', 'Total scatter',skiprows=1)
+scatter = read_excel('irigoien_et_al_data.xlsx', 'Total scatter',skiprows=1)
 
 # convert scater to backscatter
 scatter['Total backscatter [m^2]'] = scatter['Total sA [m^4 nmi^-2]']/(4*np.pi*1852**2)
@@ -63,7 +66,7 @@ print('Our best estimate for the global backscatter of mesapelagic fish is %.0e
 # In[4]:
 
 # Load terget strength data
-ts = pd.read_excel('irigoien_et_al_data.xlsx', 'Target strength')
+ts = read_excel('irigoien_et_al_data.xlsx', 'Target strength')
 
 # Plot the distribution of TS for fish with or without swimbladder
 ts[ts['Swimbladder']=='No']['dB kg^-1'].hist(label='No swimbladder', bins=3)
@@ -89,8 +92,11 @@ TS_bin['dB kg^-1']
 # The conversion equation from global backscatter and terget strength per unit biomass
 biomass_estimator = lambda TS1,TS2,bs,frac: bs/(frac*10**(TS1/10.) + (1.-frac)*10**(TS2/10.))
 
+# Conversion factor from kg wet weight to g C
+kg_to_g_c = 1000*get_constant('wet_weight_carbon_fraction')
+
 # Estimate biomass and convert to g C, assuming fish with or without swimbladder are both 50% of the population
-sonar_biomass = biomass_estimator(*TS_bin['dB kg^-1'],best_backscatter,frac=0.5)*1000*0.15
+sonar_biomass = biomass_estimator(*TS_bin['dB kg^-1'],best_backscatter,frac=0.5)*kg_to_g_c
 print('Our best sonar-based estimate for the biomass of mesopelagic fish is ≈%.1f Gt C' %(sonar_biomass/1e15))
 
 
@@ -181,18 +187,21 @@ ts_bin = ts.groupby('Swimbladder')
 # Calculate sandard error of those values
 ts_bin_CI = ts_bin.apply(CI_groupby)
 ts_CI = []
+rng = get_rng()
 
 # For the target strength of fish with or without swimbladder, sample 1000 times from the distribution
 # of target strengths, and calculate the estimate of the total biomass of fish. Then calcualte the 95%
 # confidence interval of the resulting distribution as a measure of the uncertainty in the biomass 
 # estimate resulting from the uncertainty in the target strength
 
-for x, instance in enumerate(ts_bin_CI):
-    ts_dist = np.random.normal(TS_bin['dB kg^-1'][x],instance,1000)
-    biomass_dist = biomass_estimator(ts_dist,TS_bin['dB kg^-1'][1-x],best_backscatter,frac=0.5)*1000*0.15
-    upper_CI = np.percentile(biomass_dist,97.5)/np.mean(biomass_dist)
-    lower_CI = np.mean(biomass_dist)/np.percentile(biomass_dist,2.5)
-    ts_CI.append(np.mean([upper_CI,lower_CI]))
+# Each row of the samples varies the target strength of one group, and keeps the other group at its mean
+ts_mean = TS_bin['dB kg^-1'].values
+ts_dist = rng.normal(ts_mean[:,np.newaxis],ts_bin_CI.values[:,np.newaxis],(len(ts_mean),1000))
+ts_samples = np.where(np.eye(len(ts_mean),dtype=bool)[:,:,np.newaxis],ts_dist[:,np.newaxis,:],ts_mean[np.newaxis,:,np.newaxis])
+biomass_dist = biomass_estimator(ts_samples[:,0],ts_samples[:,1],best_backscatter,frac=0.5)*kg_to_g_c
+upper_CI = np.percentile(biomass_dist,97.5,axis=1)/np.mean(biomass_dist,axis=1)
+lower_CI = np.mean(biomass_dist,axis=1)/np.percentile(biomass_dist,2.5,axis=1)
+ts_CI = np.mean([upper_CI,lower_CI],axis=0)
 # Take the maximum uncertainty of the with or with out swimbladder as our best projection
 ts_CI = np.max(ts_CI)
 print('Our best projection for the uncertainty associated with the estimate of the target strength per unit biomass is ≈%.1f-fold' %ts_CI)
@@ -207,7 +216,7 @@ print('Our best projection for the uncertainty associated with the estimate of t
 ratio_range = np.linspace(0,1,1000)
 
 # Estiamte the biomass of mesopelagic fish using the sampled fraction
-biomass_ratio_dist = biomass_estimator(*TS_bin['dB kg^-1'],best_backscatter,ratio_range)*1000*0.15/1e15
+biomass_ratio_dist = biomass_estimator(*TS_bin['dB kg^-1'],best_backscatter,ratio_range)*kg_to_g_c/1e15
 
 # Plot the results for all fractions
 plt.plot(ratio_range,biomass_ratio_dist)
@@ -220,8 +229,8 @@ plt.ylabel('Biomass estimate [Gt C]')
 # In[13]:
 
 # Calculate the upper and lower bounds of the influence of the fraction of fish with swimbladder on biomass estimate
-ratio_upper_CI = (biomass_estimator(*TS_bin['dB kg^-1'],best_backscatter,0.975)*1000*0.15)/sonar_biomass
-ratio_lower_CI = sonar_biomass/(biomass_estimator(*TS_bin['dB kg^-1'],best_backscatter,0)*1000*0.15)
+ratio_upper_CI = (biomass_estimator(*TS_bin['dB kg^-1'],best_backscatter,0.975)*kg_to_g_c)/sonar_biomass
+ratio_lower_CI = sonar_biomass/(biomass_estimator(*TS_bin['dB kg^-1'],best_backscatter,0)*kg_to_g_c)
 ratio_CI = np.max([ratio_upper_CI,ratio_lower_CI])
 print('Our best projection for the uncertainty associated with the fraction of fish possessing swimbladder is ≈%.1f-fold' %ratio_CI)
 
@@ -234,6 +243,16 @@ print('Our best projection for the uncertainty associated with the fraction of f
 sonar_CI = CI_prod_prop(np.array([ratio_CI,ts_CI,bs_CI]))
 print('Our best projection for the uncertainty associated with the sonar-based estimate for the biomass of mesopelagic fish is ≈%.1f-fold' %sonar_CI)
 
+# As a check, sample the target strength of both groups, the global backscatter and the fraction of fish with
+# swimbladder jointly, and calculate the biomass estimate for all the samples at once
+sample_size = 1000000
+joint_ts = rng.normal(ts_mean[:,np.newaxis],ts_bin_CI.values[:,np.newaxis],(len(ts_mean),sample_size))
+joint_bs = rng.lognormal(np.log(best_backscatter),np.log(bs_CI)/1.96,sample_size)
+joint_frac = rng.uniform(0,1,sample_size)
+joint_biomass = biomass_estimator(joint_ts[0],joint_ts[1],joint_bs,joint_frac)*kg_to_g_c
+joint_sonar_CI = np.mean([np.percentile(joint_biomass,97.5)/sonar_biomass,sonar_biomass/np.percentile(joint_biomass,2.5)])
+print('Sampling all the parameters of the sonar-based estimate jointly, the uncertainty is ≈%.1f-fold' %joint_sonar_CI)
+
 
 # ### Inter-method uncertainty
 # As a measure of the inter-method uncertainty of our estimate of the biomass of mesopelagic fish, we calculate the 95% confidence interval of the geometric mean of the sonar-based estiamte and the trawling-based estimate.
@@ -12,16 +12,20 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import sys
+sys.path.insert(0, '../../../statistics_helper')
+from data_helper import *
+from scenario_helper import *
 pd.options.display.float_format = '{:,.1e}'.format
 # Load global stocks data
-stocks = pd.read_csv('FAOSTAT_stock_data_mammals.csv')
+stocks = read_csv('FAOSTAT_stock_data_mammals.csv')
 stocks.head()
 
 
 # In[2]:
 
 # Load species body mass data
-body_mass = pd.read_excel('livestock_body_mass.xlsx',skiprows=1,index_col=0) 
+body_mass = read_excel('livestock_body_mass.xlsx',skiprows=1,index_col=0) 
 body_mass.head()
 
 
@@ -45,7 +49,7 @@ stock_pivot
 # In[4]:
 
 # Load data on the number of dairy producing cattle
-dairy = pd.read_csv('FAOSTAT_cattle_dairy_data.csv')
+dairy = read_csv('FAOSTAT_cattle_dairy_data.csv')
 
 # Set the index of the DataFrame to be the region so we can compare with the stocks data
 dairy.set_index('Area',inplace=True)
@@ -110,7 +114,7 @@ wet_biomass
 pd.options.display.float_format = '{:,.3f}'.format
 
 # conversion factor from kg wet weight to Gt C
-kg_to_gt_c = 1000*0.15/1e15
+kg_to_gt_c = 1000*get_constant('wet_weight_carbon_fraction')/1e15
 total_biomass = wet_biomass.sum()*kg_to_gt_c
 total_biomass
 
@@ -5,10 +5,14 @@
 
 import pandas as pd
 import numpy as np
-
-bird = pd.read_csv('FAOSTAT_data_bird.csv')
-egg = pd.read_csv('FAOSTAT_data_eggs.csv')
-body_mass = pd.read_csv('ipcc_animal_weight.csv')
+import sys
+sys.path.insert(0, '../../../../statistics_helper')
+from data_helper import *
+from scenario_helper import *
+
+bird = read_csv('FAOSTAT_data_bird.csv')
+egg = read_csv('FAOSTAT_data_eggs.csv')
+body_mass = read_csv('ipcc_animal_weight.csv')
 body_mass.set_index('IPCC Area',inplace=True)
 egg.set_index('Area',inplace=True)
 bird_pivot = pd.pivot(bird.Area,bird.Item, bird.Value).astype(float)
@@ -37,7 +41,7 @@ bird_pivot_filt.loc['Asia'] -= bird_pivot_filt.loc['Southern Asia']
 # Change name of Southern Asia to Indian Subcontinent
 bird_pivot_filt.rename(index={'Southern Asia': 'Indian Subcontinent'},inplace=True)
 
-bird_biomass = ((body_mass_filt*bird_pivot_filt)*1e3*0.15).sum()/1e15
+bird_biomass = ((body_mass_filt*bird_pivot_filt)*1e3*get_constant('wet_weight_carbon_fraction')).sum()/1e15
 bird_biomass
 
 
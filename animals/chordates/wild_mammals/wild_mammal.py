@@ -9,11 +9,13 @@ from scipy.stats import gmean
 import sys
 sys.path.insert(0,'../../../statistics_helper/')
 from CI_helper import *
+from data_helper import *
+from scenario_helper import *
 smil_estimate = 0.025e15
 shai_meiri_estimate = 5454700007879 
 barnosky_estimate = 10**10.72*1000 #From figure 3
-prehuman_barnosky_biomass = 10**11.165*1000*0.15 #From figure 3
-best_land_mammal_biomass = gmean([smil_estimate,shai_meiri_estimate,barnosky_estimate])*0.15
+prehuman_barnosky_biomass = 10**11.165*1000*get_constant('wet_weight_carbon_fraction') #From figure 3
+best_land_mammal_biomass = gmean([smil_estimate,shai_meiri_estimate,barnosky_estimate])*get_constant('wet_weight_carbon_fraction')
 land_mammal_CI = geo_CI_calc(np.array([smil_estimate,shai_meiri_estimate,barnosky_estimate]))
 
 
@@ -25,13 +27,13 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 get_ipython().magic(u'matplotlib inline')
-comparison_data = pd.read_excel('marine_mammal_data.xlsx',index_col=0)
+comparison_data = read_excel('marine_mammal_data.xlsx',index_col=0)
 plt.scatter(np.log10(comparison_data['Biomass estimate from Christensen']),np.log10(comparison_data['Biomass estimate from IUCN']))
 #comparison_data[['Biomass estimate from Christensen','Biomass estimate from IUCN']].plot()
 #comparison_data.plot.scatter(x='Biomass estimate from Christensen',y='Biomass estimate from IUCN')
-christensen = pd.read_excel('marine_mammal_data.xlsx','Christensen',skiprows=1,index_col=0)
-best_christensen = christensen.loc[2000,'Mean']*0.15
-best_IUCN = comparison_data['Biomass estimate from IUCN'].sum()*1e6*0.15
+christensen = read_excel('marine_mammal_data.xlsx','Christensen',skiprows=1,index_col=0)
+best_christensen = christensen.loc[2000,'Mean']*get_constant('wet_weight_carbon_fraction')
+best_IUCN = comparison_data['Biomass estimate from IUCN'].sum()*1e6*get_constant('wet_weight_carbon_fraction')
 
 comparison_data.corr(method='spearman')
 
@@ -12,9 +12,12 @@
 import pandas as pd
 import numpy as np
 from scipy.stats import gmean
+import sys
+sys.path.insert(0, '../../statistics_helper')
+from data_helper import *
 
 # Load the data taken from Fierer et al.
-data = pd.read_excel('nematode_biomass_data.xlsx','Fierer',skiprows=1,index_col='Biome')
+data = read_excel('nematode_biomass_data.xlsx','Fierer',skiprows=1,index_col='Biome')
 data
 
 
@@ -43,7 +46,7 @@ data.loc['Crops','Median biomass density [g C m^-2]'] = median_biomass_density
 # In[3]:
 
 # Load biome area data
-area = pd.read_excel('nematode_biomass_data.xlsx','Biome area', skiprows=1, index_col='Biome')
+area = read_excel('nematode_biomass_data.xlsx','Biome area', skiprows=1, index_col='Biome')
 
 # Calculate the total biomass of annelids based on average or median biomass densities
 total_biomass_mean = (data['Average biomass density [g C m^-2]']*area['Area [m^2]']).sum()
@@ -18,10 +18,22 @@ import sys
 sys.path.insert(0, '../../../statistics_helper')
 from CI_helper import *
 from fraction_helper import *
+from data_helper import *
+from results_helper import *
 pd.options.display.float_format = '{:,.2f}'.format
 
+# Define functions that calculate the geometric mean of the values, and its 95% confidence interval, for all the groups
+# of a groupby in a single vectorized pass
+def groupby_gmean(groups):
+    keys, mean, mul_CI = grouped_geo_CI_calc(groups.obj.values, groups.ngroup().values)
+    return pd.Series(mean, index=groups.size().index[keys])
+
+def groupby_geo_CI(groups):
+    keys, mean, mul_CI = grouped_geo_CI_calc(groups.obj.values, groups.ngroup().values)
+    return pd.Series(mul_CI, index=groups.size().index[keys])
+
 # Load data
-macro = pd.read_excel('poc_data.xlsx','Macroaggregates')
+macro = read_excel('poc_data.xlsx','Macroaggregates')
 macro.head()
 
 
@@ -54,7 +66,7 @@ print('Our best estimate for the fraction of the toal number of marine bacteria
 # In[4]:
 
 # Load the data on microaggregates
-micro = pd.read_excel('poc_data.xlsx','Microaggregates')
+micro = read_excel('poc_data.xlsx','Microaggregates')
 micro.head()
 
 
@@ -90,7 +102,7 @@ print('Our best estimate for the fraction of the toal number of marine bacteria
 # In[7]:
 
 # Calculate the geometric mean of the relative size of particle attached cells within each study
-rel_size_study = macro.groupby(['Location','Reference'])['Size of cells relative to free-living cells'].apply(gmean)
+rel_size_study = groupby_gmean(macro.groupby(['Location','Reference'])['Size of cells relative to free-living cells'])
 
 # Calculate the geometric mean of the values reported in different studies as our best estimate
 best_rel_size = gmean(rel_size_study.dropna())
@@ -106,7 +118,7 @@ print('Our best estimate for the size of particle-attached cells relative to fre
 # In[8]:
 
 # Calculate the geometric mean of the volume of particle-attached cells reported within each study
-vol_study = macro.groupby('Reference')['Volume of cells [µm^3]'].apply(gmean)
+vol_study = groupby_gmean(macro.groupby('Reference')['Volume of cells [µm^3]'])
 
 
 # We then calculate the geometric mean of volumes reported in different studies. We convert our best estimate to the volume of particle-attached cells to carbon content based on the formula reported in Simon & Azam. We calculate the carbon content of particle-attached cells relative to free-living cells based on our estimate for the carbon content of free-living bacteria and archaea in the ocean of ≈11 fg C (see the relevant section in the Supplementary Information for more details).
@@ -253,7 +265,7 @@ print('Our best projection for the uncertainty associated with our estimate of t
 
 # In[21]:
 
-size_intra_CI = macro.groupby(['Location','Reference'])['Size of cells relative to free-living cells'].apply(geo_CI_calc)
+size_intra_CI = groupby_geo_CI(macro.groupby(['Location','Reference'])['Size of cells relative to free-living cells'])
 
 
 # #### Inter-study
@@ -271,7 +283,7 @@ size_inter_CI = geo_CI_calc(rel_size_study.dropna())
 
 # In[23]:
 
-vol_intra_CI = macro.groupby('Reference')['Volume of cells [µm^3]'].apply(geo_CI_calc)
+vol_intra_CI = groupby_geo_CI(macro.groupby('Reference')['Volume of cells [µm^3]'])
 
 
 # #### Inter-study
@@ -313,14 +325,10 @@ print('Our best projection for the uncertainty associated with our estimate of t
 print('Fraction of the total biomass of marine bacteria and archaea which is particle-attahced: %.1e' % best_estimate)
 print('Uncertainty associated with the fraction of the biomass of marine bacteria and archaea which is particle-attached: %.1f-fold' % mul_CI)
 
-old_results = pd.read_excel('../marine_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[4] = pd.Series({
+update_result('../marine_prok_biomass_estimate.xlsx', 4, {
                 'Parameter': 'Fraction of the total biomass of marine bacteria and archaea which is particle-attached',
                 'Value': best_estimate,
                 'Units': 'Unitless',
                 'Uncertainty': "{0:.1f}".format(mul_CI)
                 })
 
-result.to_excel('../marine_prok_biomass_estimate.xlsx',index=False)
-
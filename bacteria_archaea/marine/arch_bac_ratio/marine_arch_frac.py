@@ -15,14 +15,18 @@ import numpy as np
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from fraction_helper import *
+from depth_profile_helper import *
+from data_helper import *
+from results_helper import *
+from scenario_helper import *
 pd.options.display.float_format = '{:,.1e}'.format
 # Genaral parameters used in the estimate
-ocean_area = 3.6e14
+ocean_area = get_constant('ocean_area')
 liters_in_m3 = 1e3
 ml_in_m3 = 1e6
 
 # Load the dataset
-lloyd = pd.read_excel('marine_arch_frac_data.xlsx','Lloyd')
+lloyd = read_excel('marine_arch_frac_data.xlsx','Lloyd')
 lloyd.head()
 
 
@@ -31,32 +35,16 @@ lloyd.head()
 # In[2]:
 
 # Define the regression equation for the number of bacteria in the top 64 m:
-def bac_surf(depth):
-    result = np.zeros_like(depth)
-    for i,x in enumerate(depth):
-        if x==0 :
-            result[i] = 5.54
-            
-        else:
-            result[i] = np.log10(x)*0.08+5.54
-    return 10**result
+bac_surf = lambda x: power_law(x,0.08,5.54)
 
 # Define the regression equation for the number of bacteria in water deeper than 64 m:
-bac_deep = lambda x: 10**(np.log10(x)*-1.09+7.66)
+bac_deep = lambda x: power_law(x,-1.09,7.66)
 
 # Define the regression equation for the number of archaea in the top 389 m:
-def arch_surf(depth):
-    result = np.zeros_like(depth)
-    for i,x in enumerate(depth):
-        if x==0 :
-            result[i] = 4.1
-            
-        else:
-            result[i] = np.log10(x)*0.1+4.1
-    return 10**result
+arch_surf = lambda x: power_law(x,0.1,4.1)
 
 # Define the regression equation for the number of bacteria in water below 389 m:
-arch_deep = lambda x: 10**(np.log10(x)*-0.8+6.43)
+arch_deep = lambda x: power_law(x,-0.8,6.43)
 
 # Estimate the total number of bacteria and archaea in the epipelagic layer by first estimating the concentration using the 
 # regression equation, multiplying by the volume at each depth, which is 1 m^3 times the surface
@@ -95,8 +83,8 @@ print('The fraction of archaea in the bathypelagic layer based on FISH is %.1f p
 
 # In[3]:
 
-sunagawa = pd.read_excel('marine_arch_frac_data.xlsx','Sunagawa')
-salazar = pd.read_excel('marine_arch_frac_data.xlsx','Salazar')
+sunagawa = read_excel('marine_arch_frac_data.xlsx','Sunagawa')
+salazar = read_excel('marine_arch_frac_data.xlsx','Salazar')
 
 
 # Here are samples from the data in Sunagawa et al.:
@@ -151,8 +139,8 @@ print('The best estimate for the fraction of archaea in the bathypelagic layer i
 # In[9]:
 
 # Load the datasets
-buitenhuis = pd.read_excel('../cell_num/marine_prok_cell_num_data.xlsx','Buitenhuis')
-aristegui = pd.read_excel('../cell_num/marine_prok_cell_num_data.xlsx','Aristegui')
+buitenhuis = read_excel('../cell_num/marine_prok_cell_num_data.xlsx','Buitenhuis')
+aristegui = read_excel('../cell_num/marine_prok_cell_num_data.xlsx','Aristegui')
 
 
 # For Lloyd et al., we already calculated the total number of bacteria and archaea at each layer, so we can estimate what is the relative fraction of cells in each layer
@@ -181,11 +169,8 @@ For Buitenhuis et al., we bin the data along the depth of each sample in 100 m b
 # Define depth range every 100 m from 0 to 4000 meters
 depth_range = np.linspace(0,4000,41)
 
-# Bin data along depth bins
-buitenhuis['Depth_bin'] = pd.cut(buitenhuis['Depth'], depth_range)
-
-# For each bin, calculate the average number of cells per liter
-buitenhuis_bins = buitenhuis.groupby(['Depth_bin']).mean()['Bact/L']
+# Bin data along depth bins, and calculate the average number of cells per liter in each bin
+buitenhuis_bins = pd.Series(bin_means(buitenhuis['Depth'], buitenhuis['Bact/L'], depth_range), index=pd.IntervalIndex.from_breaks(depth_range))
 
 # Multiply each average concentration by the total volume at each bin: 100 meters depth time the surface area of the oceac
 
@@ -314,22 +299,17 @@ print('Fraction of marine bacteria out of the total population of marine bacteri
 print('Uncertainty associated with the fraction of marine archaea: %.1f-fold' % np.max([epi_mul_CI_arch,meso_mul_CI_arch,bathy_mul_CI_arch]))
 print('Uncertainty associated with the fraction of marine bacteria: %.1f-fold' % np.max([epi_mul_CI_bac,meso_mul_CI_bac,bathy_mul_CI_bac]))
 
-old_results = pd.read_excel('../marine_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[2] = pd.Series({
+update_result('../marine_prok_biomass_estimate.xlsx', 2, {
                 'Parameter': 'Fraction of archaea',
                 'Value': "{0:.1f}".format(best_arch_frac),
                 'Units': 'Unitless',
                 'Uncertainty': "{0:.1f}".format(np.max([epi_mul_CI_arch,meso_mul_CI_arch,bathy_mul_CI_arch]))
                 })
 
-result.loc[3] = pd.Series({
+update_result('../marine_prok_biomass_estimate.xlsx', 3, {
                 'Parameter': 'Fraction of bacteria',
                 'Value': "{0:.1f}".format(1.0 - best_arch_frac),
                 'Units': 'Unitless',
                 'Uncertainty': "{0:.1f}".format(np.max([epi_mul_CI_bac,meso_mul_CI_bac,bathy_mul_CI_bac]))
                 })
 
-
-result.to_excel('../marine_prok_biomass_estimate.xlsx',index=False)
-
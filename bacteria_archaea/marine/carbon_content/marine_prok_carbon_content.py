@@ -12,8 +12,10 @@ import numpy as np
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
 pd.options.display.float_format = '{:,.1f}'.format
-summary = pd.read_excel('marine_prok_carbon_content_data.xlsx','Summary')
+summary = read_excel('marine_prok_carbon_content_data.xlsx','Summary')
 summary.head()
 
 
@@ -54,14 +56,10 @@ print('The interstudy uncertainty is ≈%.1f-fold' % mul_CI)
 print('Carbon content of marine bacteria and archaea: %.1f fg C cell^-1' % best_estimate)
 print('Uncertainty associated with the carbon content of marine bacteria and archaea: %.1f-fold' % mul_CI)
 
-old_results = pd.read_excel('../marine_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[1] = pd.Series({
+update_result('../marine_prok_biomass_estimate.xlsx', 1, {
                 'Parameter': 'Carbon content',
                 'Value': "{0:.1f}".format(best_estimate),
                 'Units': 'fg C cell^-1',
                 'Uncertainty': "{0:.1f}".format(mul_CI)
                 })
 
-result.to_excel('../marine_prok_biomass_estimate.xlsx',index=False)
-
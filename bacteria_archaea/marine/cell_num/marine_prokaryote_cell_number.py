@@ -19,8 +19,12 @@ pd.options.display.float_format = '{:,.1e}'.format
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from CI_helper import *
+from depth_profile_helper import *
+from data_helper import *
+from results_helper import *
+from scenario_helper import *
 # Genaral parameters used in the estimate
-ocean_area = 3.6e14
+ocean_area = get_constant('ocean_area')
 liters_in_m3 = 1e3
 ml_in_m3 = 1e6
 
@@ -28,10 +32,10 @@ ml_in_m3 = 1e6
 # In[2]:
 
 # Load the datasets
-buitenhuis = pd.read_excel('marine_prok_cell_num_data.xlsx','Buitenhuis')
-aristegui = pd.read_excel('marine_prok_cell_num_data.xlsx','Aristegui')
+buitenhuis = read_excel('marine_prok_cell_num_data.xlsx','Buitenhuis')
+aristegui = read_excel('marine_prok_cell_num_data.xlsx','Aristegui')
 aristegui[['Cell abundance (cells m-2)','SE']] = aristegui[['Cell abundance (cells m-2)','SE']].astype(float)
-lloyd = pd.read_excel('marine_prok_cell_num_data.xlsx','Lloyd')
+lloyd = read_excel('marine_prok_cell_num_data.xlsx','Lloyd')
 
 
 # Here are samples from the data in Aristegui et al.:
@@ -70,11 +74,8 @@ print('Total number of cells based on Aristegui et al.: %.1e' % aristegui_total)
 # Define depth range every 100 m from 0 to 4000 meters
 depth_range = np.linspace(0,4000,41)
 
-#Bin data along depth bins
-buitenhuis['Depth_bin'] = pd.cut(buitenhuis['Depth'], depth_range)
-
-#For each bin, calculate the average number of cells per liter
-buitenhuis_bins = buitenhuis.groupby(['Depth_bin']).mean()['Bact/L']
+#Bin data along depth bins, and calculate the average number of cells per liter in each bin
+buitenhuis_bins = pd.Series(bin_means(buitenhuis['Depth'], buitenhuis['Bact/L'], depth_range), index=pd.IntervalIndex.from_breaks(depth_range))
 
 #Multiply each average concentration by the total volume at each bin: 100 meters depth time the surface area of the oceac
 
@@ -90,32 +91,16 @@ print('Total number of cells based on Buitenhuis et al.: %.1e' % buitenhuis_tota
 # In[8]:
 
 # Define the regression equation for the number of bacteria in the top 64 m:
-def bac_surf(depth):
-    result = np.zeros_like(depth)
-    for i,x in enumerate(depth):
-        if x==0 :
-            result[i] = 5.54
-            
-        else:
-            result[i] = np.log10(x)*0.08+5.54
-    return 10**result
+bac_surf = lambda x: power_law(x,0.08,5.54)
 
 # Define the regression equation for the number of bacteria in water deeper than 64 m:
-bac_deep = lambda x: 10**(np.log10(x)*-1.09+7.66)
+bac_deep = lambda x: power_law(x,-1.09,7.66)
 
 # Define the regression equation for the number of bacteria in the top 389 m:
-def arch_surf(depth):
-    result = np.zeros_like(depth)
-    for i,x in enumerate(depth):
-        if x==0 :
-            result[i] = 4.1
-            
-        else:
-            result[i] = np.log10(x)*0.1+4.1
-    return 10**result
+arch_surf = lambda x: power_law(x,0.1,4.1)
 
 # Define the regression equation for the number of bacteria in water below 389 m:
-arch_deep = lambda x: 10**(np.log10(x)*-0.8+6.43)
+arch_deep = lambda x: power_law(x,-0.8,6.43)
 
 # Estimate the total number of bacteria in the top 64 m by first estimating the concentration using the 
 # regression equation, multiplying by the volume at each depth, which is 1 m^3 times the surface
@@ -191,14 +176,10 @@ print('The interstudy uncertainty is about %.1f' % mul_CI)
 print('Total number of marine bacteria and archaea: %.1e' % best_estimate)
 print('Uncertainty associated with the total number of marine bacteria and archaea: %.1f-fold' % mul_CI)
 
-old_results = pd.read_excel('../marine_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[0] = pd.Series({
+update_result('../marine_prok_biomass_estimate.xlsx', 0, {
                 'Parameter': 'Total number of marine bacteria and archaea',
                 'Value': int(best_estimate),
                 'Units': 'Cells',
                 'Uncertainty': "{0:.1f}".format(mul_CI)
                 })
 
-result.to_excel('../marine_prok_biomass_estimate.xlsx',index=False)
-
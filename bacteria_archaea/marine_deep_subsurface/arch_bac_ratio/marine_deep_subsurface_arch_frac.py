@@ -15,15 +15,18 @@ import numpy as np
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from fraction_helper import *
+from data_helper import *
+from results_helper import *
+from scenario_helper import *
 
 pd.options.display.float_format = '{:,.1e}'.format
 # Genaral parameters used in the estimate
-ocean_area = 3.6e14
+ocean_area = get_constant('ocean_area')
 liters_in_m3 = 1e3
 ml_in_m3 = 1e6
 
 # Load the dataset
-lloyd = pd.read_excel('marine_deep_subsurface_arch_frac_data.xlsx','Lloyd')
+lloyd = read_excel('marine_deep_subsurface_arch_frac_data.xlsx','Lloyd')
 lloyd.head()
 
 
@@ -131,22 +134,17 @@ print('Fraction of bacteria out of the total population of marine deep subsurfac
 print('Uncertainty associated with the fraction of marine archaea: %.1f-fold' % arc_mul_CI)
 print('Uncertainty associated with the fraction of marine bacteria: %.1f-fold' % bac_mul_CI)
 
-old_results = pd.read_excel('../marine_deep_subsurface_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[2] = pd.Series({
+update_result('../marine_deep_subsurface_prok_biomass_estimate.xlsx', 2, {
                 'Parameter': 'Fraction of archaea',
                 'Value': "{0:.1f}".format(best_estimate),
                 'Units': 'Unitless',
                 'Uncertainty': "{0:.1f}".format(arc_mul_CI)
                 })
 
-result.loc[3] = pd.Series({
+update_result('../marine_deep_subsurface_prok_biomass_estimate.xlsx', 3, {
                 'Parameter': 'Fraction of bacteria',
                 'Value': "{0:.1f}".format(1.0 - best_estimate),
                 'Units': 'Unitless',
                 'Uncertainty': "{0:.1f}".format(bac_mul_CI)
                 })
 
-
-result.to_excel('../marine_deep_subsurface_prok_biomass_estimate.xlsx',index=False)
-
@@ -16,8 +16,10 @@ from scipy.stats import gmean
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
 pd.options.display.float_format = '{:,.2f}'.format
-volumes = pd.read_excel('marine_deep_subsurface_prok_carbon_content_data.xlsx','Volume based')
+volumes = read_excel('marine_deep_subsurface_prok_carbon_content_data.xlsx','Volume based')
 volumes
 
 
@@ -25,7 +27,7 @@ volumes
 
 # In[2]:
 
-braun_volumes = pd.read_excel('marine_deep_subsurface_prok_carbon_content_data.xlsx','Braun', skiprows=1)
+braun_volumes = read_excel('marine_deep_subsurface_prok_carbon_content_data.xlsx','Braun', skiprows=1)
 braun_volumes
 
 
@@ -89,7 +91,7 @@ print('Our best volume-based estimate for the carbon content of bacterial and ar
 
 # In[7]:
 
-aa_based = pd.read_excel('marine_deep_subsurface_prok_carbon_content_data.xlsx', 'Amino acid based', skiprows=1)
+aa_based = read_excel('marine_deep_subsurface_prok_carbon_content_data.xlsx', 'Amino acid based', skiprows=1)
 aa_based
 
 
@@ -171,14 +173,10 @@ mul_CI = np.max([inter_method_CI,aa_intra_CI,carbon_content_vol_CI,carbon_conten
 print('Carbon content of bacterial and archaeal cells in the marine deep subsurface: %.0f fg C' % best_estimate)
 print('Uncertainty associated with the carbon content of bacterial and archaeal cells in the marine deep subsurface: %.1f-fold' % mul_CI)
 
-old_results = pd.read_excel('../marine_deep_subsurface_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[1] = pd.Series({
+update_result('../marine_deep_subsurface_prok_biomass_estimate.xlsx', 1, {
                 'Parameter': 'Carbon content of bacterial and archaeal cells in the marine deep subsurface',
                 'Value': int(best_estimate),
                 'Units': 'fg C cell^-1',
                 'Uncertainty': "{0:.1f}".format(mul_CI)
                 })
 
-result.to_excel('../marine_deep_subsurface_prok_biomass_estimate.xlsx',index=False)
-
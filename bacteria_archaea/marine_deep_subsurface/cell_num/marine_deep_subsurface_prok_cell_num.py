@@ -12,6 +12,8 @@ import sys
 from scipy.stats import gmean
 sys.path.insert(0, '../../../statistics_helper')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
 
 #Kallmeyer et al. estimate ≈2.9×10^29 cells in the marine deep subsurface
 kallmeyer = 2.9e29
@@ -82,14 +84,10 @@ mul_CI = np.max([parkes_mul_CI,kallmeyer_mul_CI,inter_mul_CI])
 print('Total number of bacteria and archaea in the marine deep subsurface: %.1e' % best_estimate)
 print('Uncertainty associated with the total number of bacteria and archaea in the marine deep subsurface: %.1f-fold' % mul_CI)
 
-old_results = pd.read_excel('../marine_deep_subsurface_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[0] = pd.Series({
+update_result('../marine_deep_subsurface_prok_biomass_estimate.xlsx', 0, {
                 'Parameter': 'Total number of bacteria and archaea in the marine deep subsurface',
                 'Value': best_estimate,
                 'Units': 'Cells',
                 'Uncertainty': "{0:.1f}".format(mul_CI)
                 })
 
-result.to_excel('../marine_deep_subsurface_prok_biomass_estimate.xlsx',index=False)
-
@@ -16,10 +16,12 @@ import sys
 sys.path.insert(0, '../../statistics_helper/')
 from fraction_helper import *
 from CI_helper import *
+from data_helper import *
+from results_helper import *
 
 
 # Load FISH data
-FISH_data = pd.read_excel('soil_bac_arch_data.xlsx','FISH')
+FISH_data = read_excel('soil_bac_arch_data.xlsx','FISH')
 FISH_data.head()
 
 
@@ -27,14 +29,26 @@ FISH_data.head()
 
 # In[2]:
 
-FISH_study_mean = FISH_data.groupby(['Habitat','DOI'])['Fraction of archaea'].apply(frac_mean)
+# Define functions that calculate the geometric mean of fractions, and its 95% confidence interval, for all the groups
+# of an index level in a single vectorized pass
+def group_frac_mean(fractions, level):
+    groups = fractions.groupby(level=level)
+    keys, mean = grouped_frac_mean(fractions.values, groups.ngroup().values)
+    return pd.Series(mean, index=groups.size().index[keys])
+
+def group_frac_CI(fractions, level):
+    groups = fractions.groupby(level=level)
+    keys, mean, mul_CI = grouped_frac_CI(fractions.values, groups.ngroup().values)
+    return pd.Series(mul_CI, index=groups.size().index[keys])
+
+FISH_study_mean = group_frac_mean(FISH_data.set_index(['Habitat','DOI'])['Fraction of archaea'], ['Habitat','DOI'])
 
 
 # We then calculate the geometric mean between different studies in the same habitat to generate characteristic values for each habitat:
 
 # In[3]:
 
-FISH_habitat_mean = FISH_study_mean.groupby('Habitat').apply(frac_mean)
+FISH_habitat_mean = group_frac_mean(FISH_study_mean, 'Habitat')
 
 
 # Finally, we calculate the geometric mean between the characteristic values in each habitat as our best estimate of the fraction of archaea out of the total biomass of soil bacteria and archaea based on FISH:
@@ -52,7 +66,7 @@ print('Our best estimate of the fraction of archaea out of the total biomass of
 # In[5]:
 
 # Load CARD-FISH data
-CARDFISH_data = pd.read_excel('soil_bac_arch_data.xlsx','CARD-FISH')
+CARDFISH_data = read_excel('soil_bac_arch_data.xlsx','CARD-FISH')
 CARDFISH_data.head()
 
 
@@ -60,7 +74,7 @@ CARDFISH_data.head()
 
 # In[6]:
 
-CARDFISH_study_mean = CARDFISH_data.groupby('DOI')['Fraction of archaea'].apply(frac_mean)
+CARDFISH_study_mean = group_frac_mean(CARDFISH_data.set_index('DOI')['Fraction of archaea'], 'DOI')
 
 
 # Finally, we calculate the geometric mean between the characteristic values in each study as our best estimate of the fraction of archaea out of the total biomass of soil bacteria and archaea based on CARD-FISH:
@@ -77,11 +91,11 @@ print('Our best estimate of the fraction of archaea out of the total biomass of
 # In[8]:
 
 # 16S sequencing data from Bates et al. corrected for lower operon copy number
-bates_data = pd.read_excel('soil_bac_arch_data.xlsx','bates',skiprows=1)
+bates_data = read_excel('soil_bac_arch_data.xlsx','bates',skiprows=1)
 
 # Calculate the average fraction of archaea out of the total biomass of soil bacteria and archaea
 # Correct for the lower rDNA operon content in archaea
-seq = frac_mean(bates_data.groupby('Biome')['Fraction of archaea'].apply(frac_mean))*2
+seq = frac_mean(group_frac_mean(bates_data.set_index('Biome')['Fraction of archaea'], 'Biome'))*2
 
 
 # ## 16S rDNA qPCR-based estimate
@@ -107,7 +121,7 @@ print('Our best estimate for the fraction of archaea out of the total biomass of
 # In[11]:
 
 # Load fungi biomass estimate
-fungi_biomass_estimate = pd.read_excel('../../fungi/fungi_biomass_estimate.xlsx')
+fungi_biomass_estimate = load_results('../../fungi/fungi_biomass_estimate.xlsx')
 
 # Calculate the total biomass of soil bactria and archaea
 soil_prok_biomass = fungi_biomass_estimate['Value'][0]*(1-fungi_biomass_estimate['Value'][1])
@@ -132,9 +146,9 @@ print('Our best estimate for the total biomass of soil bacteria is ≈%.1f Gt C'
 
 # In[12]:
 
-FISH_intra_arch_CI = FISH_data.groupby(['Habitat','DOI'])['Fraction of archaea'].apply(frac_CI)
+FISH_intra_arch_CI = group_frac_CI(FISH_data.set_index(['Habitat','DOI'])['Fraction of archaea'], ['Habitat','DOI'])
 FISH_data['Fraction of bacteria'] = 1 - FISH_data['Fraction of archaea']
-FISH_intra_bac_CI = FISH_data.groupby(['Habitat','DOI'])['Fraction of bacteria'].apply(frac_CI)
+FISH_intra_bac_CI = group_frac_CI(FISH_data.set_index(['Habitat','DOI'])['Fraction of bacteria'], ['Habitat','DOI'])
 print('Our best projection of the intra-study uncertainty associated with the fraction of archaea out of the total biomass of bacteria and archaea based on FISH is ≈%.1f-fold.' %FISH_intra_arch_CI.max())
 print('Our best projection of the intra-study uncertainty associated with the fraction of bacteria out of the total biomass of bacteria and archaea based on FISH is ≈%.1f-fold.' %FISH_intra_bac_CI.max())
 
@@ -145,8 +159,8 @@ print('Our best projection of the intra-study uncertainty associated with the fr
 # In[13]:
 
 CARDFISH_data['Fraction of bacteria'] = 1 - CARDFISH_data['Fraction of archaea']
-CARDFISH_intra_arch_CI = CARDFISH_data.groupby('DOI')['Fraction of archaea'].apply(frac_CI)
-CARDFISH_intra_bac_CI = CARDFISH_data.groupby('DOI')['Fraction of bacteria'].apply(frac_CI)
+CARDFISH_intra_arch_CI = group_frac_CI(CARDFISH_data.set_index('DOI')['Fraction of archaea'], 'DOI')
+CARDFISH_intra_bac_CI = group_frac_CI(CARDFISH_data.set_index('DOI')['Fraction of bacteria'], 'DOI')
 print('Our best projection of the intra-study uncertainty associated with the fraction of archaea out of the total biomass of bacteria and archaea based on CARD-FISH is ≈%.1f-fold.' %CARDFISH_intra_arch_CI.max())
 print('Our best projection of the intra-study uncertainty associated with the fraction of bacteria out of the total biomass of bacteria and archaea based on CARD-FISH is ≈%.1f-fold.' %CARDFISH_intra_bac_CI.max())
 
@@ -181,8 +195,8 @@ print('Our best projection of the intra-study uncertainty associated with the fr
 
 # In[16]:
 
-FISH_interstudy_arch_CI = FISH_study_mean.groupby('Habitat').apply(frac_CI)
-FISH_interstudy_bac_CI = (1-FISH_study_mean).groupby('Habitat').apply(frac_CI)
+FISH_interstudy_arch_CI = group_frac_CI(FISH_study_mean, 'Habitat')
+FISH_interstudy_bac_CI = group_frac_CI(1-FISH_study_mean, 'Habitat')
 
 print('Our best projection of the inter-study uncertainty associated with the fraction of archaea out of the total biomass of bacteria and archaea based on FISH is ≈%.1f-fold.' %FISH_interstudy_arch_CI.max())
 print('Our best projection of the inter-study uncertainty associated with the fraction of bacteria out of the total biomass of bacteria and archaea based on FISH is ≈%.1f-fold.' %FISH_interstudy_bac_CI.max())
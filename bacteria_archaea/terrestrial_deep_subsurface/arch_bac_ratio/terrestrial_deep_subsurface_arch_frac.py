@@ -15,19 +15,25 @@ import numpy as np
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from fraction_helper import *
+from data_helper import *
+from results_helper import *
 
 pd.options.display.float_format = '{:,.1e}'.format
 
-# Define a function that will calculate the geometric mean of fractions for each bin of a groupby
-def frac_geo_mean_groupby(input):
-    return frac_mean(input['Archaea fraction'])
+# Define a function that will calculate the geometric mean of fractions for each bin of a groupby, for all the bins
+# in a single vectorized pass
+def frac_geo_mean_groupby(groups):
+    keys, mean = grouped_frac_mean(groups.obj['Archaea fraction'].values, groups.ngroup().values)
+    return pd.Series(mean, index=groups.size().index[keys])
 
-# Define a function that will calculate the CI of geometric mean of fractions for each bin of a groupby
-def frac_CI_groupby(input):
-    return frac_CI(input['Archaea fraction'])
+# Define a function that will calculate the CI of geometric mean of fractions for each bin of a groupby, for all the
+# bins in a single vectorized pass
+def frac_CI_groupby(groups):
+    keys, mean, mul_CI = grouped_frac_CI(groups.obj['Archaea fraction'].values, groups.ngroup().values)
+    return pd.Series(mul_CI, index=groups.size().index[keys])
 
 
-seq_data = pd.read_excel('terrestrial_deep_subsurface_arch_frac_data.xlsx','16S rDNA sequencing')
+seq_data = read_excel('terrestrial_deep_subsurface_arch_frac_data.xlsx','16S rDNA sequencing')
 seq_data.head()
 
 
@@ -37,7 +43,7 @@ seq_data.head()
 
 seq_bin = seq_data.groupby('Study')
 
-seq_study_mean = seq_bin.apply(frac_geo_mean_groupby)
+seq_study_mean = frac_geo_mean_groupby(seq_bin)
 seq_study_mean
 
 
@@ -54,7 +60,7 @@ print('The characteristic 16S rDNA sequencing-based fraction of archaea out of t
 
 # In[4]:
 
-qpcr_data = pd.read_excel('terrestrial_deep_subsurface_arch_frac_data.xlsx','qPCR')
+qpcr_data = read_excel('terrestrial_deep_subsurface_arch_frac_data.xlsx','qPCR')
 qpcr_data.head()
 
 
@@ -64,7 +70,7 @@ qpcr_data.head()
 
 qpcr_bin = qpcr_data.groupby('Study')
 
-qpcr_study_mean = qpcr_bin.apply(frac_geo_mean_groupby)
+qpcr_study_mean = frac_geo_mean_groupby(qpcr_bin)
 qpcr_study_mean
 
 
@@ -101,12 +107,12 @@ print('Our best estimate for the fraction of archaea out of the total population
 
 # In[8]:
 
-seq_arc_CI = seq_bin.apply(frac_CI_groupby)
+seq_arc_CI = frac_CI_groupby(seq_bin)
 
 seq_data_bac = seq_data.copy()
 seq_data_bac['Archaea fraction'] = 1.- seq_data_bac['Archaea fraction']
 seq_bin_bac = seq_data_bac.groupby('Study')
-seq_bac_CI = seq_bin_bac.apply(frac_CI_groupby)
+seq_bac_CI = frac_CI_groupby(seq_bin_bac)
 
 
 print('The intra-study uncertainty of the 16S rDNA sequencing-based estimate of the fraction of archaea out of the population of bacteria nad archaea are:')
@@ -120,12 +126,12 @@ print(seq_bac_CI)
 
 # In[9]:
 
-qpcr_arc_CI = qpcr_bin.apply(frac_CI_groupby)
+qpcr_arc_CI = frac_CI_groupby(qpcr_bin)
 
 qpcr_data_bac = qpcr_data.copy()
 qpcr_data_bac['Archaea fraction'] = 1.- qpcr_data_bac['Archaea fraction']
 qpcr_bin_bac = qpcr_data_bac.groupby('Study')
-qpcr_bac_CI = qpcr_bin_bac.apply(frac_CI_groupby)
+qpcr_bac_CI = frac_CI_groupby(qpcr_bin_bac)
 
 
 print('The intra-study uncertainty of the qPCR-based estimate of the fraction of archaea out of the population of bacteria nad archaea are:')
@@ -185,22 +191,17 @@ print('Fraction of bacteria out of the total population of terrestrial deep subs
 print('Uncertainty associated with the fraction of marine archaea: %.1f-fold' % arc_mul_CI)
 print('Uncertainty associated with the fraction of marine bacteria: %.1f-fold' % bac_mul_CI)
 
-old_results = pd.read_excel('../terrestrial_deep_subsurface_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[1] = pd.Series({
+update_result('../terrestrial_deep_subsurface_prok_biomass_estimate.xlsx', 1, {
                 'Parameter': 'Fraction of archaea',
                 'Value': "{0:.2f}".format(best_estimate),
                 'Units': 'Unitless',
                 'Uncertainty': "{0:.1f}".format(arc_mul_CI)
                 })
 
-result.loc[2] = pd.Series({
+update_result('../terrestrial_deep_subsurface_prok_biomass_estimate.xlsx', 2, {
                 'Parameter': 'Fraction of bacteria',
                 'Value': "{0:.2f}".format(1.0 - best_estimate),
                 'Units': 'Unitless',
                 'Uncertainty': "{0:.1f}".format(bac_mul_CI)
                 })
 
-
-result.to_excel('../terrestrial_deep_subsurface_prok_biomass_estimate.xlsx',index=False)
-
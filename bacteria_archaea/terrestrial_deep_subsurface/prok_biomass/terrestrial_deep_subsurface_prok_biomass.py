@@ -16,9 +16,12 @@ from scipy.optimize import curve_fit
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from CI_helper import *
+from fit_helper import *
+from data_helper import *
+from results_helper import *
 
 # Load original data from Figure 1 of McMahon & Parnell
-mp_data = pd.read_csv('terrestrial_deep_subsurface_prok_cell_num.csv',skiprows=1)
+mp_data = read_csv('terrestrial_deep_subsurface_prok_cell_num.csv',skiprows=1)
 
 # Define depth bins every 250 meter 
 bins = np.linspace(0,2000,9)
@@ -51,9 +54,10 @@ bin_mean = bin_mean.reset_index().append(extrapolated_mean,ignore_index=True).se
 def depth_func_log(x, a, b):
     return np.log(a) - b*x
 
-# Fit the geometric means
+# Fit the geometric means. The function is linear in the log of the concentration, so we fit it by linear regression
 xdata = bins[1:-1]-125
-popt2, pcov2 = curve_fit(depth_func_log, xdata, np.log(bin_geo_mean[:-1]))
+slope, intercept = linear_fit(xdata, np.log(bin_geo_mean[:-1]))
+popt2 = np.array([np.exp(intercept), -slope])
 
 # Extrapolate the geometric mean cell concentration based on the fit we calculated
 extrapolated_geo_mean = np.exp(depth_func_log(1875, *popt2))
@@ -77,7 +81,7 @@ bin_geo_mean = tmp.set_index('Depth bin')
 tot_gw_vol = 2.26e22
 
 # Load data from Gleeson et al. on the distribution of groundwater with depth
-gw_depth_dist = pd.read_csv('gleeson_fraction_gw_data.csv', skiprows=1)
+gw_depth_dist = read_csv('gleeson_fraction_gw_data.csv', skiprows=1)
 
 # Generate functions to fit the data an calculate partial integrals
 def func(x,a,b,c):
@@ -274,15 +278,11 @@ mul_CI = 20
 print('Total biomass of terrestrial deep subsurface bacteria and archaea: %.0f Gt C' % (best_estimate/1e15))
 print('Uncertainty associated with the total biomasss of terrestrial deep subsurface bacteria and archaea: %.0f-fold' % mul_CI)
 
-old_results = pd.read_excel('../terrestrial_deep_subsurface_prok_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[0] = pd.Series({
+update_result('../terrestrial_deep_subsurface_prok_biomass_estimate.xlsx', 0, {
                 'Parameter': 'Total biomass of bacteria and archaea in the terrestrial deep subsurface',
                 'Value': int(best_estimate),
                 'Units': 'g C',
                 'Uncertainty': "{0:.1f}".format(mul_CI)
                 })
 
-result.to_excel('../terrestrial_deep_subsurface_prok_biomass_estimate.xlsx',index=False)
-
 
@@ -13,7 +13,9 @@ pd.options.display.float_format = '{:,.1e}'.format
 import sys
 sys.path.insert(0, '../../statistics_helper')
 from CI_helper import *
-results = pd.read_excel('terrestrial_deep_subsurface_prok_biomass_estimate.xlsx')
+from data_helper import *
+from results_helper import *
+results = load_results('terrestrial_deep_subsurface_prok_biomass_estimate.xlsx')
 results
 
 
@@ -11,10 +11,12 @@ import pandas as pd
 import sys
 sys.path.insert(0, '../statistics_helper')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
 
 pd.options.display.float_format = '{:,.1e}'.format
 
-results = pd.read_excel('fungi_biomass_estimate.xlsx')
+results = load_results('fungi_biomass_estimate.xlsx')
 
 
 # These are our best estimates for the different parameters required for the estimate, along with the associated uncertainties
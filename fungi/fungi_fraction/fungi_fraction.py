@@ -13,9 +13,11 @@ import numpy as np
 import sys
 sys.path.insert(0, '../../statistics_helper')
 from fraction_helper import *
+from data_helper import *
+from results_helper import *
 pd.options.display.float_format = '{:,.3f}'.format
 
-data = pd.read_excel('fungi_fraction_data.xlsx')
+data = read_excel('fungi_fraction_data.xlsx')
 data.head()
 
 
@@ -90,14 +92,10 @@ mul_CI = np.max([type_method_CI.values.flatten().max(),intra_method_CI.max(),int
 print('Fraction of fungi out of the total biomass of microbes:' +'{:.1f}%'.format(best_estimate*100))
 print('Uncertainty associated with the estimate of the total biomass of soil microbes ≈%.1f-fold' % mul_CI)
 
-old_results = pd.read_excel('../fungi_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[1] = pd.Series({
+update_result('../fungi_biomass_estimate.xlsx', 1, {
                 'Parameter': 'Fraction of fungi ou out the total biomass of soil microbes',
                 'Value': '{0:.1f}'.format(best_estimate),
                 'Units': 'Unitless',
                 'Uncertainty': "{0:.1f}".format(mul_CI)
                 })
 
-result.to_excel('../fungi_biomass_estimate.xlsx',index=False)
-
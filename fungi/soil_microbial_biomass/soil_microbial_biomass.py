@@ -16,6 +16,9 @@ import sys
 sys.path.insert(0, '../../statistics_helper')
 from CI_helper import *
 from fraction_helper import *
+from random_helper import *
+from data_helper import *
+from results_helper import *
 pd.options.display.float_format = '{:,.1f}'.format
 # Define the values for the estimates of the biomass of soil microbes from Xu et al. and Serna-Chavez et al.
 xu = 23.2e15
@@ -42,7 +45,7 @@ print('Our best estimate for the biomass of soil microbes is ≈%.0f Gt C' % (be
 
 # Load data on the microbial biomass from each biome and the coefficients for the depth distribution of roots
 # in each biome
-data = pd.read_excel('soil_microbial_biomass_data.xlsx',skiprows=1)
+data = read_excel('soil_microbial_biomass_data.xlsx',skiprows=1)
 
 # Calculate the fraction of biomass deeper than 100 centimeters for each biome
 biome_deeper_frac = (data['beta']**100)
@@ -161,7 +164,7 @@ print('The interstudy uncertainty of the fraction of microbial biomass present i
 # Calculate the maximal uncertainty between the intra-study and interstudy uncertainty
 best_deep_frac_CI = np.max([xu_deep_frac_CI,whitman_deep_frac_CI,inter_deep_frac_CI])
 # Sample the fraction of biomass in soil layers deeper than 1 meter from a lognormal distribution 
-deep_frac_dist = np.random.lognormal(np.log(mean_deep_frac),np.log(best_deep_frac_CI**(1./1.96)),1000)
+deep_frac_dist = get_rng().lognormal(np.log(mean_deep_frac),np.log(best_deep_frac_CI**(1./1.96)),1000)
 # Calculate the distribution of coefficients by which the total biomass of soil microbes should be corrected
 cor_coeff_dist = 1 + deep_frac_dist
 
@@ -189,15 +192,11 @@ print('The total uncertainty for the biomass of soil microbes is %.1f-fold' % mu
 print('Total biomass of soil microbes: %.0f Gt C' % (best_estimate/1e15))
 print('Uncertainty associated with the estimate of the total biomass of soil microbes ≈2-fold' % mul_CI)
 
-old_results = pd.read_excel('../fungi_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[0] = pd.Series({
+update_result('../fungi_biomass_estimate.xlsx', 0, {
                 'Parameter': 'Total biomass of soil microbes',
                 'Value': int(best_estimate_corrected),
                 'Units': 'g C',
                 'Uncertainty': "{0:.1f}".format(2)
                 })
 
-result.to_excel('../fungi_biomass_estimate.xlsx',index=False)
-
 
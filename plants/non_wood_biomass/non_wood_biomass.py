@@ -16,9 +16,11 @@ from scipy.stats import gmean
 import sys
 sys.path.insert(0,'../../statistics_helper/')
 from fraction_helper import *
+from data_helper import *
+from scenario_helper import *
 
 # Load data from Poorter et al.
-fractions = pd.read_excel('non_wood_biomass_data.xlsx','Poorter',skiprows=1,index_col=0)
+fractions = read_excel('non_wood_biomass_data.xlsx','Poorter',skiprows=1,index_col=0)
 fractions
 
 
@@ -27,7 +29,7 @@ fractions
 # In[2]:
 
 # Load data on the total plant biomass in each biome from Erb et al.
-biomes = pd.read_excel('non_wood_biomass_data.xlsx','Erb',skiprows=1)
+biomes = read_excel('non_wood_biomass_data.xlsx','Erb',skiprows=1)
 biomes
 
 
@@ -59,7 +61,7 @@ print('Our global average for non-woody mass fraction is ≈%.0f percent' %(mean
 
 
 # Our best estimate for the total biomass
-tot_plant_biomass = 450e15
+tot_plant_biomass = get_constant('plant_biomass')
 
 # Multiply our estimate for the non-woody mass fraction by our estimate
 # of the total plant biomass
@@ -80,7 +82,7 @@ roots_jackson = 146e15
 
 # In[6]:
 
-biome_LAI = pd.read_excel('non_wood_biomass_data.xlsx','Asner',skiprows=1,index_col=0)
+biome_LAI = read_excel('non_wood_biomass_data.xlsx','Asner',skiprows=1,index_col=0)
 biome_LAI
 
 
@@ -89,7 +91,7 @@ biome_LAI
 # In[7]:
 
 # Load biome area data
-biome_area = pd.read_excel('non_wood_biomass_data.xlsx','Biome area',skiprows=1,index_col=0)
+biome_area = read_excel('non_wood_biomass_data.xlsx','Biome area',skiprows=1,index_col=0)
 
 # Calculate the mean LAI for boreal forests
 biome_LAI.loc['Boreal forest'] = gmean(biome_LAI.loc[['Boreal DBL','Boreal ENL']])
@@ -116,7 +118,7 @@ print('Our estimate for the total leaf area is ≈%.1e m^2' % tot_leaf_area)
 # In[8]:
 
 # Load the glopnet data
-glopnet_data = pd.read_excel('non_wood_biomass_data.xlsx','glopnet_data')
+glopnet_data = read_excel('non_wood_biomass_data.xlsx','glopnet_data')
 
 # Calculate the geometric mean of the LMA
 geomean_LMA = 10**glopnet_data.loc[glopnet_data['GF']=='T',['log LMA']].mean()
@@ -12,8 +12,10 @@ from scipy.stats import gmean
 import sys
 sys.path.insert(0,'../statistics_helper/')
 from CI_helper import *
+from data_helper import *
+from scenario_helper import *
 pd.options.display.float_format = '{:,.1e}'.format
-data = pd.read_excel('plant_data.xlsx', skiprows=1)
+data = read_excel('plant_data.xlsx', skiprows=1)
 data['Total biomass estimate [g C]'] = data['Total biomass estimate [g C]'].astype(float)
 data
 
@@ -22,7 +24,7 @@ data
 
 # In[2]:
 
-best_estimate = 450e15
+best_estimate = get_constant('plant_biomass')
 print('Our best estimate for the biomass of plants is ≈%.0f Gt C' %(best_estimate/1e15))
 
 
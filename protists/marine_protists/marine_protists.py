@@ -15,6 +15,9 @@
 
 import pandas as pd
 from scipy.stats import gmean
+import sys
+sys.path.insert(0, '../../statistics_helper')
+from data_helper import *
 # Calculate the geometric mean of the "minimum" and "maximum" estimates from Buitenhuis et al.
 # for picophytoplankton
 picophyto_biomsss = gmean([0.28e15,0.64e15])
@@ -45,7 +48,7 @@ auto_pico_protists_biomass = auto_picoeuk_biomass*auto_pico_protists_fraction
 
 pd.options.display.float_format = '{:,.1f}'.format
 # Load data from de Vargas on the ratio between autotrophic and heterotrophic protists
-pico_nano_data = pd.read_excel('marine_protists_data.xlsx',skiprows=1)
+pico_nano_data = read_excel('marine_protists_data.xlsx',skiprows=1)
 pico_nano_data.head()
 
 
@@ -14,16 +14,18 @@
 # Initialization
 import pandas as pd
 import numpy as np
-import gdal
 from scipy.stats import gmean
 import sys
 sys.path.insert(0,'../../statistics_helper/')
 from fraction_helper import *
 from CI_helper import *
+from raster_helper import *
+from data_helper import *
+from scenario_helper import *
 pd.options.display.float_format = '{:,.1e}'.format
 
 # Load data
-data = pd.read_excel('terrestrial_protist_data.xlsx','Density of Individuals')
+data = read_excel('terrestrial_protist_data.xlsx','Density of Individuals')
 data.head()
 
 
@@ -100,13 +102,11 @@ habitat_gmean
 # In[5]:
 
 # Load soil density map from Hengl et al. (in the top 15 cm, reduced in resolution to 1 degree resolution)
-gtif = gdal.Open('bulk_density_data.tif')
-bulk_density_map = np.array(gtif.GetRasterBand(1).ReadAsArray())
+# The map is read window by window, and cells with the nodata value of the map are ignored
+bulk_density_map = Raster('bulk_density_data.tif')
 
-# Fill missing values with NaN
-bulk_density_map[bulk_density_map == bulk_density_map[0,1]] = np.nan
 # Mean soil bulk density from Hengl et al. [in g per m^3]
-bulk_density = np.nanmean(bulk_density_map[:])*1000
+bulk_density = bulk_density_map.mean()*1000
 print('Our best estimate for the global mean bulk density of soil in the top 15 cm is ≈%.1e g m^3' %bulk_density)
 #of ≈1.3 g $cm^3$
 
@@ -126,7 +126,7 @@ print('The average sampling depth of soil protists is ≈%.0f cm' %sampling_dept
 # In[7]:
 
 # The beta coefficient from Jackson et al.
-jackson_beta = 0.966
+jackson_beta = get_constant('jackson_beta')
 
 # Calculate the fraction of the biomass of soil protists found in the top 8 cm
 jackson_fraction = 1 - jackson_beta** sampling_depth
@@ -168,7 +168,7 @@ habitat_per_m2_mean = (habitat_mean*bulk_density*sampling_depth/100/best_depth_f
 
 # In[11]:
 
-habitat_area = pd.read_excel('terrestrial_protist_data.xlsx','Biome area', skiprows=1,index_col=0)
+habitat_area = read_excel('terrestrial_protist_data.xlsx','Biome area', skiprows=1,index_col=0)
 habitat_area
 
 
@@ -199,7 +199,7 @@ tot_num_protist
 
 # In[14]:
 
-cc_data =  pd.read_excel('terrestrial_protist_data.xlsx', 'Carbon content')
+cc_data =  read_excel('terrestrial_protist_data.xlsx', 'Carbon content')
 cc_data.head()
 
 
@@ -208,7 +208,7 @@ cc_data.head()
 # In[15]:
 
 # Load data from Finlay & Fenchel
-ff_data = pd.read_excel('terrestrial_protist_data.xlsx', 'Finlay & Fenchel', skiprows=1)
+ff_data = read_excel('terrestrial_protist_data.xlsx', 'Finlay & Fenchel', skiprows=1)
 
 # Define the function to calculate the weighted average for each group of protists
 def weighted_av_groupby(input):
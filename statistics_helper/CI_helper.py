@@ -1,6 +1,7 @@
 # This module containts functions relevant for calculating the 95% multiplicative confidence intervals
 
 import numpy as np
+from random_helper import get_rng
 
 def geo_CI_calc(estimates):
     """ 
@@ -12,37 +13,215 @@ def geo_CI_calc(estimates):
     mul_CI = 10**(np.log10(estimates).std(ddof=1)/np.sqrt(len(estimates))*1.96)
     return mul_CI
 
-def CI_sum_prop(estimates, mul_CIs):
+def grouped_geo_CI_calc(estimates, groups, skipna=False):
+    """
+    This function calculates the geometric mean and the 95% multiplicative confidence interval of the geometric mean
+    of the values in each group of the input, equivalent to applying gmean and geo_CI_calc to every group of a
+    groupby, but in a single vectorized pass over the data
+    
+    Input:
+        estimates: numpy array of values
+        groups: numpy array with the group code of each value (e.g. the output of pd.factorize or groupby.ngroup())
+        skipna: whether to ignore NaN values. If False, a group containing NaN values has a NaN mean and CI, like
+                gmean and geo_CI_calc
+    Output: a tuple of three numpy arrays - the sorted unique group codes, the geometric mean of each group and the
+            95% multiplicative confidence interval of the geometric mean of each group
+    """
+    estimates = np.asarray(estimates, dtype=float)
+    keys, codes = np.unique(np.asarray(groups), return_inverse=True)
+    codes = codes.ravel()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_estimates = np.log10(estimates)
+        if skipna:
+            valid = ~np.isnan(log_estimates)
+            log_estimates, codes = log_estimates[valid], codes[valid]
+
+        # Calculate the mean and the variance of the log of the values in each group
+        n = np.bincount(codes, minlength=len(keys))
+        log_mean = np.bincount(codes, weights=log_estimates, minlength=len(keys))/n
+        log_var = np.bincount(codes, weights=(log_estimates - log_mean[codes])**2, minlength=len(keys))/(n - 1)
+
+        mul_CIs = 10**(np.sqrt(log_var)/np.sqrt(n)*1.96)
+    return keys, 10**log_mean, mul_CIs
+
+def CI_sum_prop(estimates, mul_CIs, sample_size=100000, chunk_size=None, rng=None):
     """
     This function calculates the 95% confidence interval of a sum of two estimates. 
     We assume these estimates are distributed lognormally with 95% confidence interval provided as input
     Input:
         estimates: numpy array of the estimates to sum over
         mul_CIs: numpy array containing the 95% confidence interval for each estimate in the argument estimates
+        sample_size: the number of samples drawn from the distribution of the sum
+        chunk_size: optional number of samples to draw at a time. If provided, the distribution of the sum is
+                    streamed in chunks into a QuantileSketch, so memory use depends only on chunk_size and not
+                    on sample_size
+        rng: optional numpy Generator or seed. If not provided, a new stream is taken from random_helper.get_rng
     Output: 95% multiplivative condifence inverval of the sum of the estimates
     """
-    sample_size = 100000
-    data = np.zeros([0,sample_size])
-    
-    # Iterate over the estimates 
-    for ind, estimate in enumerate(estimates):
-        # For each estimate, sample 1000 samples from a lognormal distribution with a mean of log(estimate) and std of log(95_CI)/1.96
-        # This generates an array with N rows and 1000 columns, where N is the number of estimates in the argument estimates
-        sample = np.random.lognormal(mean = np.log(estimate), sigma = np.log(mul_CIs[ind])/1.96,size=sample_size).reshape([1,-1])
-        data = np.vstack((data,sample))
+    # For each estimate, the lognormal distribution has a mean of log(estimate) and std of log(95_CI)/1.96
+    estimates = np.asarray(estimates, dtype=float)
+    mul_CIs = np.asarray(mul_CIs, dtype=float)
+    if mul_CIs.shape != estimates.shape:
+        raise ValueError('Got %d estimates but %d confidence intervals' % (estimates.size, mul_CIs.size))
+    means = np.log(estimates)
+    sigmas = np.log(mul_CIs)/1.96
+    rng = get_rng(rng)
 
-    # Sum over the N estimates to generate a distribution of sums
-    data_sum = data.sum(axis=0)    
+    if chunk_size is None or chunk_size >= sample_size:
+        # Generate the distribution of sums in a single preallocated array
+        data_sum = _lognormal_sum(means, sigmas, sample_size, rng)
+        mean = np.mean(data_sum)
+        upper = np.percentile(data_sum, 97.5)
+        lower = np.percentile(data_sum, 2.5)
+    else:
+        # Stream the distribution of sums chunk by chunk into a sketch of its quantiles
+        sketch = QuantileSketch()
+        for start in range(0, sample_size, chunk_size):
+            sketch.update(_lognormal_sum(means, sigmas, min(chunk_size, sample_size - start), rng))
+        mean = sketch.mean()
+        upper = sketch.percentile(97.5)
+        lower = sketch.percentile(2.5)
 
     # Calculate the multiplicative value of the 97.5 percentile relative to the mean of the distribution
-    upper_CI = np.percentile(data_sum, 97.5)/np.mean(data_sum)
+    upper_CI = upper/mean
 
     # Calculate the multiplicative value of the mean of the distribution relative to the 2.5 percentile
-    lower_CI = np.mean(data_sum)/np.percentile(data_sum, 2.5)
+    lower_CI = mean/lower
 
     # Return the mean of the upper and lower multiplicative values
     return np.mean([upper_CI,lower_CI])
 
+def _lognormal_sum(means, sigmas, size, rng):
+    """
+    Sample the sum of several lognormal distributions without holding the samples of each distribution in memory
+    Input:
+        means: the means of the log of each distribution
+        sigmas: the standard deviations of the log of each distribution
+        size: the number of samples to draw
+        rng: numpy Generator used to draw the samples
+    Output: numpy array of size samples of the sum of the distributions
+    """
+    data_sum = np.zeros(size)
+    # The samples of each distribution are drawn into the same preallocated array
+    sample = np.empty(size)
+    for mean, sigma in zip(means, sigmas):
+        rng.standard_normal(out=sample)
+        sample *= sigma
+        sample += mean
+        np.exp(sample, out=sample)
+        data_sum += sample
+    return data_sum
+
+class QuantileSketch(object):
+    """
+    A fixed-memory summary of a stream of samples, from which we calculate the mean and percentiles of the samples.
+    Samples are counted in a histogram with a fixed number of equally spaced bins (in log space by default). The
+    range of the histogram is set by the first batch of samples, padded on each side. Samples outside the range are
+    counted in the edge bins, so percentiles are accurate as long as they fall inside the range.
+    Two sketches with the same range can be merged, which allows sketching samples generated in separate processes.
+    """
+
+    def __init__(self, bins=2**16, log=True, pad=2., value_range=None):
+        """
+        Input:
+            bins: the number of bins in the histogram
+            log: whether to bin the samples in log10 space (samples must be positive) or in linear space
+            pad: the padding added to each side of the range of the first batch of samples. In log space the padding
+                 is in orders of magnitude, in linear space it is relative to the span of the first batch
+            value_range: optional (low, high) range of the histogram in the space of the samples
+        """
+        self.bins = bins
+        self.log = log
+        self.pad = pad
+        self.counts = np.zeros(bins)
+        self.total = 0.
+        self.weighted_sum = 0.
+        # The total weight of the samples which were ignored because they were not positive in log space
+        self.nonpositive = 0.
+        self.low = None
+        self.width = None
+        if value_range is not None:
+            self.set_range(*value_range)
+
+    def _transform(self, values):
+        return np.log10(values) if self.log else values
+
+    def set_range(self, low, high):
+        """
+        Set the range covered by the histogram
+        Input: low, high: the edges of the range in the space of the samples
+        """
+        low, high = self._transform(np.array([low, high], dtype=float))
+        if high <= low:
+            high = low + 1.
+        self.low = low
+        self.width = (high - low)/self.bins
+
+    def update(self, values, weights=None):
+        """
+        Add a batch of samples to the sketch. Samples which are not finite (or not positive in log space) are ignored.
+        The weight of the samples which are not positive in log space is kept in nonpositive, so that callers can tell
+        that the sketch does not represent all the samples
+        Input:
+            values: numpy array of samples
+            weights: optional numpy array of weights for each sample
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=float).ravel()
+        if self.log:
+            self.nonpositive += weights[values <= 0].sum()
+        x = self._transform(np.where(values > 0, values, np.nan)) if self.log else values
+        valid = np.isfinite(x)
+        x, values, weights = x[valid], values[valid], weights[valid]
+        if x.size == 0:
+            return
+
+        if self.low is None:
+            low, high = x.min(), x.max()
+            pad = self.pad if self.log else self.pad*max(high - low, abs(high), 1e-300)
+            self.low = low - pad
+            self.width = (high - low + 2*pad)/self.bins
+
+        ind = np.clip(((x - self.low)/self.width).astype(np.int64), 0, self.bins - 1)
+        self.counts += np.bincount(ind, weights=weights, minlength=self.bins)
+        self.total += weights.sum()
+        self.weighted_sum += np.dot(values, weights)
+
+    def merge(self, other):
+        """
+        Add the samples summarized by another sketch with the same bins and range to this sketch
+        """
+        self.nonpositive += other.nonpositive
+        if other.total == 0:
+            return
+        if self.low is None:
+            self.low, self.width = other.low, other.width
+        if self.bins != other.bins or self.log != other.log or not np.isclose(self.low, other.low) or not np.isclose(self.width, other.width):
+            raise ValueError('Only sketches with the same bins and range can be merged')
+        self.counts += other.counts
+        self.total += other.total
+        self.weighted_sum += other.weighted_sum
+
+    def mean(self):
+        """
+        Output: the (weighted) mean of the samples
+        """
+        return self.weighted_sum/self.total
+
+    def percentile(self, q):
+        """
+        Input: q: percentile or numpy array of percentiles, between 0 and 100
+        Output: the percentiles of the samples, interpolated linearly inside each bin
+        """
+        cum_counts = np.cumsum(self.counts)
+        target = np.asarray(q, dtype=float)/100.*self.total
+        ind = np.minimum(np.searchsorted(cum_counts, np.maximum(target, 1e-300)), self.bins - 1)
+        prev = cum_counts[ind] - self.counts[ind]
+        within = (target - prev)/np.maximum(self.counts[ind], 1e-300)
+        x = self.low + (ind + within)*self.width
+        return 10**x if self.log else x
+
 def CI_prod_prop(mul_CIs):
     """
     This function calculates the 95% multiplicative confidence interval of a product of numbers
@@ -0,0 +1,109 @@
+# This module contains functions for estimating the uncertainty of study-level means by a hierarchical bootstrap.
+# geo_CI_calc and frac_CI assume the log of the study means is normally distributed, which is a rough approximation
+# when there are only a few studies. Instead, we resample the studies, and the measurements within each resampled
+# study, and recalculate the chain of means for each replicate. All the replicates of a chunk are calculated at once
+# from a matrix of resampled indices.
+import numpy as np
+import pandas as pd
+from random_helper import spawn_rngs
+from parallel_helper import parallel_map, shared_array
+from fraction_helper import _logit, expit
+
+# The transformations of the values in which means are calculated, and their inverses. The geometric mean is the
+# mean of the log of the values, and the mean of fractions (as in frac_mean) is the mean of log(f/(1-f))
+TRANSFORMS = {
+    'gmean': (np.log, np.exp),
+    'frac_mean': (_logit, expit),
+}
+
+def _resample_stratum(rng, replicates, offsets, counts, resample_measurements):
+    """
+    This function calculates the mean of the resampled study means of one stratum for a chunk of replicates
+    Input:
+        rng: numpy Generator
+        replicates: the number of replicates
+        offsets: the index of the first measurement of each study in the shared array of transformed values
+        counts: the number of measurements of each study
+        resample_measurements: whether to resample the measurements within each study, or only the studies
+    Output: numpy array of the mean of each replicate, in transformed space
+    """
+    values = shared_array('values')
+    studies = len(counts)
+    # Resample the studies: each row holds the studies drawn for one replicate
+    drawn = rng.integers(0, studies, (replicates, studies))
+    drawn_counts = counts[drawn]
+    if resample_measurements:
+        # Resample the measurements of each drawn study. Studies have different numbers of measurements, so we draw
+        # as many as in the largest study and mask the extra draws
+        positions = np.arange(counts.max())
+        picks = (rng.random((replicates, studies, len(positions)))*drawn_counts[..., np.newaxis]).astype(np.int64)
+        mask = positions < drawn_counts[..., np.newaxis]
+        sampled = values[np.where(mask, offsets[drawn][..., np.newaxis] + picks, 0)]
+        study_means = np.where(mask, sampled, 0.).sum(axis=2)/drawn_counts
+    else:
+        study_means = shared_array('study_means')[offsets[drawn]]
+    return study_means.mean(axis=1)
+
+def _bootstrap_chunk(args):
+    rng, replicates, strata, resample_measurements = args
+    # The estimate is the mean of the means of the strata
+    return np.mean([_resample_stratum(rng, replicates, offsets, counts, resample_measurements)
+                    for offsets, counts in strata], axis=0)
+
+def hierarchical_bootstrap(values, studies, strata=None, statistic='gmean', replicates=10000, chunk_size=1000,
+                           resample_measurements=True, jobs=1, rng=None):
+    """
+    This function calculates bootstrap replicates of a mean of study means. In each replicate, the studies are
+    resampled with replacement, and the measurements of each resampled study are resampled with replacement. The mean
+    of each study is then calculated from its resampled measurements, and the estimate is the mean of the study means.
+    If the studies are divided to strata (e.g. habitats), studies are resampled within each stratum, and the estimate
+    is the mean of the means of the strata, as in
+        frac_mean(data.groupby(['Habitat','DOI'])['Fraction'].apply(frac_mean).groupby('Habitat').apply(frac_mean))
+    Input:
+        values: array of the measurements
+        studies: array of the study of each measurement
+        strata: optional array of the stratum of each measurement
+        statistic: 'gmean' for geometric means, or 'frac_mean' for means of fractions as in fraction_helper
+        replicates: the number of bootstrap replicates
+        chunk_size: the number of replicates calculated at a time, which bounds the memory use
+        resample_measurements: whether to resample the measurements within each study, or only the studies
+        jobs: the number of processes to calculate chunks of replicates in
+        rng: optional numpy Generator or seed. If not provided, a new stream is taken from random_helper
+    Output: numpy array of the estimate in each replicate
+    """
+    transform, inverse = TRANSFORMS[statistic]
+    data = pd.DataFrame({'value': transform(np.asarray(values, dtype=float)),
+                         'study': np.asarray(studies),
+                         'stratum': 0 if strata is None else np.asarray(strata)}).dropna()
+    # Sort the measurements so that the measurements of each study are contiguous
+    data = data.sort_values(['stratum', 'study'], kind='mergesort').reset_index(drop=True)
+    keys = data[['stratum', 'study']]
+    offsets = np.flatnonzero((keys != keys.shift()).any(axis=1).values)
+    counts = np.diff(np.append(offsets, len(data)))
+    stratum_of_study = data['stratum'].values[offsets]
+    strata_arrays = [(offsets[stratum_of_study == stratum], counts[stratum_of_study == stratum])
+                     for stratum in pd.unique(stratum_of_study)]
+
+    # Study means are indexed by the offset of the first measurement of each study
+    study_means = np.zeros(len(data))
+    study_means[offsets] = np.add.reduceat(data['value'].values, offsets)/counts
+
+    sizes = [min(chunk_size, replicates - start) for start in range(0, replicates, chunk_size)]
+    rngs = spawn_rngs(len(sizes), rng)
+    chunks = [(chunk_rng, size, strata_arrays, resample_measurements) for chunk_rng, size in zip(rngs, sizes)]
+    results = parallel_map(_bootstrap_chunk, chunks, shared={'values': data['value'].values, 'study_means': study_means},
+                           jobs=jobs)
+    return inverse(np.concatenate(results))
+
+def bootstrap_CI(replicates, estimate):
+    """
+    This function calculates the 95% multiplicative confidence interval of an estimate from its bootstrap replicates,
+    in the same way as the other confidence intervals in the estimates
+    Input:
+        replicates: numpy array of the bootstrap replicates of the estimate
+        estimate: the estimate
+    Output: the mean of the multiplicative values of the 97.5 percentile relative to the estimate, and of the estimate
+            relative to the 2.5 percentile
+    """
+    lower, upper = np.percentile(replicates, [2.5, 97.5])
+    return np.mean([upper/estimate, estimate/lower])
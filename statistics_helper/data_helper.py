@@ -0,0 +1,137 @@
+# This module contains functions for loading the data files of the repository through a cache of their sheets.
+# Reading Excel workbooks is the slowest part of most of the estimates. The first time a sheet is read, we save it
+# in a columnar file (Feather if pyarrow is installed, otherwise a pickle) in a .data_cache directory next to the
+# workbook. Later reads load the cached file (memory-mapped for Feather) instead of parsing the workbook, and reads
+# within the same process are served from memory. Cached sheets are keyed by a hash of the content of the workbook
+# (and the arguments used to parse the sheet), so a cached sheet is never used after the workbook changes, and the
+# cache directories can be versioned along with the workbooks.
+import os
+import re
+import glob
+import hashlib
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+__all__ = ['read_excel', 'read_csv']
+
+# The name of the directory in which the cached sheets of each data file are saved
+CACHE_DIR = '.data_cache'
+
+# Sheets which were already loaded in this process
+_memory = {}
+
+# Hashes of the content of data files, keyed by their path, modification time and size
+_hashes = {}
+
+def _content_hash(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _hashes:
+        with open(path, 'rb') as f:
+            _hashes[key] = hashlib.sha256(f.read()).hexdigest()
+    return _hashes[key]
+
+def _cache_path(path, sheet, kwargs):
+    """
+    This function returns the path of the cached copy of a sheet
+    Input:
+        path: the path of the data file
+        sheet: the name or number of the sheet (None for csv files)
+        kwargs: the arguments used to parse the sheet
+    Output: the path of the cached file, and the prefix shared by all the cached copies of the sheet
+    """
+    args_digest = hashlib.sha256(repr(sorted(kwargs.items())).encode('utf-8')).hexdigest()[:8]
+    prefix = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR,
+                          '%s.%s.%s.' % (os.path.basename(path), re.sub(r'[^\w\-]', '_', str(sheet)), args_digest))
+    return prefix + _content_hash(path)[:16] + ('.feather' if feather is not None else '.pkl'), prefix
+
+def _save(data, cache_path, prefix):
+    """
+    This function saves a sheet to the cache, replacing the cached copies of other versions of the data file
+    """
+    # Cached copies of the current version (Feather or pickle) may have just been written by another process
+    current = cache_path.rsplit('.', 1)[0] + '.'
+    for old in glob.glob(glob.escape(prefix) + '*'):
+        if not old.endswith('.tmp') and not old.startswith(current):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Write to a temporary file and rename it, so that other processes never read a partially written file
+    tmp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+    try:
+        if cache_path.endswith('.feather'):
+            feather.write_feather(data, tmp_path)
+        else:
+            data.to_pickle(tmp_path)
+    except Exception:
+        # Some sheets (e.g. columns with mixed types) cannot be stored as Feather, so we pickle them instead
+        cache_path = cache_path.rsplit('.', 1)[0] + '.pkl'
+        data.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+
+def _read_cached(cache_path):
+    """
+    This function reads the cached copy of a sheet
+    Input: cache_path: the path of the cached file, as returned by _cache_path
+    Output: pandas DataFrame, or None if the sheet is not in the cache
+    """
+    pkl_path = cache_path.rsplit('.', 1)[0] + '.pkl'
+    try:
+        if os.path.exists(cache_path) and cache_path.endswith('.feather'):
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+        if os.path.exists(pkl_path):
+            return pd.read_pickle(pkl_path)
+    except FileNotFoundError:
+        # Another process removed the cached file after we found it
+        pass
+    return None
+
+def _load(path, sheet, reader, kwargs):
+    """
+    This function loads a sheet from memory, from its cached copy or from the data file, in this order
+    Input:
+        path: the path of the data file
+        sheet: the name or number of the sheet (None for csv files)
+        reader: the function which parses the data file
+        kwargs: the arguments used to parse the sheet
+    Output: pandas DataFrame
+    """
+    cache_path, prefix = _cache_path(path, sheet, kwargs)
+    if cache_path not in _memory:
+        data = _read_cached(cache_path)
+        if data is None:
+            data = reader()
+            _save(data, cache_path, prefix)
+        _memory[cache_path] = data
+    # Return a copy, as scripts modify the data they load
+    return _memory[cache_path].copy()
+
+def read_excel(io, sheet_name=0, **kwargs):
+    """
+    This function reads a sheet of an Excel file, like pd.read_excel, through the cache of sheets
+    Input:
+        io: the path of the Excel file
+        sheet_name: the name or number of the sheet, or a list of them, or None for all the sheets
+        kwargs: other arguments passed to pd.read_excel
+    Output: pandas DataFrame, or a dictionary of DataFrames if sheet_name is a list or None
+    """
+    if sheet_name is None or isinstance(sheet_name, list):
+        sheets = pd.ExcelFile(io).sheet_names if sheet_name is None else sheet_name
+        return {sheet: read_excel(io, sheet, **kwargs) for sheet in sheets}
+    return _load(io, sheet_name, lambda: pd.read_excel(io, sheet_name, **kwargs), kwargs)
+
+def read_csv(filepath, **kwargs):
+    """
+    This function reads a csv file, like pd.read_csv, through the cache of sheets
+    Input:
+        filepath: the path of the csv file
+        kwargs: other arguments passed to pd.read_csv
+    Output: pandas DataFrame
+    """
+    return _load(filepath, None, lambda: pd.read_csv(filepath, **kwargs), kwargs)
@@ -0,0 +1,163 @@
+# This module contains functions for depth profiles of concentrations which follow a power law of depth,
+# log10(c) = a*log10(z)+b, as in the regression equations of Lloyd et al. for marine bacteria and archaea.
+# A piecewise profile uses different coefficients above and below break depths. All the functions broadcast over
+# the coefficients, so many draws of the coefficients can be evaluated or integrated at once.
+import numpy as np
+
+def power_law(depth, a, b):
+    """
+    This function evaluates the concentration 10**(a*log10(z)+b) at several depths.
+    At a depth of 0 the concentration is 10**b, as in the regression equations of Lloyd et al.
+    Input:
+        depth: array of depths
+        a: the slope of the regression (a number, or an array which broadcasts against depth)
+        b: the intercept of the regression (a number, or an array which broadcasts against depth)
+    Output: array of concentrations
+    """
+    depth = np.asarray(depth, dtype=float)
+    log_depth = np.log10(np.where(depth > 0, depth, 1.))
+    return 10**(log_depth*a+b)
+
+def _segment_coefficients(depth, breaks, slopes, intercepts):
+    """
+    This function returns the slope and intercept of the segment of a piecewise profile each depth falls in.
+    Segment i contains the depths up to and including breaks[i], and the last segment contains all the deeper depths.
+    The coefficients may have leading dimensions (e.g. one row for each draw of the coefficients)
+    """
+    segment = np.searchsorted(np.asarray(breaks, dtype=float), depth, side='left')
+    return np.asarray(slopes, dtype=float)[..., segment], np.asarray(intercepts, dtype=float)[..., segment]
+
+def piecewise_power_law(depth, breaks, slopes, intercepts):
+    """
+    This function evaluates a piecewise power law profile at several depths
+    Input:
+        depth: 1D array of depths
+        breaks: the depths separating the segments of the profile (e.g. [64] for bacteria in Lloyd et al.)
+        slopes: the slopes of the segments, one more than the number of breaks. Can have leading dimensions, e.g.
+                an array of shape (n, segments) for n draws of the coefficients
+        intercepts: the intercepts of the segments, with the same shape as slopes
+    Output: array of concentrations, of shape slopes.shape[:-1] + depth.shape
+    """
+    depth = np.asarray(depth, dtype=float)
+    a, b = _segment_coefficients(depth, breaks, slopes, intercepts)
+    return power_law(depth, a, b)
+
+def integrate_power_law(top, bottom, a, b):
+    """
+    This function integrates the concentration 10**(a*log10(z)+b) = 10**b * z**a over layers of the water column,
+    using the closed form 10**b * (bottom**(a+1) - top**(a+1))/(a+1), or 10**b * ln(bottom/top) for a == -1
+    Input:
+        top: the depth of the top of each layer
+        bottom: the depth of the bottom of each layer
+        a: the slope of the regression
+        b: the intercept of the regression
+        All inputs broadcast against each other
+    Output: array of the integrated concentration in each layer (concentration times depth units)
+    """
+    top, bottom, a, b = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (top, bottom, a, b)))
+    exponent = a+1.
+    # Avoid dividing by 0 for a == -1, which is handled separately
+    safe_exponent = np.where(exponent == 0, 1., exponent)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        power = (bottom**safe_exponent - top**safe_exponent)/safe_exponent
+        log = np.log(bottom/top)
+    return 10**b * np.where(exponent == 0, log, power)
+
+def integrate_piecewise_power_law(top, bottom, breaks, slopes, intercepts):
+    """
+    This function integrates a piecewise power law profile over layers of the water column, by integrating each
+    segment over the part of the layer it covers
+    Input:
+        top: the depth of the top of each layer
+        bottom: the depth of the bottom of each layer
+        breaks: the depths separating the segments of the profile
+        slopes: the slopes of the segments, one more than the number of breaks. Can have leading dimensions, e.g.
+                an array of shape (n, segments) for n draws of the coefficients
+        intercepts: the intercepts of the segments, with the same shape as slopes
+    Output: array of the integrated concentration in each layer, of shape slopes.shape[:-1] + top.shape
+    """
+    top = np.asarray(top, dtype=float)
+    bottom = np.asarray(bottom, dtype=float)
+    slopes = np.asarray(slopes, dtype=float)
+    intercepts = np.asarray(intercepts, dtype=float)
+    edges = np.concatenate([[0.], np.asarray(breaks, dtype=float), [np.inf]])
+    layers_shape = np.broadcast(top, bottom).shape
+    # Shape of the coefficients of a single segment, so that they broadcast against the layers
+    coefficients_shape = slopes.shape[:-1] + (1,)*len(layers_shape)
+    total = np.zeros(slopes.shape[:-1] + layers_shape)
+    for i in range(len(edges)-1):
+        # The part of each layer within the segment, empty layers contribute nothing
+        segment_top = np.clip(top, edges[i], edges[i+1])
+        segment_bottom = np.clip(bottom, edges[i], edges[i+1])
+        covered = segment_bottom > segment_top
+        a = slopes[..., i].reshape(coefficients_shape)
+        b = intercepts[..., i].reshape(coefficients_shape)
+        integral = integrate_power_law(np.where(covered, segment_top, 1.), np.where(covered, segment_bottom, 1.), a, b)
+        total += np.where(covered, integral, 0.)
+    return total
+
+def quantile_edges(depth, bins):
+    """
+    This function calculates the edges of depth bins which contain the same number of measurements, like pd.qcut
+    Input:
+        depth: array of the depths of the measurements
+        bins: the number of bins
+    Output: numpy array of the bins+1 edges of the bins
+    """
+    depth = np.asarray(depth, dtype=float)
+    return np.quantile(depth[~np.isnan(depth)], np.linspace(0, 1, bins + 1))
+
+def _bin_index(depth, edges, right, include_lowest):
+    """
+    This function finds the bin each depth falls in, or -1 for depths outside the bins.
+    With right=True bins include their bottom edge but not their top edge, (top, bottom], as in pd.cut
+    """
+    index = np.searchsorted(edges, depth, side='left' if right else 'right') - 1
+    if include_lowest:
+        index[depth == (edges[0] if right else edges[-1])] = 0 if right else len(edges) - 2
+    index[(index < 0) | (index >= len(edges) - 1) | np.isnan(depth)] = -1
+    return index
+
+def bin_means(depth, values, edges, right=True, include_lowest=False):
+    """
+    This function calculates the mean of measurements in depth bins in a single pass, like pd.cut followed by
+    groupby().mean(). Missing values are ignored, and bins without measurements have a mean of NaN
+    Input:
+        depth: array of the depths of the measurements
+        values: array of the measured values
+        edges: the edges of the depth bins, in increasing order
+        right: whether bins include their bottom (deeper) edge, as in pd.cut, or their top edge
+        include_lowest: whether the first bin includes its top edge (with right=True), as in pd.qcut
+    Output: numpy array of the mean of each bin
+    """
+    depth = np.asarray(depth, dtype=float)
+    values = np.asarray(values, dtype=float)
+    edges = np.asarray(edges, dtype=float)
+    index = _bin_index(depth, edges, right, include_lowest)
+    valid = (index >= 0) & ~np.isnan(values)
+    sums = np.bincount(index[valid], weights=values[valid], minlength=len(edges) - 1)
+    counts = np.bincount(index[valid], minlength=len(edges) - 1)
+    with np.errstate(invalid='ignore'):
+        return sums/counts
+
+def integrate_bins(depth, values, edges, layers=None, right=True, include_lowest=False):
+    """
+    This function integrates measurements of a concentration over depth, by multiplying the mean concentration in
+    each depth bin by the thickness of the bin. Bins without measurements are skipped
+    Input:
+        depth: array of the depths of the measurements
+        values: array of the measured concentrations
+        edges: the edges of the depth bins, in increasing order
+        layers: optional dictionary of layers to sum the bins into, keyed by name, each given as a (top, bottom)
+                pair of depths (e.g. {'epipelagic': (0, 200), 'mesopelagic': (200, 1000)}). Each bin is assigned to
+                the layer containing its middle
+        right, include_lowest: see bin_means
+    Output: numpy array of the integrated concentration in each bin, or a dictionary of the integrated
+            concentration in each layer
+    """
+    edges = np.asarray(edges, dtype=float)
+    totals = np.nan_to_num(bin_means(depth, values, edges, right, include_lowest)*np.diff(edges))
+    if layers is None:
+        return totals
+    middles = (edges[:-1] + edges[1:])/2
+    return {name: totals[(middles >= top) & (middles < bottom)].sum() for name, (top, bottom) in layers.items()}
@@ -0,0 +1,289 @@
+# This module contains the Estimate class, which records the arithmetic of an estimate as an expression graph
+# instead of calculating every intermediate value eagerly. Parameters with uncertainties are the leaves of the graph,
+# and operations on them return new Estimate objects. Identical subexpressions are represented by the same node, and
+# values are only calculated when they are requested, either at the best estimates of the parameters (point mode),
+# or for vectors of samples of the parameters (sample mode), from which we calculate confidence intervals.
+import itertools
+import weakref
+import numpy as np
+from random_helper import get_rng
+from monte_carlo_helper import Parameter, propagate, sketch_CI
+
+# Nodes of the graph keyed by their operation and arguments, so that identical subexpressions share a node
+_nodes = weakref.WeakValueDictionary()
+
+# Counter used to name parameters which were not given a name
+_counter = itertools.count()
+
+class Estimate(object):
+    """
+    A node of an expression graph. Use parameter() and constant() to create the leaves of the graph, and arithmetic
+    operators or apply() to combine them
+    """
+
+    # Make numpy defer to the arithmetic operators of Estimate (e.g. in np.float64(2)*estimate)
+    __array_ufunc__ = None
+
+    def __init__(self, op, args=(), func=None, parameter=None, name=None, data=None):
+        """
+        Nodes are not created directly, but through parameter(), constant() and operations on estimates
+        """
+        self.op = op
+        self.args = tuple(args)
+        self.func = func
+        self.parameter = parameter
+        self.name = name
+        self.data = data
+        # The names of the parameters the node depends on
+        self.leaves = frozenset([name]) if op == 'parameter' else frozenset().union(*(arg.leaves for arg in self.args))
+        # The key used to find identical nodes. Parameters are identified by the object, so parameters with the same
+        # name do not share nodes. The arguments are already interned, so they are identified by their id, and the
+        # node keeps them alive so their ids are not reused while it exists
+        if op == 'parameter':
+            self.key = ('parameter', name, id(self))
+        elif op == 'constant':
+            self.key = ('constant', _data_key(data))
+        else:
+            self.key = (op, func, tuple(id(arg) for arg in self.args))
+        self._point = None
+        self._constant = None
+
+    def __repr__(self):
+        if self.op == 'parameter':
+            return self.name
+        if self.op == 'constant':
+            return '%g' % self.data if np.ndim(self.data) == 0 else 'array(%s)' % (np.shape(self.data),)
+        if self.op in _OPERATORS:
+            return '(%r %s %r)' % (self.args[0], _SYMBOLS[self.op], self.args[1])
+        if self.op == 'neg':
+            return '-%r' % (self.args[0],)
+        return '%s(%s)' % (getattr(self.func, '__name__', 'func'), ', '.join(repr(arg) for arg in self.args))
+
+    def _evaluate(self, values, cache):
+        """
+        This function calculates the value of the node. The nodes of the graph are visited with a stack rather than
+        by recursion, so long chains of operations (e.g. sums of many estimates) do not reach the recursion limit
+        Input:
+            values: dictionary of the values of the parameters (numbers or arrays of samples), keyed by name
+            cache: dictionary of the values of the nodes which were already calculated in this evaluation
+        Output: the value of the node
+        """
+        computed = {}
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            key = id(node)
+            if key in computed:
+                continue
+            if node.op == 'constant':
+                computed[key] = node.data
+            elif node.op == 'parameter':
+                computed[key] = values[node.name]
+            elif not node.leaves and node._constant is not None:
+                # Subexpressions without parameters have the same value in all evaluations, so we calculate them once
+                computed[key] = node._constant
+            elif node.leaves and key in cache:
+                computed[key] = cache[key]
+            elif not expanded:
+                # Calculate the arguments first, then come back to the node
+                stack.append((node, True))
+                stack.extend((arg, False) for arg in node.args if id(arg) not in computed)
+            else:
+                value = node._calculate([computed[id(arg)] for arg in node.args])
+                if node.leaves:
+                    cache[key] = value
+                else:
+                    node._constant = value
+                computed[key] = value
+        return computed[id(self)]
+
+    def _calculate(self, args):
+        if self.op in _OPERATORS:
+            return _OPERATORS[self.op](*args)
+        if self.op == 'neg':
+            return -args[0]
+        return self.func(*args)
+
+    def evaluate(self, values=None):
+        """
+        This function calculates the value of the estimate. Parameters which are not given a value are set to their
+        best estimate, so this can be used to substitute values of some of the parameters (e.g. for a sweep)
+        Input: values: optional dictionary of values of parameters (numbers or numpy arrays), keyed by name
+        Output: the value of the estimate, an array if any of the values is an array
+        """
+        values = dict(values or {})
+        for leaf in self._parameters().values():
+            values.setdefault(leaf.name, leaf.parameter.value)
+        return self._evaluate(values, {})
+
+    @property
+    def value(self):
+        """
+        The value of the estimate at the best estimates of all the parameters (point mode)
+        """
+        if self._point is None:
+            self._point = self.evaluate()
+        return self._point
+
+    def _parameters(self):
+        """
+        Output: dictionary of the leaves of the graph which are parameters, keyed by name
+        """
+        leaves = {}
+        stack = [self]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if node.op == 'parameter':
+                if leaves.get(node.name, node) is not node:
+                    raise ValueError('The estimate depends on two different parameters named %s' % node.name)
+                leaves[node.name] = node
+            stack.extend(node.args)
+        return leaves
+
+    def samples(self, size=10000, rng=None):
+        """
+        This function calculates the value of the estimate for samples of all its parameters (sample mode)
+        Input:
+            size: the number of samples
+            rng: optional numpy Generator or seed. If not provided, a new stream is taken from random_helper
+        Output: numpy array of samples of the estimate
+        """
+        rng = get_rng(rng)
+        values = {name: leaf.parameter.sample(size, rng) for name, leaf in sorted(self._parameters().items())}
+        return np.broadcast_to(self._evaluate(values, {}), (size,))
+
+    def sketch(self, sample_size=1000000, chunk_size=100000, jobs=1, rng=None):
+        """
+        This function propagates the uncertainties of the parameters to the estimate
+        Input: see monte_carlo_helper.propagate
+        Output: QuantileSketch of the samples of the estimate
+        """
+        parameters = {name: leaf.parameter for name, leaf in sorted(self._parameters().items())}
+        return propagate(_GraphModel(self), parameters, sample_size, chunk_size, jobs, rng)
+
+    def CI(self, sample_size=1000000, chunk_size=100000, jobs=1, rng=None):
+        """
+        This function calculates the 95% multiplicative confidence interval of the estimate
+        Input: see monte_carlo_helper.propagate
+        Output: the 95% multiplicative confidence interval of the estimate
+        """
+        return sketch_CI(self.sketch(sample_size, chunk_size, jobs, rng))
+
+    def __add__(self, other): return _node('add', self, other)
+    def __radd__(self, other): return _node('add', other, self)
+    def __sub__(self, other): return _node('sub', self, other)
+    def __rsub__(self, other): return _node('sub', other, self)
+    def __mul__(self, other): return _node('mul', self, other)
+    def __rmul__(self, other): return _node('mul', other, self)
+    def __truediv__(self, other): return _node('div', self, other)
+    def __rtruediv__(self, other): return _node('div', other, self)
+    def __pow__(self, other): return _node('pow', self, other)
+    def __rpow__(self, other): return _node('pow', other, self)
+    def __neg__(self): return _node('neg', self)
+
+_OPERATORS = {'add': np.add, 'sub': np.subtract, 'mul': np.multiply, 'div': np.true_divide, 'pow': np.power}
+_SYMBOLS = {'add': '+', 'sub': '-', 'mul': '*', 'div': '/', 'pow': '**'}
+
+def _data_key(data):
+    if np.ndim(data) == 0:
+        return float(data)
+    # Arrays are identified by the object holding them, which the node keeps alive
+    return ('array', id(data))
+
+def _as_estimate(x):
+    return x if isinstance(x, Estimate) else constant(x)
+
+def _intern(node):
+    """
+    This function returns the existing node identical to a new node, or the new node if there is none
+    """
+    key = node.key
+    existing = _nodes.get(key)
+    if existing is not None:
+        return existing
+    _nodes[key] = node
+    return node
+
+def _node(op, *args, **kwargs):
+    return _intern(Estimate(op, [_as_estimate(arg) for arg in args], **kwargs))
+
+def parameter(value, mul_CI=1., distribution='lognormal', name=None):
+    """
+    This function creates a parameter of an estimate
+    Input:
+        value: the best estimate of the parameter
+        mul_CI: the 95% confidence interval of the parameter (see monte_carlo_helper.Parameter)
+        distribution: 'lognormal', 'normal' or 'fixed'
+        name: optional unique name of the parameter, used to substitute its value in evaluate()
+    Output: an Estimate
+    """
+    name = 'p%d' % next(_counter) if name is None else name
+    return Estimate('parameter', parameter=Parameter(value, mul_CI, distribution), name=name)
+
+def constant(data):
+    """
+    This function wraps a number or an array (e.g. a column of data) as a leaf of an estimate, without uncertainty
+    Input: data: a number or numpy array
+    Output: an Estimate
+    """
+    return _intern(Estimate('constant', data=data))
+
+def apply(func, *args):
+    """
+    This function records a call of a function on estimates or data, e.g. apply(gmean, data). Calls of the same
+    function on the same arguments share a node, so they are calculated only once.
+    In sample mode, the function is called with arrays of samples, so it should be vectorized
+    Input:
+        func: the function, e.g. a numpy ufunc
+        args: the arguments of the function (estimates, numbers or arrays)
+    Output: an Estimate
+    """
+    return _node('apply', *args, func=func)
+
+def log10(x): return apply(np.log10, x)
+def exp(x): return apply(np.exp, x)
+
+class _GraphModel(object):
+    """
+    A model for monte_carlo_helper.propagate which evaluates an estimate, or several estimates on the same samples of
+    their parameters
+    """
+
+    def __init__(self, estimates):
+        self.estimates = estimates
+
+    def __call__(self, values):
+        cache = {}
+        if isinstance(self.estimates, Estimate):
+            return self.estimates._evaluate(values, cache)
+        return {name: estimate._evaluate(values, cache) for name, estimate in self.estimates.items()}
+
+def _graph_parameters(estimates):
+    """
+    This function collects the parameters of several estimates
+    Input: estimates: iterable of estimates
+    Output: dictionary of the leaves of the graphs which are parameters, keyed by name
+    """
+    leaves = {}
+    for estimate in estimates:
+        for name, leaf in estimate._parameters().items():
+            if leaves.get(name, leaf) is not leaf:
+                raise ValueError('The estimates depend on two different parameters named %s' % name)
+            leaves[name] = leaf
+    return leaves
+
+def propagate_estimates(estimates, sample_size=1000000, chunk_size=100000, jobs=1, rng=None):
+    """
+    This function propagates the uncertainties of the parameters of several estimates jointly, so estimates which
+    share parameters (e.g. the biomass of several taxa and their total) are calculated from the same samples
+    Input:
+        estimates: dictionary of estimates, keyed by name
+        other inputs: see monte_carlo_helper.propagate
+    Output: dictionary of QuantileSketch objects of the samples of each estimate, keyed by name
+    """
+    parameters = {name: leaf.parameter for name, leaf in _graph_parameters(estimates.values()).items()}
+    return propagate(_GraphModel(estimates), dict(sorted(parameters.items())), sample_size, chunk_size, jobs, rng)
@@ -0,0 +1,93 @@
+# This module contains functions for fitting straight lines, such as the log-log and exponential depth regressions
+# of the estimates, by closed-form least squares. Many fits (e.g. to bootstrap or Monte Carlo replicates of the data)
+# are solved together from stacked arrays instead of one call of curve_fit per fit, and the fitted coefficients of
+# all the replicates can be used directly to extrapolate.
+import numpy as np
+from random_helper import get_rng
+
+def linear_fit(x, y, weights=None):
+    """
+    This function fits the line y = slope*x + intercept by least squares.
+    If x is a 1D array and y has several rows (e.g. replicates of the data at the same points), all the rows are
+    fitted in a single np.linalg.lstsq call. If x also has several rows, each row of x is fitted to the matching row
+    of y by solving the normal equations of all the fits at once
+    Input:
+        x: array of the independent variable, of shape (n,) or (..., n)
+        y: array of the dependent variable, of shape (n,) or (..., n)
+        weights: optional array of weights for each point, broadcasting against y
+    Output: array of the slope and intercept of each fit, of shape (..., 2), in the same order as np.polyfit
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.ndim == 1 and weights is None:
+        design = np.stack([x, np.ones_like(x)], axis=1)
+        rows = y.reshape(-1, y.shape[-1])
+        coefficients = np.linalg.lstsq(design, rows.T, rcond=None)[0].T
+        return coefficients.reshape(y.shape[:-1] + (2,))
+
+    x, y = np.broadcast_arrays(x, y)
+    w = np.ones_like(y) if weights is None else np.broadcast_to(np.asarray(weights, dtype=float), y.shape)
+    # The normal equations of weighted least squares for each fit
+    sw, sx, sy = w.sum(axis=-1), (w*x).sum(axis=-1), (w*y).sum(axis=-1)
+    sxx, sxy = (w*x*x).sum(axis=-1), (w*x*y).sum(axis=-1)
+    # Fits in which all the points have the same x have no solution, and their coefficients are NaN
+    with np.errstate(invalid='ignore', divide='ignore'):
+        determinant = sxx*sw - sx*sx
+        determinant = np.where(determinant == 0, np.nan, determinant)
+        slope = (sw*sxy - sx*sy)/determinant
+        intercept = (sxx*sy - sx*sxy)/determinant
+    return np.stack([slope, intercept], axis=-1)
+
+def predict(coefficients, x):
+    """
+    This function calculates the values of fitted lines
+    Input:
+        coefficients: array of the slope and intercept of each fit, of shape (..., 2), as returned by linear_fit
+        x: the points to calculate the lines at. Broadcasts against the coefficients, e.g. a number, or an array of
+           shape (m,) when the coefficients are of shape (2,)
+    Output: array of the values of the lines
+    """
+    coefficients = np.asarray(coefficients, dtype=float)
+    x = np.asarray(x, dtype=float)
+    slope = coefficients[..., 0].reshape(coefficients.shape[:-1] + (1,)*x.ndim)
+    intercept = coefficients[..., 1].reshape(coefficients.shape[:-1] + (1,)*x.ndim)
+    return slope*x + intercept
+
+def bootstrap_fit(x, y, replicates=10000, weights=None, rng=None):
+    """
+    This function fits a line to bootstrap replicates of the data, in which the points are resampled with replacement.
+    All the replicates are fitted together from a matrix of resampled indices
+    Input:
+        x: 1D array of the independent variable
+        y: 1D array of the dependent variable
+        replicates: the number of bootstrap replicates
+        weights: optional 1D array of weights for each point
+        rng: optional numpy Generator or seed. If not provided, a new stream is taken from random_helper
+    Output: array of the slope and intercept of each replicate, of shape (replicates, 2). Replicates in which all the
+            resampled points have the same x have NaN coefficients
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    indices = get_rng(rng).integers(0, len(x), (replicates, len(x)))
+    w = None if weights is None else np.asarray(weights, dtype=float)[indices]
+    return linear_fit(x[indices], y[indices], w)
+
+def coefficient_draws(x, y, draws=10000, rng=None):
+    """
+    This function draws samples of the coefficients of a line fitted by least squares, from their approximate normal
+    distribution, with the covariance estimated from the residuals of the fit (as returned by curve_fit as pcov)
+    Input:
+        x: 1D array of the independent variable
+        y: 1D array of the dependent variable
+        draws: the number of samples
+        rng: optional numpy Generator or seed. If not provided, a new stream is taken from random_helper
+    Output: array of samples of the slope and intercept, of shape (draws, 2)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    coefficients = linear_fit(x, y)
+    design = np.stack([x, np.ones_like(x)], axis=1)
+    residuals = y - design.dot(coefficients)
+    variance = residuals.dot(residuals)/(len(x) - 2)
+    covariance = variance*np.linalg.inv(design.T.dot(design))
+    return get_rng(rng).multivariate_normal(coefficients, covariance, draws)
@@ -1,5 +1,116 @@
 # This module contains functions that calculate the mean and 95% confidence interval of fractions
 import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from scipy.special import expit
+from random_helper import get_rng
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# The 97.5% percentile of the standard normal distribution
+z_975 = norm.ppf(0.975)
+
+# An empty array of weights, passed to the kernels for unweighted means
+_NO_WEIGHTS = np.empty(0)
+
+def _logit_moments_loop(fractions, weights):
+    """
+    This function calculates the moments of log(a) = log(f/(1-f)) in a single pass over the fractions, with the
+    weighted version of Welford's algorithm, without creating intermediate arrays. It is compiled with numba when
+    numba is installed
+    Input:
+        fractions: 1D numpy array of fractions
+        weights: 1D numpy array of weights for each fraction, or an empty array for equal weights
+    Output: the sum of the weights, the sum of the squared weights, the weighted mean of log(a) and the weighted sum
+            of squared deviations of log(a) from the mean. As in _logit_moments_numpy, fractions of 0 or 1 make the
+            mean -inf or inf and the sum of squared deviations NaN, and NaN fractions make both NaN
+    """
+    sum_w = 0.
+    sum_w2 = 0.
+    mean = 0.
+    m2 = 0.
+    # The weighted sum of the values of log(a) which are not finite, which override the mean
+    special = 0.
+    has_special = False
+    for i in range(fractions.shape[0]):
+        x = np.log(fractions[i]/(1. - fractions[i]))
+        w = 1. if weights.shape[0] == 0 else weights[i]
+        sum_w += w
+        sum_w2 += w*w
+        if not np.isfinite(x):
+            special += w*x
+            has_special = True
+        elif w != 0.:
+            delta = x - mean
+            mean += w/sum_w*delta
+            m2 += w*delta*(x - mean)
+    if has_special:
+        return sum_w, sum_w2, special, np.nan
+    if sum_w == 0.:
+        return sum_w, sum_w2, np.nan, np.nan
+    return sum_w, sum_w2, mean, m2
+
+def _logit(fractions):
+    """
+    This function calculates log(a) = log(f/(1-f)) of a numpy array of fractions with a single temporary array
+    """
+    x = np.subtract(1., fractions)
+    np.divide(fractions, x, out=x)
+    return np.log(x, out=x)
+
+def _logit_moments_numpy(fractions, weights):
+    """
+    This function calculates the same moments as _logit_moments_loop with numpy, when numba is not installed. The
+    logit transform and the deviations from the mean are calculated in a single array, in place
+    """
+    x = _logit(fractions)
+    if weights.shape[0] == 0:
+        sum_w = sum_w2 = float(x.shape[0])
+        mean = x.mean()
+        x -= mean
+        return sum_w, sum_w2, mean, x.dot(x)
+    sum_w = weights.sum()
+    mean = weights.dot(x)/sum_w
+    x -= mean
+    m2 = weights.dot(x*x)
+    return sum_w, weights.dot(weights), mean, m2
+
+# The numpy error model makes divisions by zero return inf or NaN in the compiled kernel, as they do in numpy
+_logit_moments = (_logit_moments_numpy if numba is None else
+                  numba.njit(cache=True, error_model='numpy')(_logit_moments_loop))
+
+def _logit_stats(fractions, weights=None):
+    """
+    This function calculates the weighted mean of log(a) = log(f/(1-f)) and its standard error, using the effective
+    sample size n_eff = (sum of weights)^2/(sum of squared weights). With equal weights, this is the mean and
+    np.std(ddof=1)/sqrt(n)
+    Missing values in pandas objects are ignored, as in pandas means, while NaN values in numpy arrays make the
+    results NaN
+    Input:
+        fractions: numpy array or pandas Series of fractions
+        weights: optional numpy array of weights for each fraction
+    Output: the mean of log(a) and the standard error of the mean of log(a)
+    """
+    pandas_input = isinstance(fractions, (pd.Series, pd.DataFrame, pd.Index))
+    fractions = np.ascontiguousarray(fractions, dtype=float).ravel()
+    weights = _NO_WEIGHTS if weights is None else np.ascontiguousarray(weights, dtype=float).ravel()
+    count = fractions.shape[0]
+    if pandas_input:
+        valid = ~np.isnan(fractions)
+        fractions = fractions[valid]
+        weights = weights if weights.shape[0] == 0 else weights[valid]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sum_w, sum_w2, mean, m2 = _logit_moments(fractions, weights)
+        n_eff = np.float64(sum_w)**2/sum_w2
+        se = np.sqrt(m2/sum_w/(n_eff - 1))
+    if pandas_input and weights.shape[0] == 0:
+        # The standard error of unweighted means of pandas objects has always been the std of the values which are
+        # not missing divided by the square root of the length of the object, including the missing values
+        se *= np.sqrt(fractions.shape[0]/count)
+    return mean, se
 
 def frac_mean(fractions,weights=None):
     """
@@ -21,16 +132,11 @@ def frac_mean(fractions,weights=None):
     Output: the geometric mean of fractions
     """
 
-    alpha = fractions/(1.-fractions)
-    log_alpha = np.log10(alpha)
-    if weights is not None:
-        mean_alpha = 10**np.average(log_alpha,weights=weights)                        
-    else:
-        mean_alpha = 10**np.mean(log_alpha)            
-    mean_frac = 1./(1.+1./mean_alpha)
-    return mean_frac
+    # The logit transform, the mean and the transform back to f = 1/(1+1/a) = 1/(1+exp(-log(a))) in a single pass
+    mean_alpha, se_alpha = _logit_stats(fractions, weights)
+    return expit(mean_alpha)
 
-def frac_CI(fractions):
+def frac_CI(fractions, weights=None, *, analytic=True, rng=None):
     """
     This functions calculates the 95% multiplicative confidence interval of the geometric mean of several fractions. 
     We assume the fractions themselves are not distributed log normally.
@@ -42,26 +148,110 @@ def frac_CI(fractions):
     a = f/(1-f)
     We calculate the 95% confidence interval of a, and then convert back a to f by the relation
     f = 1/(1+1/a)
+    Because f is a monotone function of a, the 2.5% and 97.5% percentiles of the distribution of f are the
+    percentiles of the lognormal distribution of a converted to f. By default we calculate them exactly in this way.
+    The original sampling-based calculation is kept for validation.
      
     Input: 
         fractions: a numpy array of the fractions for which we calculate the geometric mean
         weights: an optional array of weights for each fraction, in case we want to calculate
                  weighted averages
+        analytic: if True, calculate the percentiles of the distribution of f analytically. If False, estimate
+                  them from 1000 samples of the distribution of a
+        rng: optional numpy Generator or seed used when analytic is False. If not provided, a new stream is taken
+             from random_helper.get_rng
     Output: the geometric mean of fractions
     """
     
-    alpha = fractions/(1.-fractions)
-    log_alpha = np.log(alpha)
-    se_alpha = np.std(log_alpha,ddof=1)/np.sqrt(log_alpha.shape[0])
-    mean_alpha = np.mean(log_alpha)
-    # To turn a into f, we assume a is lognormally distributed, so we sample from a lognormal 
-    # distribution with a mean that is equal to the mean a and an std equal to the std of a.
-    alpha_dist = np.random.lognormal(mean_alpha,se_alpha,1000)
-    # We calculate f based on a to generate a distribution of fractions f    
-    frac_dist = 1./(1.+1./alpha_dist)
+    mean_alpha, se_alpha = _logit_stats(fractions, weights)
+    if analytic:
+        # We assume a is lognormally distributed with a mean that is equal to the mean a and an std equal to the std
+        # of a, and convert the 2.5% and 97.5% percentiles of a to f
+        upper_frac = expit(mean_alpha + z_975*se_alpha)
+        lower_frac = expit(mean_alpha - z_975*se_alpha)
+    else:
+        # To turn a into f, we assume a is lognormally distributed, so we sample from a lognormal 
+        # distribution with a mean that is equal to the mean a and an std equal to the std of a.
+        alpha_dist = get_rng(rng).lognormal(mean_alpha,se_alpha,1000)
+        # We calculate f based on a to generate a distribution of fractions f    
+        frac_dist = 1./(1.+1./alpha_dist)
+        upper_frac = np.percentile(frac_dist,97.5)
+        lower_frac = np.percentile(frac_dist,2.5)
+    mean_frac = expit(mean_alpha)
     # We calculate the multiplicative value of the 97.5 percentile of the distribution of fraction relative to the mean
-    upper_CI = np.percentile(frac_dist,97.5)/frac_mean(fractions)
+    upper_CI = upper_frac/mean_frac
     # We calculate the multiplicative value of the mean of the distribution of fraction relative to the 2.5 percentile
-    lower_CI = frac_mean(fractions)/np.percentile(frac_dist,2.5)
+    lower_CI = mean_frac/lower_frac
     # We return the mean of the upper and lower multiplicative values
     return np.mean([upper_CI,lower_CI])
+
+def _grouped_logit_stats(fractions, groups, weights):
+    """
+    This function calculates the weighted mean of log(a) = log(f/(1-f)) and its standard error for each group of
+    fractions, in a single vectorized pass over all groups. NaN fractions are ignored
+    Input:
+        fractions: numpy array of fractions, or a 2D numpy array in which each row is a group
+        groups: numpy array with the group code of each fraction, or None if fractions is a 2D array
+        weights: numpy array of weights for each fraction (or broadcastable to a 2D fractions array), or None
+    Output: a tuple of the sorted unique group codes, the mean of log(a) and the standard error of the mean of
+            log(a) for each group
+    """
+    fractions = np.asarray(fractions, dtype=float)
+    if groups is None:
+        # Each row of a 2D array is a group
+        fractions = np.atleast_2d(fractions)
+        if weights is not None:
+            weights = np.broadcast_to(np.asarray(weights, dtype=float), fractions.shape)
+        keys = np.arange(fractions.shape[0])
+        codes = np.repeat(keys, fractions.shape[1])
+    else:
+        keys, codes = np.unique(np.asarray(groups), return_inverse=True)
+    fractions = fractions.ravel()
+    codes = codes.ravel()
+    weights = np.ones_like(fractions) if weights is None else np.asarray(weights, dtype=float).ravel()
+
+    valid = ~np.isnan(fractions)
+    fractions, codes, weights = fractions[valid], codes[valid], weights[valid]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_alpha = _logit(fractions)
+        sum_w = np.bincount(codes, weights=weights, minlength=len(keys))
+        mean = np.bincount(codes, weights=weights*log_alpha, minlength=len(keys))/sum_w
+        n_eff = sum_w**2/np.bincount(codes, weights=weights**2, minlength=len(keys))
+        var = np.bincount(codes, weights=weights*(log_alpha - mean[codes])**2, minlength=len(keys))/sum_w*n_eff/(n_eff - 1)
+        se = np.sqrt(var/n_eff)
+    return keys, mean, se
+
+def grouped_frac_mean(fractions, groups=None, weights=None):
+    """
+    This function calculates the (weighted) geometric mean of the fractions in each group, like frac_mean, but for all
+    groups in a single vectorized pass instead of a groupby(...).apply(frac_mean). NaN fractions are ignored.
+    To roll up means hierarchically (e.g. study -> habitat -> global), call the function again on its output.
+    Input:
+        fractions: numpy array of fractions, or a 2D numpy array in which each row is a group
+        groups: numpy array with the group code of each fraction (e.g. the output of groupby(...).ngroup()). Not
+                needed if fractions is a 2D array
+        weights: an optional array of weights for each fraction
+    Output: a tuple of the sorted unique group codes and the geometric mean of fractions in each group
+    """
+    keys, mean, se = _grouped_logit_stats(fractions, groups, weights)
+    return keys, expit(mean)
+
+def grouped_frac_CI(fractions, groups=None, weights=None):
+    """
+    This function calculates the (weighted) geometric mean of the fractions in each group and the 95% multiplicative
+    confidence interval of the geometric mean, like frac_mean and frac_CI (with analytic percentiles), but for all groups
+    in a single vectorized pass. NaN fractions are ignored.
+    Input:
+        fractions: numpy array of fractions, or a 2D numpy array in which each row is a group
+        groups: numpy array with the group code of each fraction (e.g. the output of groupby(...).ngroup()). Not
+                needed if fractions is a 2D array
+        weights: an optional array of weights for each fraction
+    Output: a tuple of the sorted unique group codes, the geometric mean of fractions in each group and the 95%
+            multiplicative confidence interval of the geometric mean in each group
+    """
+    keys, mean, se = _grouped_logit_stats(fractions, groups, weights)
+    mean_frac = expit(mean)
+    upper_CI = expit(mean + z_975*se)/mean_frac
+    lower_CI = mean_frac*(1.+np.exp(-(mean - z_975*se)))
+    return keys, mean_frac, (upper_CI + lower_CI)/2.
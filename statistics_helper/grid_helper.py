@@ -0,0 +1,157 @@
+# This module contains functions for calculating estimates on a latitude/longitude grid (optionally with depth
+# layers), instead of as a single global value. The density of the estimate is calculated for blocks of rows of the
+# grid at a time with vectorized functions, written to a file on disk block by block, and summed over the area of
+# the cells to a global total, so the full grid never has to fit in memory.
+import numpy as np
+
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
+# The radius of the earth in meters, used to calculate the area of the cells of grids in geographic coordinates
+EARTH_RADIUS = 6371e3
+
+def cell_areas(top, bottom, lon_step):
+    """
+    This function calculates the area of cells of a latitude/longitude grid on a spherical earth
+    Input:
+        top: the latitudes of the top edges of the cells [degrees]
+        bottom: the latitudes of the bottom edges of the cells [degrees]
+        lon_step: the width of the cells [degrees of longitude]
+    Output: numpy array of the area of each cell [m^2]
+    """
+    return EARTH_RADIUS**2*np.deg2rad(abs(lon_step))*np.abs(np.sin(np.deg2rad(top)) - np.sin(np.deg2rad(bottom)))
+
+class Grid(object):
+    """
+    A regular latitude/longitude grid, with optional depth layers
+    """
+
+    def __init__(self, resolution=1., extent=(-180., 180., -90., 90.), depth_edges=None):
+        """
+        Input:
+            resolution: the size of the cells [degrees], or a (latitude, longitude) pair for cells which are not square
+            extent: the (west, east, south, north) edges of the grid [degrees]
+            depth_edges: optional edges of the depth layers (e.g. [0, 200, 1000, 4000] for the epipelagic,
+                         mesopelagic and bathypelagic layers of the ocean)
+        """
+        west, east, south, north = extent
+        self.resolution = resolution
+        lat_resolution, lon_resolution = np.broadcast_to(np.asarray(resolution, dtype=float), (2,))
+        # Rows go from north to south, as in most rasters
+        self.lat_edges = np.linspace(north, south, int(round((north - south)/lat_resolution)) + 1)
+        self.lon_edges = np.linspace(west, east, int(round((east - west)/lon_resolution)) + 1)
+        self.lats = (self.lat_edges[:-1] + self.lat_edges[1:])/2
+        self.lons = (self.lon_edges[:-1] + self.lon_edges[1:])/2
+        self.depth_edges = None if depth_edges is None else np.asarray(depth_edges, dtype=float)
+        self.shape = (len(self.lats), len(self.lons)) + (() if depth_edges is None else (len(self.depth_edges) - 1,))
+        # The area of a cell in each row [m^2], using the width of the cells after rounding to a whole number of columns
+        self.row_areas = cell_areas(self.lat_edges[:-1], self.lat_edges[1:], self.lon_edges[1] - self.lon_edges[0])
+
+    def coordinates(self, row, rows):
+        """
+        This function returns the coordinates of the cells in a block of rows, shaped to broadcast against each other
+        Input:
+            row: the first row of the block
+            rows: the number of rows in the block
+        Output: dictionary with the latitudes ('lat'), longitudes ('lon') and, for grids with depth layers, the top
+                ('top') and bottom ('bottom') of the depth layers
+        """
+        depth_axis = (np.newaxis,) if self.depth_edges is not None else ()
+        coordinates = {'lat': self.lats[row:row + rows][(slice(None), np.newaxis) + depth_axis],
+                       'lon': self.lons[(np.newaxis, slice(None)) + depth_axis]}
+        if self.depth_edges is not None:
+            coordinates['top'] = self.depth_edges[:-1][np.newaxis, np.newaxis, :]
+            coordinates['bottom'] = self.depth_edges[1:][np.newaxis, np.newaxis, :]
+        return coordinates
+
+class _NpyWriter(object):
+    """
+    Writes a grid to a .npy file mapped to memory, which can be read with np.load(path, mmap_mode='r')
+    """
+
+    def __init__(self, path, grid, name, units):
+        self.array = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=grid.shape)
+
+    def write(self, row, block):
+        self.array[row:row + block.shape[0]] = block
+
+    def close(self):
+        self.array.flush()
+        del self.array
+
+class _NetCDFWriter(object):
+    """
+    Writes a grid to a NetCDF file with coordinate variables, chunked by blocks of rows
+    """
+
+    def __init__(self, path, grid, name, units, chunk_rows):
+        self.dataset = netCDF4.Dataset(path, 'w')
+        dimensions = ['lat', 'lon'] + (['depth'] if grid.depth_edges is not None else [])
+        for dimension, values in zip(dimensions, [grid.lats, grid.lons, grid.depth_edges]):
+            if dimension == 'depth':
+                # The depth coordinate of each layer is the depth of its top
+                values = values[:-1]
+            self.dataset.createDimension(dimension, len(values))
+            self.dataset.createVariable(dimension, 'f8', (dimension,))[:] = values
+        chunks = [min(chunk_rows, grid.shape[0])] + list(grid.shape[1:])
+        self.variable = self.dataset.createVariable(name, 'f8', dimensions, zlib=True, chunksizes=chunks,
+                                                    fill_value=np.nan)
+        if units is not None:
+            self.variable.units = units
+
+    def write(self, row, block):
+        self.variable[row:row + block.shape[0]] = block
+
+    def close(self):
+        self.dataset.close()
+
+def gridded_estimate(density, grid, path=None, chunk_rows=None, name='density', units=None):
+    """
+    This function calculates the density of an estimate in every cell of a grid, and its global total.
+    The density is calculated for blocks of rows of the grid by a vectorized function, which receives the
+    coordinates of the cells (see Grid.coordinates) and returns the density per m^2 in each cell (e.g. the
+    concentration integrated over each depth layer). For example, for a concentration of cells in the ocean which
+    follows a power law of depth:
+
+        grid = Grid(1., depth_edges=[0, 200, 1000, 4000])
+        bacteria = lambda c: integrate_piecewise_power_law(c['top'], c['bottom'], [64], [0.08, -1.09], [5.54, 7.66])
+        density = lambda c: bacteria(c)*ml_in_m3*ocean_mask(c['lat'], c['lon'])
+        total, path = gridded_estimate(density, grid, 'cells.npy')
+
+    Input:
+        density: the function calculating the density in a block of cells. Cells without data should be NaN
+        grid: the Grid
+        path: optional path of the file to write the density of all the cells to. Files ending with .nc are written
+              as NetCDF (requires the netCDF4 package), and other files as .npy arrays
+        chunk_rows: the number of rows calculated at a time. By default, about 2**20 cells are calculated at a time
+        name: the name of the variable in NetCDF files
+        units: the units of the density, stored in NetCDF files
+    Output: the global total (the sum of the density times the area of the cells with data), and the path of the
+            file the density was written to
+    """
+    cells_per_row = int(np.prod(grid.shape[1:]))
+    chunk_rows = chunk_rows or max(1, 2**20//cells_per_row)
+    writer = None
+    if path is not None:
+        if path.endswith('.nc'):
+            if netCDF4 is None:
+                raise ImportError('Writing NetCDF files requires the netCDF4 package')
+            writer = _NetCDFWriter(path, grid, name, units, chunk_rows)
+        else:
+            writer = _NpyWriter(path, grid, name, units)
+
+    total = 0.
+    try:
+        for row in range(0, grid.shape[0], chunk_rows):
+            rows = min(chunk_rows, grid.shape[0] - row)
+            block = np.broadcast_to(density(grid.coordinates(row, rows)), (rows,) + grid.shape[1:])
+            areas = grid.row_areas[row:row + rows].reshape((rows,) + (1,)*(len(grid.shape) - 1))
+            total += np.nansum(block*areas)
+            if writer is not None:
+                writer.write(row, block)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total, path
@@ -0,0 +1,201 @@
+# This module contains functions for propagating the uncertainty of many parameters jointly through a model, by
+# Monte Carlo sampling. Instead of combining the uncertainties of pairs of values (CI_prod_prop, CI_sum_prop), every
+# parameter is represented by a vector of samples, and the same samples are used to calculate all the outputs of the
+# model (e.g. the biomass of each taxon and the global total), so parameters shared by several outputs are correlated
+# correctly. Samples are drawn in chunks of fixed size and summarized by QuantileSketch objects, so memory use does not
+# depend on the number of samples, and chunks can be run in several processes.
+import copy
+import numpy as np
+from CI_helper import QuantileSketch
+from random_helper import spawn_rngs
+from parallel_helper import parallel_map
+
+__all__ = ['Parameter', 'point_estimate', 'propagate', 'sketch_CI', 'results_parameters']
+
+class Parameter(object):
+    """
+    A parameter of a model, with its best estimate and its uncertainty
+    """
+
+    def __init__(self, value, mul_CI=1., distribution='lognormal'):
+        """
+        Input:
+            value: the best estimate of the parameter
+            mul_CI: the 95% confidence interval of the parameter. For lognormal parameters this is the multiplicative
+                    (fold-change) 95% confidence interval, as in the rest of the estimates. For normal parameters this
+                    is the half width of the 95% confidence interval
+            distribution: 'lognormal', 'normal' or 'fixed'
+        """
+        if distribution not in ('lognormal', 'normal', 'fixed'):
+            raise ValueError('Unknown distribution %s' % distribution)
+        self.value = float(value)
+        self.mul_CI = float(mul_CI)
+        self.distribution = distribution
+
+    def sample(self, size, rng, out=None):
+        """
+        This function draws samples of the parameter
+        Input:
+            size: the number of samples
+            rng: numpy Generator used to draw the samples
+            out: optional array of size elements to draw the samples into
+        Output: numpy array of samples
+        """
+        out = np.empty(size) if out is None else out
+        if self.distribution == 'fixed' or self.mul_CI == (1. if self.distribution == 'lognormal' else 0.):
+            out[:] = self.value
+            return out
+        rng.standard_normal(out=out)
+        if self.distribution == 'lognormal':
+            # The lognormal distribution has a mean of log(value) and std of log(95_CI)/1.96
+            out *= np.log(self.mul_CI)/1.96
+            out += np.log(self.value)
+            np.exp(out, out=out)
+        else:
+            out *= self.mul_CI/1.96
+            out += self.value
+        return out
+
+def _as_parameter(parameter):
+    """
+    Parameters can be given as Parameter objects, as (value, mul_CI) pairs of lognormal parameters or as numbers
+    """
+    if isinstance(parameter, Parameter):
+        return parameter
+    if np.ndim(parameter) == 0:
+        return Parameter(parameter, distribution='fixed')
+    return Parameter(*parameter)
+
+def _as_dict(outputs):
+    """
+    Models return either a single output or a dictionary of named outputs
+    """
+    return outputs if isinstance(outputs, dict) else {None: outputs}
+
+def point_estimate(model, parameters):
+    """
+    This function calculates the outputs of a model at the best estimates of its parameters
+    Input:
+        model: a function which receives a dictionary of parameter values and returns an output or a dictionary of
+               outputs
+        parameters: dictionary of the parameters of the model, keyed by name
+    Output: the output of the model, or a dictionary of outputs
+    """
+    values = {name: np.array([_as_parameter(p).value]) for name, p in parameters.items()}
+    outputs = _as_dict(model(values))
+    outputs = {name: np.asarray(value, dtype=float).ravel()[0] for name, value in outputs.items()}
+    return outputs[None] if list(outputs) == [None] else outputs
+
+def _run_chunk(model, parameters, size, rng, sketches):
+    """
+    This function draws one chunk of samples of all the parameters, calculates the outputs of the model for these
+    samples and adds them to the sketches of the outputs
+    """
+    samples = {name: p.sample(size, rng) for name, p in parameters.items()}
+    for name, values in _as_dict(model(samples)).items():
+        sketches[name].update(np.broadcast_to(values, (size,)))
+    return sketches
+
+def _run_chunks(args):
+    model, parameters, sizes, rngs, sketches = args
+    for size, rng in zip(sizes, rngs):
+        _run_chunk(model, parameters, size, rng, sketches)
+    return sketches
+
+def _blank(sketch):
+    """
+    This function returns an empty sketch with the same bins and range as another sketch, so they can be merged
+    """
+    blank = copy.copy(sketch)
+    blank.counts = np.zeros_like(sketch.counts)
+    blank.total = 0.
+    blank.weighted_sum = 0.
+    blank.nonpositive = 0.
+    return blank
+
+def _sketch_chunks(model, parameters, sizes, rngs, jobs, log):
+    """
+    This function runs all the chunks of samples of a model and sketches its outputs
+    Input:
+        log: dictionary of whether to bin each output in log space (see QuantileSketch), keyed by name
+        other inputs: see propagate
+    Output: dictionary of sketches of the outputs
+    """
+    # The first chunk sets the range of the sketches, which all the other chunks share so they can be merged
+    sketches = {name: QuantileSketch(log=log[name]) for name in log}
+    _run_chunk(model, parameters, sizes[0], rngs[0], sketches)
+
+    if jobs == 1 or len(sizes) == 1:
+        _run_chunks((model, parameters, sizes[1:], rngs[1:], sketches))
+    else:
+        blanks = {name: _blank(sketch) for name, sketch in sketches.items()}
+        jobs_args = [(model, parameters, sizes[1+i::jobs], rngs[1+i::jobs], blanks) for i in range(jobs)]
+        for job_sketches in parallel_map(_run_chunks, jobs_args, jobs=jobs):
+            for name, sketch in job_sketches.items():
+                sketches[name].merge(sketch)
+    return sketches
+
+def propagate(model, parameters, sample_size=1000000, chunk_size=100000, jobs=1, rng=None):
+    """
+    This function propagates the uncertainty of the parameters of a model to its outputs, by drawing samples of all
+    the parameters jointly and calculating the outputs of the model for each sample.
+    The model is a function which receives a dictionary of numpy arrays of samples, keyed by the names of the
+    parameters, and returns a numpy array of samples of its output, or a dictionary of several outputs. For example:
+
+        def model(p):
+            arch = p['cell number']*p['carbon content']*p['archaea fraction']
+            bac = p['cell number']*p['carbon content']*p['bacteria fraction']
+            return {'archaea': arch, 'bacteria': bac, 'total': arch + bac}
+
+    The samples are drawn in chunks, and each chunk uses its own random number stream, so the results do not depend
+    on the number of processes used. Outputs are sketched in log space, and if any sample of an output is zero or
+    negative (e.g. with normal parameters), the samples are drawn again from the same streams and the output is
+    sketched in linear space, so that its percentiles are calculated from all the samples.
+    Input:
+        model: the model function. To run in several processes, it must be defined at the top level of a module
+        parameters: dictionary of the parameters of the model, keyed by name. Each parameter is a Parameter, a
+                    (value, mul_CI) pair of a lognormal parameter, or a number for a parameter without uncertainty
+        sample_size: the total number of samples
+        chunk_size: the number of samples drawn at a time, which bounds the memory use
+        jobs: the number of processes to run the chunks in
+        rng: optional numpy Generator or seed. If not provided, a new stream is taken from random_helper
+    Output: a QuantileSketch of the samples of the output, or a dictionary of sketches of the outputs
+    """
+    parameters = {name: _as_parameter(p) for name, p in parameters.items()}
+    sizes = [min(chunk_size, sample_size - start) for start in range(0, sample_size, chunk_size)]
+    rngs = spawn_rngs(len(sizes), rng)
+
+    log = {name: True for name in _as_dict(point_estimate(model, parameters))}
+    sketches = _sketch_chunks(model, parameters, sizes, copy.deepcopy(rngs), jobs, log)
+    if any(sketch.nonpositive > 0 for sketch in sketches.values()):
+        log = {name: sketch.nonpositive == 0 for name, sketch in sketches.items()}
+        sketches = _sketch_chunks(model, parameters, sizes, rngs, jobs, log)
+
+    return sketches[None] if list(sketches) == [None] else sketches
+
+def sketch_CI(sketch):
+    """
+    This function calculates the 95% multiplicative confidence interval of the samples summarized by a sketch, in the
+    same way as CI_sum_prop
+    Input: sketch: a QuantileSketch
+    Output: the mean of the multiplicative values of the 97.5 percentile relative to the mean, and of the mean
+            relative to the 2.5 percentile
+    """
+    mean = sketch.mean()
+    lower, upper = sketch.percentile([2.5, 97.5])
+    if lower <= 0 or mean <= 0:
+        raise ValueError('The multiplicative confidence interval is only defined for positive samples, but the 2.5 '
+                         'percentile is %g and the mean is %g' % (lower, mean))
+    return np.mean([upper/mean, mean/lower])
+
+def results_parameters(path, names):
+    """
+    This function builds lognormal parameters from the rows of a results file
+    Input:
+        path: the path of the results file (e.g. '../marine_prok_biomass_estimate.xlsx')
+        names: dictionary of the names of the parameters, keyed by the number of the row of each parameter
+    Output: dictionary of Parameter objects, keyed by name
+    """
+    from results_helper import load_results
+    results = load_results(path, list(names))
+    return {name: Parameter(results['Value'][row], results['Uncertainty'][row]) for row, name in names.items()}
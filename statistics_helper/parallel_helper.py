@@ -0,0 +1,107 @@
+# This module contains functions for running independent calculations in a pool of worker processes. Large arrays
+# used by all the calculations (e.g. matrices of Monte Carlo samples or rasters) are placed in shared memory once,
+# and the workers attach to them instead of receiving a pickled copy with every task.
+import os
+import sys
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+# Shared arrays attached in this process, keyed by name, along with the shared memory blocks holding them
+_shared = {}
+_blocks = []
+
+class SharedArray(object):
+    """
+    A handle of an array in shared memory, which can be sent to other processes and attached there
+    """
+
+    def __init__(self, block_name, shape, dtype):
+        self.block_name = block_name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).str
+
+    def attach(self):
+        """
+        This function maps the shared array into the memory of the current process
+        Output: a read-only numpy array backed by the shared memory
+        """
+        # Only the process which created the block unlinks it. Worker processes share the resource tracker of the
+        # process which started them, so attaching to the block does not register it again
+        if sys.version_info >= (3, 13):
+            block = shared_memory.SharedMemory(name=self.block_name, track=False)
+        else:
+            block = shared_memory.SharedMemory(name=self.block_name)
+        _blocks.append(block)
+        array = np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+        array.flags.writeable = False
+        return array
+
+@contextmanager
+def share_arrays(arrays):
+    """
+    This context manager copies arrays to shared memory, and releases the shared memory when it exits
+    Input: arrays: dictionary of numpy arrays, keyed by name
+    Output: dictionary of SharedArray handles, keyed by name
+    """
+    blocks = []
+    try:
+        handles = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            handles[name] = SharedArray(block.name, array.shape, array.dtype)
+        yield handles
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def _init_worker(handles):
+    _shared.clear()
+    _shared.update({name: handle.attach() for name, handle in handles.items()})
+
+def shared_array(name):
+    """
+    This function returns a shared array inside a function run by parallel_map
+    Input: name: the name of the array in the shared argument of parallel_map
+    Output: numpy array
+    """
+    return _shared[name]
+
+def parallel_map(func, items, shared=None, jobs=None):
+    """
+    This function calls a function on each item in a pool of worker processes.
+    For example, to sum the columns of a large matrix of samples in parallel:
+
+        def column_sum(column):
+            return shared_array('samples')[:, column].sum()
+
+        sums = parallel_map(column_sum, range(samples.shape[1]), shared={'samples': samples})
+
+    Input:
+        func: the function, which must be defined at the top level of a module
+        items: the arguments of each call of the function
+        shared: optional dictionary of numpy arrays, which the function reads with shared_array(name)
+        jobs: the number of worker processes. By default, the number of CPUs. With a single job, the calls run in the
+              current process
+    Output: list of the results of the calls, in the order of the items
+    """
+    items = list(items)
+    shared = shared or {}
+    jobs = min(jobs or os.cpu_count() or 1, max(len(items), 1))
+    if jobs == 1:
+        previous = dict(_shared)
+        _shared.clear()
+        _shared.update(shared)
+        try:
+            return [func(item) for item in items]
+        finally:
+            _shared.clear()
+            _shared.update(previous)
+    with share_arrays(shared) as handles:
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(handles,)) as executor:
+            return list(executor.map(func, items))
@@ -0,0 +1,410 @@
+# This module contains functions for running all the estimate scripts in the repository as a dependency graph.
+# Each script reads its data files and the results of other scripts, and writes its results as rows of a
+# *_estimate.xlsx file (through results_helper). We discover these inputs and outputs from the source of the scripts,
+# order the scripts so that every script runs after the scripts whose results it reads, and run independent scripts
+# concurrently. At the end of the run, the results are exported to the *_estimate.xlsx files.
+#
+# Usage (from the root of the repository):
+#     python statistics_helper/pipeline_helper.py [--jobs N] [--only PATTERN] [--dry-run] [--force] [--seed SEED]
+import os
+import re
+import sys
+import json
+import glob
+import time
+import hashlib
+import threading
+import subprocess
+import argparse
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import results_helper
+
+# The root of the repository
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Directories which do not contain estimate scripts
+EXCLUDED_DIRS = ['statistics_helper', 'tests', '.ipynb_checkpoints', '.git']
+
+# Patterns of calls which read a file, and of calls which write a file. The first group of each pattern is the path
+READ_PATTERNS = [r"read_excel\(\s*'([^']+)'", r"read_csv\(\s*'([^']+)'", r"gdal\.Open\(\s*'([^']+)'",
+                 r"Raster\(\s*'([^']+)'",
+                 r"load_results\(\s*'([^']+)'"]
+WRITE_PATTERNS = [r"to_excel\(\s*'([^']+)'", r"ExcelWriter\(\s*'([^']+)'", r"update_result\(\s*'([^']+)'"]
+
+# Pattern of the rows a script writes to its results file
+ROW_PATTERN = r"update_result\(\s*'[^']+',\s*(\d+)"
+
+# The file in which we keep the fingerprints and outputs of the steps of the last run
+CACHE_FILE = os.path.join(ROOT, '.pipeline_cache.json')
+
+# Hashes of the content of files, keyed by their path, modification time and size
+_hashes = {}
+
+class Step(object):
+    """
+    A single estimate script along with the files it reads and writes
+    """
+
+    def __init__(self, script, inputs, outputs, rows):
+        """
+        Input:
+            script: the absolute path of the script
+            inputs: set of absolute paths of the files the script reads
+            outputs: set of absolute paths of the files the script writes
+            rows: list of the rows the script writes to its results file
+        """
+        self.script = script
+        self.inputs = inputs
+        self.outputs = outputs
+        self.rows = rows
+        self.deps = set()
+
+    @property
+    def name(self):
+        return os.path.relpath(self.script, ROOT)
+
+    def __repr__(self):
+        return 'Step(%s)' % self.name
+
+def parse_script(script):
+    """
+    This function finds the files a script reads and writes, and the rows it writes to its results file
+    Input: script: path of the script
+    Output: a Step
+    """
+    script = os.path.abspath(script)
+    folder = os.path.dirname(script)
+    with open(script, encoding='utf-8') as f:
+        source = f.read()
+
+    def find(patterns):
+        paths = set()
+        for pattern in patterns:
+            for path in re.findall(pattern, source):
+                paths.add(os.path.normpath(os.path.join(folder, path)))
+        return paths
+
+    rows = sorted(set(int(x) for x in re.findall(ROW_PATTERN, source)))
+    return Step(script, find(READ_PATTERNS), find(WRITE_PATTERNS), rows)
+
+def discover(root=ROOT):
+    """
+    This function finds all the estimate scripts under a directory and builds the dependency graph between them.
+    A script depends on every other script which writes a file it reads. A script which writes rows of a results file
+    does not depend on the other scripts writing rows of the same file
+    Input: root: the directory to search
+    Output: a dictionary of Steps keyed by the name of the script, in a valid execution order
+    """
+    steps = []
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_DIRS)
+        for file in sorted(files):
+            if file.endswith('.py'):
+                steps.append(parse_script(os.path.join(folder, file)))
+
+    writers = {}
+    for step in steps:
+        for path in step.outputs:
+            writers.setdefault(path, []).append(step)
+
+    for step in steps:
+        for path in step.inputs - step.outputs:
+            step.deps.update(writer.name for writer in writers.get(path, []))
+
+    steps = {step.name: step for step in steps}
+    return {name: steps[name] for name in topological_order(steps)}
+
+def topological_order(steps):
+    """
+    This function orders steps so that each step comes after all the steps it depends on
+    Input: steps: a dictionary of Steps keyed by their name
+    Output: a list of the names of the steps
+    """
+    order = []
+    done = set()
+    visiting = set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError('Circular dependency involving %s' % name)
+        visiting.add(name)
+        for dep in sorted(steps[name].deps):
+            if dep in steps:
+                visit(dep)
+        visiting.remove(name)
+        done.add(name)
+        order.append(name)
+
+    for name in sorted(steps):
+        visit(name)
+    return order
+
+def select(steps, patterns):
+    """
+    This function selects the steps whose name contains any of the patterns, together with all the steps they depend on
+    Input:
+        steps: a dictionary of Steps keyed by their name
+        patterns: list of strings
+    Output: a dictionary of the selected Steps, in the same order
+    """
+    selected = set()
+
+    def add(name):
+        if name not in selected:
+            selected.add(name)
+            for dep in steps[name].deps:
+                add(dep)
+
+    for name in steps:
+        if any(pattern in name for pattern in patterns):
+            add(name)
+    return {name: step for name, step in steps.items() if name in selected}
+
+def command(step):
+    """
+    This function returns the command which runs a step. Scripts exported from notebooks which use IPython magics
+    are run with IPython
+    """
+    with open(step.script, encoding='utf-8') as f:
+        uses_ipython = 'get_ipython()' in f.read()
+    if uses_ipython:
+        return [sys.executable, '-m', 'IPython', '--no-banner', '--quick', os.path.basename(step.script)]
+    return [sys.executable, os.path.basename(step.script)]
+
+def run_step(step, env=None):
+    """
+    This function runs a single step in its own process, from the directory of the script
+    Input:
+        step: the Step to run
+        env: optional dictionary of environment variables to set for the script
+    Output: the completed process, with the captured output of the script
+    """
+    env = dict(os.environ, **env) if env else None
+    return subprocess.run(command(step), cwd=os.path.dirname(step.script), env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+def file_hash(path):
+    """
+    This function calculates a hash of the content of a file. For results files we hash the rows in the results
+    store, as they are rewritten by every run of the steps which write them. Other files (e.g. the data workbooks)
+    are hashed by their bytes, and the hash is kept for as long as the modification time and size of the file do not
+    change, so files read by several steps are hashed once
+    Input: path: the path of the file
+    Output: hex digest of the content of the file, or None if the file does not exist
+    """
+    digest = hashlib.sha256()
+    if results_helper.has_results(path):
+        digest.update(results_helper.load_results(path).to_csv().encode('utf-8'))
+        return digest.hexdigest()
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key in _hashes:
+        return _hashes[key]
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+def read_rows(path, rows):
+    """
+    This function reads rows of a results file from the results store
+    Input:
+        path: the path of the results file
+        rows: list of row numbers
+    Output: a dictionary of the rows, keyed by their number (as strings), or None if a row is missing
+    """
+    data = results_helper.load_results(path, rows)
+    if len(data) < len(rows):
+        return None
+    return {str(row): json.loads(data.loc[row].to_json()) for row in rows}
+
+def write_rows(path, rows):
+    """
+    This function writes rows to a results file in the results store
+    Input:
+        path: the path of the results file
+        rows: a dictionary of rows keyed by their number, as returned by read_rows
+    """
+    for row, values in rows.items():
+        results_helper.update_result(path, int(row), values)
+
+class BuildCache(object):
+    """
+    A cache of the fingerprints and outputs of the steps of previous runs.
+    The fingerprint of a step is a hash of the script, the statistics helpers, the content of the files the script
+    reads (other than the rows of results files it writes itself) and the parameters of the run (environment
+    variables and the random seed). A step whose fingerprint did not change since it last ran successfully is not
+    run again, and the rows it wrote are restored from the cache if they were changed since
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        with self.lock:
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+
+    def fingerprint(self, step, env=None):
+        """
+        This function calculates the fingerprint of a step
+        Input:
+            step: the Step
+            env: dictionary of environment variables which are set for the script
+        Output: hex digest of the fingerprint
+        """
+        params = {'BIOMASS_SEED': os.environ.get('BIOMASS_SEED', '0')}
+        params.update(env or {})
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8'))
+        for path in [step.script] + sorted(glob.glob(os.path.join(ROOT, 'statistics_helper', '*.py'))):
+            digest.update(file_hash(path).encode('utf-8'))
+        for path in sorted(step.inputs - step.outputs):
+            digest.update(path.encode('utf-8'))
+            digest.update(str(file_hash(path)).encode('utf-8'))
+        return digest.hexdigest()
+
+    def outputs(self, step):
+        """
+        This function records the outputs of a step - the rows it writes to a results file, or the hash of a file it
+        writes as a whole
+        """
+        outputs = {}
+        for path in sorted(step.outputs):
+            if step.rows:
+                outputs[path] = {'rows': read_rows(path, step.rows)}
+            else:
+                outputs[path] = {'hash': file_hash(path)}
+        return outputs
+
+    def restore(self, step, outputs):
+        """
+        This function restores the outputs of a step from the cache
+        Output: True if all the outputs are up to date, False if an output cannot be restored
+        """
+        for path, cached in outputs.items():
+            if 'rows' in cached:
+                if cached['rows'] is None:
+                    return False
+                if read_rows(path, step.rows) != cached['rows']:
+                    write_rows(path, cached['rows'])
+            elif file_hash(path) != cached['hash']:
+                return False
+        return True
+
+    def runner(self, runner=run_step, force=False):
+        """
+        This function wraps a step runner so that steps whose fingerprint did not change are not run again
+        Input:
+            runner: the function which runs a step
+            force: if True, run all the steps, and only record their fingerprints and outputs for later runs
+        Output: a function with the same signature as runner
+        """
+        def cached_runner(step, env=None):
+            fingerprint = self.fingerprint(step, env)
+            entry = None if force else self.entries.get(step.name)
+            if entry and entry['fingerprint'] == fingerprint and self.restore(step, entry['outputs']):
+                return SimpleNamespace(returncode=0, cached=True)
+            result = runner(step, env)
+            with self.lock:
+                if result.returncode == 0:
+                    self.entries[step.name] = {'fingerprint': fingerprint, 'outputs': self.outputs(step)}
+                else:
+                    self.entries.pop(step.name, None)
+            self.save()
+            return result
+        return cached_runner
+
+def run(steps, jobs=None, env=None, runner=run_step, log=print):
+    """
+    This function runs steps in dependency order. Independent steps run concurrently, each in a separate process, so
+    the total run time is bounded by the longest chain of dependent steps rather than the sum of all steps.
+    At the end, the results of the steps are exported from the results store to the *_estimate.xlsx files
+    Input:
+        steps: a dictionary of Steps keyed by their name, as returned by discover
+        jobs: the maximal number of steps to run at the same time (default: the number of CPUs)
+        env: optional dictionary of environment variables to set for the scripts
+        runner: function which runs a single step (given the step and env) and returns an object with a returncode attribute
+        log: function used to report progress
+    Output: a dictionary keyed by the name of each step, with the value 'ok', 'failed' or 'skipped'
+    """
+    jobs = jobs or os.cpu_count()
+    status = {}
+    pending = dict(steps)
+    running = {}
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            # Skip steps which depend on a step that did not complete
+            for name, step in list(pending.items()):
+                if any(status.get(dep) in ('failed', 'skipped') for dep in step.deps):
+                    status[name] = 'skipped'
+                    del pending[name]
+                    log('skipped %s' % name)
+
+            # Start every step whose dependencies completed
+            for name, step in list(pending.items()):
+                if len(running) >= jobs:
+                    break
+                if all(status.get(dep) == 'ok' for dep in step.deps if dep in steps):
+                    running[executor.submit(runner, step, env)] = name
+                    del pending[name]
+
+            if pending and not running:
+                # Nothing is running and no pending step can start, so the pending steps depend on each other
+                raise ValueError('Circular dependency among %s' % ', '.join(sorted(pending)))
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    result = future.result()
+                    ok = result.returncode == 0
+                except Exception as e:
+                    result, ok = e, False
+                status[name] = 'ok' if ok else 'failed'
+                label = 'cached' if ok and getattr(result, 'cached', False) else status[name]
+                log('%-6s %s (%.0f s)' % (label, name, time.time() - start))
+                if not ok:
+                    log(getattr(result, 'stderr', None) or str(result))
+
+    results_helper.export_results()
+    return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the estimate scripts of the repository in dependency order')
+    parser.add_argument('--jobs', type=int, default=None, help='number of scripts to run at the same time')
+    parser.add_argument('--only', nargs='*', default=None, help='run only scripts whose path contains these patterns, and the scripts they depend on')
+    parser.add_argument('--dry-run', action='store_true', help='print the execution order without running anything')
+    parser.add_argument('--force', action='store_true', help='run all the scripts, even if their inputs did not change since the last run')
+    parser.add_argument('--seed', type=int, default=None, help='the seed of the random numbers used by the scripts')
+    args = parser.parse_args(argv)
+
+    steps = discover()
+    if args.only:
+        steps = select(steps, args.only)
+
+    if args.dry_run:
+        for name, step in steps.items():
+            print('%s <- %s' % (name, ', '.join(sorted(step.deps)) or '-'))
+        return 0
+
+    env = {'BIOMASS_SEED': str(args.seed)} if args.seed is not None else None
+    runner = BuildCache().runner(force=args.force)
+    status = run(steps, jobs=args.jobs, env=env, runner=runner)
+    return 0 if all(x == 'ok' for x in status.values()) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
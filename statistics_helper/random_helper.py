@@ -0,0 +1,60 @@
+# This module contains functions for generating reproducible streams of random numbers for the stochastic helpers
+import os
+import numpy as np
+
+__all__ = ['set_seed', 'get_seed', 'get_rng', 'spawn_rngs']
+
+# The seed used when no seed is set explicitly. It can be overridden by the BIOMASS_SEED environment variable, so
+# that a run of the whole pipeline can be repeated with a different seed without changing any code
+DEFAULT_SEED = int(os.environ.get('BIOMASS_SEED', 0))
+
+_root = np.random.SeedSequence(DEFAULT_SEED)
+
+def set_seed(seed):
+    """
+    This function resets the root of all random number streams handed out by get_rng
+    Input: seed: an integer seed
+    """
+    global _root
+    _root = np.random.SeedSequence(seed)
+
+def get_seed():
+    """
+    This function returns the seed of the root random number stream, e.g. for fingerprinting a run
+    Output: the seed passed to set_seed, or DEFAULT_SEED
+    """
+    return _root.entropy
+
+def get_rng(rng=None):
+    """
+    This function returns a numpy random number generator.
+    Each call without an argument returns a generator seeded with the next child of the root seed sequence, so every
+    estimate gets its own independent stream, and rerunning the same calls in the same order yields the same numbers.
+    Input: rng: optional numpy Generator (returned as is), integer seed or SeedSequence
+    Output: a numpy Generator
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if rng is None:
+        rng = _root.spawn(1)[0]
+    return np.random.default_rng(rng)
+
+def spawn_rngs(n, rng=None):
+    """
+    This function returns several independent random number generators, e.g. for Monte Carlo jobs which run in
+    parallel processes and should not share correlated streams
+    Input:
+        n: the number of generators
+        rng: optional numpy Generator, integer seed or SeedSequence to spawn the generators from. If not provided,
+             the generators are spawned from the next child of the root seed sequence
+    Output: a list of n numpy Generators
+    """
+    if isinstance(rng, np.random.Generator):
+        seed_seq = rng.bit_generator.seed_seq
+    elif isinstance(rng, np.random.SeedSequence):
+        seed_seq = rng
+    elif rng is None:
+        seed_seq = _root.spawn(1)[0]
+    else:
+        seed_seq = np.random.SeedSequence(rng)
+    return [np.random.default_rng(child) for child in seed_seq.spawn(n)]
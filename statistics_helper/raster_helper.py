@@ -0,0 +1,165 @@
+# This module contains functions for reading rasters (e.g. GeoTIFF maps) window by window, so that statistics of
+# maps which do not fit in memory can be calculated. Cells with the nodata value declared in the file are treated as
+# missing values. Statistics of maps in geographic coordinates are weighted by the area of each cell, as cells near
+# the poles cover a smaller area than cells near the equator.
+import numpy as np
+from CI_helper import QuantileSketch
+from grid_helper import cell_areas
+
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
+
+__all__ = ['Raster', 'raster_statistics']
+
+class Raster(object):
+    """
+    A band of a raster file, which is read lazily, one window of rows at a time
+    """
+
+    def __init__(self, path, band=1, window_size=2**22):
+        """
+        Input:
+            path: the path of the raster file
+            band: the number of the band to read
+            window_size: the approximate number of cells read at a time. Windows span whole rows and are aligned with
+                         the blocks in which the file is stored
+        """
+        self.path = path
+        self.dataset = gdal.Open(path)
+        if self.dataset is None:
+            raise IOError('Could not open %s' % path)
+        self.band = self.dataset.GetRasterBand(band)
+        self.shape = (self.dataset.RasterYSize, self.dataset.RasterXSize)
+        self.nodata = self.band.GetNoDataValue()
+        # The geotransform maps cell indices to coordinates: x = t[0] + col*t[1] + row*t[2], y = t[3] + col*t[4] + row*t[5]
+        self.transform = self.dataset.GetGeoTransform()
+        block_rows = self.band.GetBlockSize()[1]
+        self.window_rows = max(block_rows, window_size//self.shape[1]//block_rows*block_rows)
+        self._row_areas = None
+
+    def windows(self):
+        """
+        This function splits the raster to windows of whole rows
+        Output: generator of (first row, number of rows) of each window
+        """
+        for row in range(0, self.shape[0], self.window_rows):
+            yield row, min(self.window_rows, self.shape[0] - row)
+
+    def read(self, row=0, rows=None):
+        """
+        This function reads a window of the raster
+        Input:
+            row: the first row of the window
+            rows: the number of rows in the window. By default, all the rows from the first row
+        Output: numpy array of floats, with NaN in the cells with the nodata value of the raster. Rasters of floats
+                keep their precision, and rasters of small integers are read as 32 bit floats
+        """
+        rows = self.shape[0] - row if rows is None else rows
+        data = self.band.ReadAsArray(0, row, self.shape[1], rows)
+        if data.dtype.kind != 'f':
+            data = data.astype(np.float32 if data.dtype.itemsize <= 2 else float)
+        if self.nodata is not None:
+            data[data == self.nodata] = np.nan
+        return data
+
+    def blocks(self):
+        """
+        This function reads the raster one window at a time
+        Output: generator of (first row, data) of each window, where data is as returned by read
+        """
+        for row, rows in self.windows():
+            yield row, self.read(row, rows)
+
+    def row_areas(self, row=0, rows=None):
+        """
+        This function calculates the area of the cells in each row of a raster in geographic coordinates (degrees)
+        on a spherical earth, as the area between the latitudes of the edges of the row divided by the number of cells
+        in 360 degrees of longitude
+        Input:
+            row: the first row
+            rows: the number of rows. By default, all the rows from the first row
+        Output: numpy array of the area of a cell in each row [m^2]
+        """
+        # The areas of all the rows are calculated once, and reused for every window
+        if self._row_areas is None:
+            top = self.transform[3] + np.arange(self.shape[0])*self.transform[5]
+            bottom = top + self.transform[5]
+            self._row_areas = cell_areas(top, bottom, self.transform[1])
+        rows = self.shape[0] - row if rows is None else rows
+        return self._row_areas[row:row + rows]
+
+    def value_range(self):
+        """
+        This function returns the range of the values of the raster, from the statistics stored in the file if there
+        are any, and otherwise from an approximate scan of the raster
+        Output: the minimum and maximum of the raster
+        """
+        low, high = self.band.GetMinimum(), self.band.GetMaximum()
+        if low is None or high is None:
+            low, high = self.band.ComputeRasterMinMax(True)
+        return low, high
+
+    def mean(self, area_weighted=False, mask=None):
+        """
+        This function calculates the mean of the cells of the raster which have data, window by window
+        Input:
+            area_weighted: whether to weight each cell by its area (for rasters in geographic coordinates)
+            mask: optional mask of the cells to include (see raster_statistics)
+        Output: the mean of the raster
+        """
+        return raster_statistics(self, mask, area_weighted, quantiles=None)['mean']
+
+def _read_mask(mask, row, rows):
+    """
+    This function reads the window of a mask matching a window of a raster
+    """
+    if isinstance(mask, Raster):
+        data = mask.read(row, rows)
+        return ~np.isnan(data) & (data != 0)
+    return np.asarray(mask[row:row + rows], dtype=bool)
+
+def raster_statistics(raster, mask=None, area_weighted=True, quantiles=(2.5, 50, 97.5), bins=2**16):
+    """
+    This function calculates statistics of the cells of a raster which have data, in a single pass over the windows
+    of the raster
+    Input:
+        raster: a Raster, or the path of a raster file
+        mask: optional mask of the cells to include, e.g. a map of land or of a biome. Either a Raster with the same
+              grid, in which cells which are not 0 and not nodata are included, or a boolean numpy array
+        area_weighted: whether to weight each cell by its area (for rasters in geographic coordinates)
+        quantiles: the percentiles to calculate (between 0 and 100), or None to skip them. Percentiles are estimated
+                   from a histogram of the values with the given number of bins, spanning the range of the raster
+        bins: the number of bins in the histogram of the values
+    Output: a dictionary with the weighted mean of the raster ('mean'), the sum of the values times the weights
+            ('sum', e.g. the integral over the area of a map of values per m^2), the total weight ('weight', e.g. the
+            area with data in m^2), the number of cells with data ('count') and the percentiles ('quantiles')
+    """
+    if not isinstance(raster, Raster):
+        raster = Raster(raster)
+    sketch = None
+    if quantiles is not None:
+        low, high = raster.value_range()
+        sketch = QuantileSketch(bins, log=False, value_range=(low, high))
+
+    total = 0.
+    weight = 0.
+    count = 0
+    for row, data in raster.blocks():
+        valid = ~np.isnan(data)
+        if mask is not None:
+            valid &= _read_mask(mask, row, data.shape[0])
+        if area_weighted:
+            weights = np.broadcast_to(raster.row_areas(row, data.shape[0])[:, np.newaxis], data.shape)[valid]
+        else:
+            weights = np.ones(valid.sum())
+        values = data[valid]
+        total += values.dot(weights)
+        weight += weights.sum()
+        count += values.size
+        if sketch is not None:
+            sketch.update(values, weights)
+
+    return {'mean': total/weight, 'sum': total, 'weight': weight, 'count': count,
+            'quantiles': None if sketch is None else sketch.percentile(quantiles)}
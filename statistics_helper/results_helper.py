@@ -0,0 +1,132 @@
+# This module contains functions for storing the results of the estimates.
+# Each estimate writes the parameters it calculates as rows of a *_estimate.xlsx file, which is then read by the
+# script combining the parameters. Instead of reading, modifying and rewriting the whole workbook, scripts update
+# single rows in a SQLite database, in a transaction, so scripts writing rows of the same workbook can run
+# concurrently without losing updates. The rows of each workbook are imported from the workbook the first time it is
+# used, and are exported back to the workbooks by export_results.
+#
+# To export all the results to their workbooks, run:
+#     python statistics_helper/results_helper.py
+import os
+import json
+import sqlite3
+from contextlib import closing
+import pandas as pd
+
+__all__ = ['has_results', 'update_result', 'load_results', 'export_results']
+
+# The root of the repository
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# The path of the database
+STORE_PATH = os.environ.get('BIOMASS_RESULTS_STORE', os.path.join(ROOT, 'results.sqlite'))
+
+def _connect():
+    connection = sqlite3.connect(STORE_PATH, timeout=60, isolation_level=None)
+    connection.execute('CREATE TABLE IF NOT EXISTS results (workbook TEXT, row INTEGER, data TEXT, PRIMARY KEY (workbook, row))')
+    return connection
+
+def _key(path):
+    """
+    The key of a workbook in the database is its path relative to the root of the repository, so that scripts in
+    different directories refer to the same workbook
+    """
+    return os.path.relpath(os.path.abspath(path), ROOT)
+
+def _to_number(value):
+    """
+    Values such as "{0:.1f}".format(x) are stored as numbers, so that they can be used in calculations
+    """
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    return value
+
+def _import(connection, path):
+    """
+    This function imports the rows of a workbook into the database, if the workbook is not already in the database.
+    Must be called inside a transaction
+    """
+    key = _key(path)
+    if connection.execute('SELECT 1 FROM results WHERE workbook = ? LIMIT 1', (key,)).fetchone():
+        return
+    if os.path.exists(path):
+        data = pd.read_excel(path)
+        for row, values in zip(data.index, json.loads(data.to_json(orient='records'))):
+            connection.execute('INSERT INTO results VALUES (?, ?, ?)', (key, int(row), json.dumps(values)))
+
+def has_results(path):
+    """
+    This function checks whether the rows of a workbook are in the database
+    Input: path: the path of the workbook
+    Output: True if the database contains rows of the workbook
+    """
+    if not os.path.exists(STORE_PATH):
+        return False
+    with closing(_connect()) as connection:
+        return connection.execute('SELECT 1 FROM results WHERE workbook = ? LIMIT 1', (_key(path),)).fetchone() is not None
+
+def update_result(path, row, values):
+    """
+    This function sets a single row of the results of a workbook
+    Input:
+        path: the path of the workbook (e.g. '../marine_prok_biomass_estimate.xlsx')
+        row: the number of the row
+        values: a dictionary of the values in the row, keyed by column (e.g. 'Parameter', 'Value', 'Units', 'Uncertainty')
+    """
+    data = json.dumps({column: _to_number(value) for column, value in dict(values).items()})
+    with closing(_connect()) as connection:
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            _import(connection, path)
+            connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)', (_key(path), int(row), data))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+def load_results(path, rows=None):
+    """
+    This function loads the results of a workbook
+    Input:
+        path: the path of the workbook
+        rows: optional list of the numbers of the rows to load
+    Output: pandas DataFrame with the rows of the workbook, like pd.read_excel(path)
+    """
+    with closing(_connect()) as connection:
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            _import(connection, path)
+            records = connection.execute('SELECT row, data FROM results WHERE workbook = ? ORDER BY row', (_key(path),)).fetchall()
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+    if rows is not None:
+        records = [record for record in records if record[0] in rows]
+    return pd.DataFrame([json.loads(data) for row, data in records], index=[row for row, data in records])
+
+def export_results(paths=None):
+    """
+    This function writes the results in the database to their workbooks
+    Input: paths: optional list of paths of workbooks to export. By default all the workbooks in the database are exported
+    Output: the list of paths of the exported workbooks
+    """
+    if not os.path.exists(STORE_PATH):
+        return []
+    if paths is None:
+        with closing(_connect()) as connection:
+            keys = [key for key, in connection.execute('SELECT DISTINCT workbook FROM results ORDER BY workbook')]
+        paths = [os.path.join(ROOT, key) for key in keys]
+    for path in paths:
+        load_results(path).to_excel(path, index=False)
+    return paths
+
+if __name__ == '__main__':
+    for path in export_results():
+        print('Exported %s' % os.path.relpath(path, ROOT))
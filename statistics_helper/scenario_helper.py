@@ -0,0 +1,153 @@
+# This module contains a registry of the global constants which are shared by several estimates (e.g. the surface
+# area of the ocean), and functions for evaluating estimates over scenarios of these constants. Estimates built with
+# estimate_helper refer to registered constants as named parameters, so a whole grid or Latin hypercube of scenarios
+# is calculated in a single pass, by substituting an array with the value of each constant in every scenario.
+import weakref
+import numpy as np
+import pandas as pd
+from scipy.stats import gmean
+from random_helper import get_rng
+from estimate_helper import parameter, _GraphModel, _graph_parameters
+
+__all__ = ['Constant', 'CONSTANTS', 'register_constant', 'get_constant', 'constant_parameter', 'latin_hypercube',
+           'scenario_design', 'sweep']
+
+class Constant(object):
+    """
+    A global constant used in the estimates
+    """
+
+    def __init__(self, value, units, description, bounds=None):
+        """
+        Input:
+            value: the value used in the estimates
+            units: the units of the value
+            description: a short description of the constant and its source
+            bounds: optional (low, high) range of plausible values, used as the default range of sweeps
+        """
+        self.value = float(value)
+        self.units = units
+        self.description = description
+        self.bounds = bounds
+
+CONSTANTS = {
+    'ocean_area': Constant(3.6e14, 'm^2', 'The surface area of the ocean'),
+    'land_area': Constant(1.3e14, 'm^2', 'The area of ice-free land surface'),
+    'plant_biomass': Constant(450e15, 'g C', 'The total biomass of plants, based on Erb et al.'),
+    'wet_weight_carbon_fraction': Constant(0.15, '', 'The fraction of carbon out of the wet weight of animals'),
+    'jackson_beta': Constant(0.966, '', 'The beta coefficient of the vertical distribution of roots in Jackson et al.'),
+    'groundwater_scaling_factor': Constant(gmean([1, 100, 1000]), '',
+                                           'The scaling factor from the number of cells in groundwater to the number '
+                                           'of cells relevant for the number of phages in the terrestrial deep '
+                                           'subsurface', bounds=(1, 1000)),
+}
+
+# The parameters of the registered constants which are in use, so that all the estimates share one parameter for
+# each constant
+_parameters = weakref.WeakValueDictionary()
+
+def register_constant(name, value, units, description, bounds=None):
+    """
+    This function adds a constant to the registry, or replaces the registered constant with the same name
+    Input: the name of the constant, and the inputs of Constant
+    Output: the Constant
+    """
+    CONSTANTS[name] = Constant(value, units, description, bounds)
+    return CONSTANTS[name]
+
+def get_constant(name):
+    """
+    This function returns the value of a registered constant
+    Input: name: the name of the constant
+    Output: the value of the constant
+    """
+    if name not in CONSTANTS:
+        raise KeyError('Unknown constant %s, registered constants are: %s' % (name, ', '.join(sorted(CONSTANTS))))
+    return CONSTANTS[name].value
+
+def constant_parameter(name):
+    """
+    This function returns a registered constant as a parameter of an estimate without uncertainty, named after the
+    constant, so that its value can be substituted in sweeps. All the calls with the same name return the same
+    parameter, unless the constant was registered again with a different value
+    Input: name: the name of the constant
+    Output: an Estimate
+    """
+    existing = _parameters.get(name)
+    if existing is None or existing.parameter.value != get_constant(name):
+        existing = parameter(get_constant(name), distribution='fixed', name=name)
+        _parameters[name] = existing
+    return existing
+
+def latin_hypercube(scenarios, dimensions, rng=None):
+    """
+    This function samples a Latin hypercube in the unit cube: the range of each dimension is divided to as many
+    equal strata as there are scenarios, and each stratum of each dimension is sampled exactly once
+    Input:
+        scenarios: the number of scenarios
+        dimensions: the number of dimensions
+        rng: optional numpy Generator or seed. If not provided, a new stream is taken from random_helper
+    Output: numpy array of shape (scenarios, dimensions) with values between 0 and 1
+    """
+    rng = get_rng(rng)
+    strata = rng.permuted(np.tile(np.arange(scenarios), (dimensions, 1)), axis=1).T
+    return (strata + rng.random((scenarios, dimensions)))/scenarios
+
+def scenario_design(ranges, scenarios=10000, design='lhs', log=(), rng=None):
+    """
+    This function generates scenarios of the values of constants
+    Input:
+        ranges: dictionary of the (low, high) range of each constant to vary, keyed by name. A range of None uses the
+                bounds of the registered constant
+        scenarios: for 'lhs', the number of scenarios. For 'grid', the number of values of each constant, so the
+                   number of scenarios is scenarios**len(ranges)
+        design: 'lhs' for a Latin hypercube, or 'grid' for a full grid of evenly spaced values
+        log: the names of the constants which are varied on a log scale (e.g. constants spanning orders of magnitude)
+    Output: pandas DataFrame with the value of each constant in each scenario
+    """
+    names = list(ranges)
+    if design == 'lhs':
+        unit = latin_hypercube(scenarios, len(names), rng)
+    elif design == 'grid':
+        points = np.linspace(0, 1, scenarios)
+        unit = np.stack(np.meshgrid(*[points]*len(names), indexing='ij'), axis=-1).reshape(-1, len(names))
+    else:
+        raise ValueError('Unknown design %s' % design)
+
+    columns = {}
+    for i, name in enumerate(names):
+        bounds = ranges[name] if ranges[name] is not None else CONSTANTS[name].bounds
+        if bounds is None:
+            raise ValueError('No range was given for %s, which has no registered bounds' % name)
+        low, high = bounds
+        if name in log:
+            columns[name] = np.exp(np.log(low) + unit[:, i]*np.log(high/low))
+        else:
+            columns[name] = low + unit[:, i]*(high - low)
+    return pd.DataFrame(columns)
+
+def sweep(estimates, ranges, scenarios=10000, design='lhs', log=(), rng=None):
+    """
+    This function calculates estimates for scenarios of the values of constants. All the scenarios are calculated in a
+    single evaluation of the estimates, with arrays of the values of the constants, and parameters which are not
+    varied are set to their best estimates. For example:
+
+        ocean_area = constant_parameter('ocean_area')
+        cells = parameter(1.2e29, 1.8, name='marine cells')*ocean_area/get_constant('ocean_area')
+        table = sweep({'cells': cells}, {'ocean_area': (3.5e14, 3.7e14)})
+
+    Input:
+        estimates: an Estimate, or a dictionary of estimates keyed by name
+        ranges, scenarios, design, log: see scenario_design
+        rng: optional numpy Generator or seed used for Latin hypercubes
+    Output: pandas DataFrame with the value of each constant and of each estimate in each scenario
+    """
+    estimates = estimates if isinstance(estimates, dict) else {'estimate': estimates}
+    table = scenario_design(ranges, scenarios, design, log, rng)
+    values = {name: table[name].values for name in table}
+    for name, leaf in _graph_parameters(estimates.values()).items():
+        values.setdefault(name, leaf.parameter.value)
+    outputs = _GraphModel(estimates)(values)
+    for name, output in outputs.items():
+        table[name] = np.broadcast_to(output, (len(table),))
+    return table
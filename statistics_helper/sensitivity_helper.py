@@ -0,0 +1,173 @@
+# This module contains functions for global sensitivity analysis of the estimates, which tell which parameters drive
+# the uncertainty of an estimate. We calculate the first order Sobol index of each parameter (the fraction of the
+# variance of the estimate explained by the parameter alone) and its total order index (the fraction of the variance
+# which involves the parameter, including its interactions with the other parameters), with the estimators of
+# Saltelli et al. (2010). These use two independent matrices of samples of the parameters, A and B, and for each
+# parameter a matrix A_B in which the column of the parameter is taken from B, so the model is evaluated
+# N*(d+2) times for N samples of d parameters. Samples are drawn in chunks, and each chunk only keeps the sums needed
+# for the estimators, so the chunks can be run in several processes and their sums added.
+import numpy as np
+import pandas as pd
+from random_helper import spawn_rngs
+from parallel_helper import parallel_map
+from monte_carlo_helper import _as_parameter, _as_dict
+from estimate_helper import _graph_parameters
+
+class _ModelEvaluator(object):
+    """
+    Evaluates a model function as in monte_carlo_helper.propagate
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def base(self, values):
+        return _as_dict(self.model(values)), None
+
+    def mixed(self, values, name, state):
+        return _as_dict(self.model(values))
+
+class _GraphEvaluator(object):
+    """
+    Evaluates estimates built with estimate_helper. The values of the nodes calculated from the base samples (A) are
+    kept, and when the samples of one parameter are replaced (A_B), only the nodes which depend on this parameter are
+    calculated again
+    """
+
+    def __init__(self, estimates):
+        self.estimates = estimates
+        self.leaves = None
+
+    def __getstate__(self):
+        # Nodes are identified by their id, which changes when the graph is sent to another process
+        return {'estimates': self.estimates, 'leaves': None}
+
+    def base(self, values):
+        if self.leaves is None:
+            # The parameters each node of the graphs depends on, keyed by the id of the node as in Estimate._evaluate
+            self.leaves = {}
+            stack = list(self.estimates.values())
+            while stack:
+                node = stack.pop()
+                if id(node) not in self.leaves:
+                    self.leaves[id(node)] = node.leaves
+                    stack.extend(node.args)
+        cache = {}
+        return {output: estimate._evaluate(values, cache) for output, estimate in self.estimates.items()}, cache
+
+    def mixed(self, values, name, cache):
+        cache = {key: value for key, value in cache.items() if name not in self.leaves[key]}
+        return {output: estimate._evaluate(values, cache) for output, estimate in self.estimates.items()}
+
+def _sobol_chunk(evaluator, parameters, names, size, rng, centers, scales):
+    """
+    This function draws one chunk of the sample matrices A and B, evaluates the model for A, B and A_B of each
+    parameter, and returns the sums of the estimators for each output. Outputs are centered on the point estimate and
+    divided by its magnitude, which does not change the indices but avoids losing precision in the sums of squares
+    """
+    samples_A = {name: p.sample(size, rng) for name, p in parameters.items()}
+    samples_B = {name: p.sample(size, rng) for name, p in parameters.items()}
+    normalize = lambda outputs: {output: (np.broadcast_to(value, (size,)) - centers[output])/scales[output]
+                                 for output, value in outputs.items()}
+    outputs_A, state = evaluator.base(samples_A)
+    outputs_A = normalize(outputs_A)
+    outputs_B = normalize(evaluator.base(samples_B)[0])
+
+    sums = {output: {'count': 2*size,
+                     'sum': outputs_A[output].sum() + outputs_B[output].sum(),
+                     'sum_squares': outputs_A[output].dot(outputs_A[output]) + outputs_B[output].dot(outputs_B[output]),
+                     'first': np.zeros(len(names)),
+                     'total': np.zeros(len(names))} for output in outputs_A}
+    for i, name in enumerate(names):
+        # A_B: the samples of A, with the samples of one parameter taken from B
+        samples_AB = dict(samples_A)
+        samples_AB[name] = samples_B[name]
+        outputs_AB = normalize(evaluator.mixed(samples_AB, name, state))
+        for output, value in outputs_AB.items():
+            difference = outputs_A[output] - value
+            # Saltelli et al. (2010) estimator of the first order variance, and Jansen estimator of the total order
+            sums[output]['first'][i] += outputs_B[output].dot(-difference)
+            sums[output]['total'][i] += difference.dot(difference)
+    return sums
+
+def _add_sums(chunks):
+    """
+    This function adds the sums of the estimators of several chunks
+    """
+    totals = chunks[0]
+    for sums in chunks[1:]:
+        for output in totals:
+            for key in totals[output]:
+                totals[output][key] = totals[output][key] + sums[output][key]
+    return totals
+
+def _sobol_chunks(args):
+    evaluator, parameters, names, sizes, rngs, centers, scales = args
+    return _add_sums([_sobol_chunk(evaluator, parameters, names, size, rng, centers, scales)
+                      for size, rng in zip(sizes, rngs)])
+
+def _sobol(evaluator, parameters, sample_size, chunk_size, jobs, rng):
+    parameters = {name: _as_parameter(p) for name, p in sorted(parameters.items())}
+    # Parameters without uncertainty do not contribute to the variance, so they are not varied
+    names = [name for name, p in parameters.items() if p.distribution != 'fixed']
+
+    point = evaluator.base({name: np.array([p.value]) for name, p in parameters.items()})[0]
+    centers = {output: float(np.ravel(value)[0]) for output, value in point.items()}
+    scales = {output: abs(center) if center != 0 else 1. for output, center in centers.items()}
+
+    sizes = [min(chunk_size, sample_size - start) for start in range(0, sample_size, chunk_size)]
+    rngs = spawn_rngs(len(sizes), rng)
+    groups = min(jobs, len(sizes))
+    jobs_args = [(evaluator, parameters, names, sizes[i::groups], rngs[i::groups], centers, scales)
+                 for i in range(groups)]
+    totals = _add_sums(parallel_map(_sobol_chunks, jobs_args, jobs=jobs))
+
+    results = {}
+    for output, sums in totals.items():
+        mean = sums['sum']/sums['count']
+        variance = sums['sum_squares']/sums['count'] - mean**2
+        # The first and total order sums have one term per sample of A
+        samples = sums['count']/2
+        results[output] = pd.DataFrame({'First order': sums['first']/samples/variance,
+                                        'Total order': sums['total']/samples/2/variance},
+                                       index=pd.Index(names, name='Parameter'))
+    return results[None] if list(results) == [None] else results
+
+def sobol_indices(model, parameters, sample_size=100000, chunk_size=10000, jobs=1, rng=None):
+    """
+    This function calculates the first and total order Sobol indices of the parameters of a model. The model is
+    evaluated N*(d+2) times for N samples of the d parameters with uncertainty, in vectorized chunks
+    Input:
+        model: a function which receives a dictionary of numpy arrays of samples of the parameters and returns an
+               array of samples of its output, or a dictionary of outputs (see monte_carlo_helper.propagate)
+        parameters: dictionary of the parameters of the model, keyed by name (see monte_carlo_helper.propagate)
+        sample_size: the number of samples N in each of the matrices A and B
+        chunk_size: the number of samples drawn at a time, which bounds the memory use
+        jobs: the number of processes to run the chunks in
+        rng: optional numpy Generator or seed. If not provided, a new stream is taken from random_helper
+    Output: pandas DataFrame of the first order ('First order') and total order ('Total order') index of each
+            parameter, or a dictionary of DataFrames for models with several outputs
+    """
+    return _sobol(_ModelEvaluator(model), parameters, sample_size, chunk_size, jobs, rng)
+
+def estimate_sensitivity(estimates, sample_size=100000, chunk_size=10000, jobs=1, rng=None):
+    """
+    This function calculates the first and total order Sobol indices of the parameters of estimates built with
+    estimate_helper. The values of the nodes of the graph calculated for the base samples are reused, so for each
+    parameter only the part of the graph which depends on it is calculated again. For example, to find which
+    parameters drive the uncertainty of a total:
+
+        cells = parameter(1.2e29, 1.5, name='cell number')*parameter(0.7, 1.3, name='FISH yield correction')
+        total = cells + parameter(3e29, 4, name='other')
+        estimate_sensitivity({'total': total})['total']
+
+    Input:
+        estimates: an Estimate, or a dictionary of estimates keyed by name
+        other inputs: see sobol_indices
+    Output: pandas DataFrame of the first and total order index of each parameter, or a dictionary of DataFrames
+            keyed by the names of the estimates
+    """
+    single = not isinstance(estimates, dict)
+    estimates = {None: estimates} if single else estimates
+    parameters = {name: leaf.parameter for name, leaf in _graph_parameters(estimates.values()).items()}
+    return _sobol(_GraphEvaluator(estimates), parameters, sample_size, chunk_size, jobs, rng)
@@ -0,0 +1,140 @@
+# This module contains functions for calculating statistics of rasters within zones, such as biomes, given by a
+# classified raster on the same grid. The classified raster is read once into an index of the zone of each cell, and
+# the statistics of all the zones are then calculated together in a single pass over each raster, with np.bincount.
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from raster_helper import Raster
+
+class ZoneIndex(object):
+    """
+    The zone of each cell of a classified raster, with the area of each zone
+    """
+
+    def __init__(self, labels, names=None, area_weighted=True, path=None):
+        """
+        Input:
+            labels: a Raster (or the path of a raster file) of non-negative integer zone labels. Cells with nodata do
+                    not belong to any zone
+            names: optional dictionary of the names of the zones (e.g. biomes), keyed by label
+            area_weighted: whether to weight each cell by its area (for rasters in geographic coordinates). Otherwise
+                           the area of each cell is 1
+            path: optional path of a .npy file to keep the zone of each cell in. By default, a temporary file is used,
+                  which is removed along with the index
+        """
+        self.raster = labels if isinstance(labels, Raster) else Raster(labels)
+        self.names = names
+        self.area_weighted = area_weighted
+        self.windows = list(self.raster.windows())
+
+        # Find the largest label first, so the zones are kept in the smallest integer type which holds them
+        largest = -1
+        for row, data in self.raster.blocks():
+            valid = ~np.isnan(data)
+            if np.any(data[valid] < 0):
+                raise ValueError('Zone labels must be non-negative integers')
+            if np.any(valid):
+                largest = max(largest, int(data[valid].max()))
+        self.bins = largest + 2
+
+        # The label of each cell plus 1, so that cells without a zone are counted in bin 0. Rasters can have billions
+        # of cells, so the codes are kept in a file mapped to memory, and read window by window
+        if path is None:
+            self._directory = tempfile.TemporaryDirectory()
+            path = os.path.join(self._directory.name, 'zones.npy')
+        self.codes = np.lib.format.open_memmap(path, mode='w+', dtype=np.min_scalar_type(self.bins - 1),
+                                               shape=self.raster.shape)
+        for row, data in self.raster.blocks():
+            self.codes[row:row + data.shape[0]] = np.where(np.isnan(data), 0, data + 1)
+        self.codes.flush()
+        self.areas = self._bincount(lambda row, rows, weights: weights, self.raster)
+
+    def _weights(self, row, rows):
+        if self.area_weighted:
+            return np.broadcast_to(self.raster.row_areas(row, rows)[:, np.newaxis], (rows, self.raster.shape[1]))
+        return np.ones((rows, self.raster.shape[1]))
+
+    def _check_grid(self, raster):
+        if raster.shape != self.raster.shape:
+            raise ValueError('The raster %s and the zones %s have different grids' % (raster.path, self.raster.path))
+
+    def _bincount(self, weigh, raster):
+        """
+        This function sums weights of the cells of each zone, window by window
+        Input:
+            weigh: function of (first row, number of rows, area of each cell) returning the weights of the cells in a
+                   window
+            raster: the raster the weights are calculated from, which must have the same grid as the zones
+        Output: numpy array of the sum of the weights in each zone, indexed by label plus 1
+        """
+        self._check_grid(raster)
+        total = np.zeros(self.bins)
+        for row, rows in self.windows:
+            codes = self.codes[row:row + rows]
+            total += np.bincount(codes.ravel(), weights=np.ravel(weigh(row, rows, self._weights(row, rows))),
+                                 minlength=self.bins)
+        return total
+
+    def _series(self, values, name):
+        """
+        This function converts an array of values for each label plus 1 to a pandas Series indexed by zone
+        """
+        labels = np.flatnonzero(self.areas[1:] > 0)
+        index = [self.names.get(label, label) for label in labels] if self.names is not None else labels
+        return pd.Series(values[labels + 1], index=index, name=name)
+
+    def area(self):
+        """
+        Output: pandas Series of the area of each zone [m^2 for rasters in geographic coordinates]
+        """
+        return self._series(self.areas, 'Area [m^2]')
+
+    def sum(self, raster):
+        """
+        This function calculates the sum of a raster in each zone, weighted by the area of each cell (e.g. the total
+        biomass of each zone from a map of biomass per m^2). Cells with nodata are ignored
+        Input: raster: a Raster (or the path of a raster file) with the same grid as the zones
+        Output: pandas Series of the sum in each zone
+        """
+        raster = raster if isinstance(raster, Raster) else Raster(raster)
+        read = lambda row, rows, weights: np.nan_to_num(raster.read(row, rows))*weights
+        return self._series(self._bincount(read, raster), raster.path)
+
+    def mean(self, raster):
+        """
+        This function calculates the mean of a raster in each zone, weighted by the area of each cell with data
+        Input: raster: a Raster (or the path of a raster file) with the same grid as the zones
+        Output: pandas Series of the mean in each zone
+        """
+        raster = raster if isinstance(raster, Raster) else Raster(raster)
+        self._check_grid(raster)
+        totals = np.zeros(self.bins)
+        areas = np.zeros(self.bins)
+        for row, rows in self.windows:
+            codes = self.codes[row:row + rows]
+            data = raster.read(row, rows)
+            valid = ~np.isnan(data)
+            weights = self._weights(row, rows)*valid
+            totals += np.bincount(codes.ravel(), weights=np.where(valid, data, 0.).ravel()*weights.ravel(), minlength=self.bins)
+            areas += np.bincount(codes.ravel(), weights=weights.ravel(), minlength=self.bins)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._series(totals/areas, raster.path)
+
+def zonal_statistics(labels, rasters=None, names=None, area_weighted=True):
+    """
+    This function calculates the area of each zone of a classified raster, and the mean of several rasters in each
+    zone, e.g. the area of each biome and the mean of covariates in each biome
+    Input:
+        labels: a Raster (or the path of a raster file) of non-negative integer zone labels, or a ZoneIndex
+        rasters: optional dictionary of rasters (or paths of raster files) with the same grid, keyed by name
+        names: optional dictionary of the names of the zones, keyed by label
+        area_weighted: whether to weight each cell by its area
+    Output: pandas DataFrame indexed by zone, with the area of each zone ('Area [m^2]') and the mean of each raster
+    """
+    index = labels if isinstance(labels, ZoneIndex) else ZoneIndex(labels, names, area_weighted)
+    result = index.area().to_frame()
+    for name, raster in (rasters or {}).items():
+        result[name] = index.mean(raster)
+    result.index.name = 'Zone'
+    return result
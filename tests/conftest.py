@@ -0,0 +1,5 @@
+# The statistics helpers are imported as top-level modules, as in the notebooks
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'statistics_helper'))
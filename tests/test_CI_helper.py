@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import gmean
+from CI_helper import CI_sum_prop, geo_CI_calc, grouped_geo_CI_calc
+
+@pytest.mark.parametrize('mul_CIs', [[2], [2, 2, 2, 2]])
+def test_CI_sum_prop_requires_a_CI_for_each_estimate(mul_CIs):
+    with pytest.raises(ValueError):
+        CI_sum_prop([1, 1, 1], mul_CIs)
+
+def test_CI_sum_prop_chunked():
+    full = CI_sum_prop(np.array([1., 2., 3.]), np.array([2., 3., 1.5]), rng=0)
+    chunked = CI_sum_prop(np.array([1., 2., 3.]), np.array([2., 3., 1.5]), chunk_size=10000, rng=0)
+    assert chunked == pytest.approx(full, rel=0.02)
+
+def test_grouped_geo_CI_calc_matches_groupby_apply():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'Study': rng.integers(0, 6, 300), 'Value': rng.lognormal(0, 1, 300)})
+    # A study without values, which has NaN mean and CI in both calculations
+    data.loc[data['Study'] == 5, 'Value'] = np.nan
+    groups = data.groupby('Study')['Value']
+    keys, mean, mul_CI = grouped_geo_CI_calc(data['Value'].values, groups.ngroup().values)
+    np.testing.assert_allclose(mean, groups.apply(gmean).values, rtol=1e-12)
+    np.testing.assert_allclose(mul_CI, groups.apply(geo_CI_calc).values, rtol=1e-12)
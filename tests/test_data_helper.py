@@ -0,0 +1,37 @@
+import os
+import pandas as pd
+import data_helper
+from data_helper import read_csv
+
+def test_cache_keeps_only_the_current_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_helper, '_memory', {})
+    path = tmp_path/'data.csv'
+    path.write_text('a,b\n1,2\n')
+    assert read_csv(str(path))['b'].tolist() == [2]
+    path.write_text('a,b\n1,3\n3,4\n')
+    assert read_csv(str(path))['b'].tolist() == [3, 4]
+    cached = os.listdir(tmp_path/data_helper.CACHE_DIR)
+    assert cached == [os.path.basename(data_helper._cache_path(str(path), None, {})[0])]
+
+def test_saving_does_not_remove_copies_of_the_current_version(tmp_path):
+    path = tmp_path/'data.csv'
+    path.write_text('a,b\n1,2\n')
+    cache_path, prefix = data_helper._cache_path(str(path), None, {})
+    os.makedirs(os.path.dirname(cache_path))
+    # A copy of the current version written by another process, and a copy of an older version
+    other = cache_path.rsplit('.', 1)[0] + '.pkl'
+    old = prefix + '0'*16 + '.pkl'
+    for copy in {other, old}:
+        pd.DataFrame({'a': [1]}).to_pickle(copy)
+    data_helper._save(pd.DataFrame({'a': [1]}), cache_path, prefix)
+    assert os.path.exists(other)
+    assert os.path.exists(cache_path)
+    assert not os.path.exists(old)
+
+def test_cached_files_removed_while_loading(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_helper, '_memory', {})
+    path = tmp_path/'data.csv'
+    path.write_text('a,b\n1,2\n')
+    # The cached file is found, but removed by another process before it is read
+    monkeypatch.setattr(data_helper.os.path, 'exists', lambda p: True)
+    assert read_csv(str(path))['b'].tolist() == [2]
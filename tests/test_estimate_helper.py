@@ -0,0 +1,34 @@
+import pytest
+from estimate_helper import parameter, propagate_estimates
+from scenario_helper import constant_parameter, sweep
+
+def test_parameters_with_the_same_name_do_not_share_nodes():
+    first = parameter(5, name='x')*2
+    second = parameter(10, name='x')*2
+    assert first.value == 10
+    assert second.value == 20
+
+def test_two_parameters_with_the_same_name_in_one_graph():
+    estimate = parameter(5, name='y') + parameter(10, name='y')
+    with pytest.raises(ValueError):
+        estimate.evaluate()
+    with pytest.raises(ValueError):
+        propagate_estimates({'a': parameter(5, name='z'), 'b': parameter(10, name='z')}, sample_size=10)
+
+def test_constant_parameters_are_shared():
+    area = constant_parameter('ocean_area')*2 + constant_parameter('ocean_area')
+    table = sweep(area, {'ocean_area': (1., 2.)}, 3, 'grid')
+    assert list(table['estimate']) == [3., 4.5, 6.]
+
+def test_shared_subexpressions_are_built_in_linear_time():
+    x = parameter(1, 2, name='shared')
+    for _ in range(60):
+        x = x*1.0001 + x
+    assert x.value == pytest.approx(2.0001**60)
+
+def test_long_chains_do_not_reach_the_recursion_limit():
+    y = parameter(1, 2, name='chain')
+    for _ in range(5000):
+        y = y + 1
+    assert y.value == 5001
+    assert y.samples(10, rng=0).min() > 5000
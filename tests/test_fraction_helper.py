@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+import fraction_helper
+from fraction_helper import frac_mean, frac_CI, grouped_frac_mean, grouped_frac_CI
+
+# The kernels of the moments of log(f/(1-f)): the loop compiled with numba (run by the interpreter when numba is not
+# installed) and the numpy fallback
+KERNELS = [fraction_helper._logit_moments_loop, fraction_helper._logit_moments_numpy]
+if fraction_helper.numba is not None:
+    KERNELS.append(fraction_helper._logit_moments)
+
+EDGE_CASES = [
+    ([0.1, 0.2, 0.3], None),
+    ([0., 0.2], None),
+    ([0.2, 1.], None),
+    ([0., 1.], None),
+    ([0.2, np.nan], None),
+    ([0.1, 0.2, 0.3], [0., 1., 2.]),
+    ([0., 0.2, 0.3], [0., 1., 2.]),
+    ([0., 0.2, 0.3], [1., 1., 2.]),
+    ([0.1, 0.2], [0., 0.]),
+]
+
+@pytest.mark.parametrize('fractions, weights', EDGE_CASES)
+def test_kernels_agree(fractions, weights):
+    fractions = np.array(fractions)
+    weights = fraction_helper._NO_WEIGHTS if weights is None else np.array(weights)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = fraction_helper._logit_moments_numpy(fractions, weights)
+        for kernel in KERNELS:
+            np.testing.assert_allclose(kernel(fractions, weights), expected, rtol=1e-12, equal_nan=True)
+
+def test_zero_fraction_mean():
+    assert frac_mean(np.array([0., 0.2])) == 0.
+
+def test_pandas_missing_values():
+    # The results of the implementation before the fused kernels, which ignored missing values in pandas objects
+    fractions = pd.Series([0.1, 0.2, np.nan, 0.3])
+    assert frac_mean(fractions) == pytest.approx(0.1858902206677232, rel=1e-12)
+    assert frac_CI(fractions) == pytest.approx(1.712742494893083, rel=1e-12)
+    assert np.isnan(frac_mean(fractions.values))
+
+def test_pandas_missing_values_weighted():
+    fractions = pd.Series([0.1, 0.2, np.nan, 0.3])
+    weights = np.array([1., 2., 5., 3.])
+    valid = fractions.notna().values
+    assert frac_mean(fractions, weights) == pytest.approx(frac_mean(fractions.values[valid], weights[valid]), rel=1e-12)
+    assert frac_CI(fractions, weights) == pytest.approx(frac_CI(fractions.values[valid], weights[valid]), rel=1e-12)
+
+def test_frac_CI_options_are_keyword_only():
+    fractions = np.array([0.1, 0.2, 0.3])
+    with pytest.raises(TypeError):
+        frac_CI(fractions, None, False)
+    assert frac_CI(fractions, analytic=False, rng=0) == pytest.approx(frac_CI(fractions), rel=0.1)
+
+def test_grouped_kernels_match_groupby_apply():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'Study': rng.integers(0, 5, 200), 'Fraction': rng.uniform(0.01, 0.6, 200)})
+    groups = data.groupby('Study')
+    keys, mean, mul_CI = grouped_frac_CI(data['Fraction'].values, groups.ngroup().values)
+    np.testing.assert_allclose(grouped_frac_mean(data['Fraction'].values, groups.ngroup().values)[1], mean)
+    np.testing.assert_allclose(mean, groups['Fraction'].apply(frac_mean).values, rtol=1e-12)
+    np.testing.assert_allclose(mul_CI, groups['Fraction'].apply(frac_CI).values, rtol=1e-12)
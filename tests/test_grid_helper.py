@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from grid_helper import Grid, EARTH_RADIUS, gridded_estimate
+
+SPHERE_AREA = 4*np.pi*EARTH_RADIUS**2
+
+@pytest.mark.parametrize('resolution', [1., (0.5, 2.), (3., 0.25), (0.7, 1.1)])
+def test_cell_areas_cover_the_sphere(resolution):
+    grid = Grid(resolution)
+    assert grid.row_areas.sum()*grid.shape[1] == pytest.approx(SPHERE_AREA, rel=1e-12)
+
+def test_rectangular_cells():
+    grid = Grid((0.5, 2.), depth_edges=[0, 200, 1000])
+    assert grid.shape == (360, 180, 2)
+    np.testing.assert_allclose(np.diff(grid.lat_edges), -0.5)
+    np.testing.assert_allclose(np.diff(grid.lon_edges), 2.)
+    total, _ = gridded_estimate(lambda c: np.ones_like(c['lat']*c['lon']*c['top']), grid, chunk_rows=50)
+    assert total == pytest.approx(2*SPHERE_AREA, rel=1e-12)
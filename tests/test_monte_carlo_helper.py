@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from monte_carlo_helper import Parameter, propagate, sketch_CI
+
+def _model(p):
+    return p['x']
+
+def test_propagate_normal_outputs_keep_nonpositive_samples():
+    # A normal parameter centered on zero has half of its samples below zero, which log-spaced bins cannot hold
+    sketch = propagate(lambda p: p['x'], {'x': Parameter(0, 1.96, 'normal')}, sample_size=200000, rng=0)
+    assert not sketch.log
+    assert sketch.total == 200000
+    np.testing.assert_allclose(sketch.percentile([2.5, 50, 97.5]), [-1.96, 0, 1.96], atol=0.03)
+    with pytest.raises(ValueError):
+        sketch_CI(sketch)
+
+def test_propagate_keeps_log_bins_for_positive_outputs():
+    sketches = propagate(lambda p: {'positive': p['x'], 'shifted': p['x'] - 1},
+                         {'x': Parameter(1, 2)}, sample_size=100000, rng=0)
+    assert sketches['positive'].log
+    assert not sketches['shifted'].log
+    np.testing.assert_allclose(sketches['positive'].percentile([2.5, 97.5]), [0.5, 2], rtol=0.02)
+    np.testing.assert_allclose(sketches['shifted'].percentile([2.5, 97.5]), [-0.5, 1], atol=0.02)
+    np.testing.assert_allclose(sketch_CI(sketches['positive']), 2, rtol=0.05)
+
+def test_propagate_does_not_depend_on_jobs():
+    parameters = {'x': Parameter(0, 1, 'normal')}
+    serial = propagate(_model, parameters, sample_size=50000, chunk_size=10000, rng=1)
+    parallel = propagate(_model, parameters, sample_size=50000, chunk_size=10000, jobs=2, rng=1)
+    np.testing.assert_allclose(serial.percentile([2.5, 97.5]), parallel.percentile([2.5, 97.5]))
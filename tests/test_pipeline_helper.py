@@ -0,0 +1,71 @@
+import os
+from types import SimpleNamespace
+import pytest
+import pipeline_helper
+from pipeline_helper import Step, BuildCache, run
+
+def _steps(deps):
+    steps = {}
+    for name, step_deps in deps.items():
+        step = Step(os.path.join(pipeline_helper.ROOT, name), set(), set(), [])
+        step.deps = set(step_deps)
+        steps[step.name] = step
+    return steps
+
+def _runner(step, env=None):
+    return SimpleNamespace(returncode=1 if 'fail' in step.name else 0)
+
+@pytest.fixture(autouse=True)
+def no_export(monkeypatch):
+    monkeypatch.setattr(pipeline_helper.results_helper, 'export_results', lambda: None)
+
+def test_run_follows_dependencies():
+    steps = _steps({'a.py': [], 'b.py': ['a.py'], 'fail.py': [], 'c.py': ['fail.py']})
+    status = run(steps, jobs=2, runner=_runner, log=lambda message: None)
+    assert status == {'a.py': 'ok', 'b.py': 'ok', 'fail.py': 'failed', 'c.py': 'skipped'}
+
+def test_run_raises_on_circular_dependency():
+    steps = _steps({'a.py': [], 'b.py': ['c.py'], 'c.py': ['b.py']})
+    with pytest.raises(ValueError, match='b.py, c.py'):
+        run(steps, jobs=2, runner=_runner, log=lambda message: None)
+
+def test_forced_runs_update_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_helper.results_helper, 'STORE_PATH', str(tmp_path/'results.sqlite'))
+    script = tmp_path/'a.py'
+    script.write_text('x = 1\n')
+    step = Step(str(script), set(), set(), [])
+    calls = []
+    runner = lambda step, env=None: calls.append(step.name) or SimpleNamespace(returncode=0)
+
+    cache = BuildCache(str(tmp_path/'cache.json'))
+    cache.runner(runner)(step)
+    assert cache.runner(runner)(step).cached
+    assert len(calls) == 1
+
+    # A forced run runs the step even though it did not change, and records it for later runs
+    cache.runner(runner, force=True)(step)
+    assert len(calls) == 2
+    script.write_text('x = 2\n')
+    cache.runner(runner, force=True)(step)
+    assert BuildCache(str(tmp_path/'cache.json')).entries[step.name]['fingerprint'] == cache.fingerprint(step)
+    assert cache.runner(runner)(step).cached
+    assert len(calls) == 3
+
+def test_file_hashes_are_memoized(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_helper.results_helper, 'STORE_PATH', str(tmp_path/'results.sqlite'))
+    path = tmp_path/'data.csv'
+    path.write_text('a,b\n1,2\n')
+    first = pipeline_helper.file_hash(str(path))
+    reads = []
+    monkeypatch.setattr(pipeline_helper, 'open', lambda *args: reads.append(args) or open(*args), raising=False)
+    assert pipeline_helper.file_hash(str(path)) == first
+    assert not reads
+    path.write_text('a,b\n1,30\n')
+    assert pipeline_helper.file_hash(str(path)) != first
+
+def test_discover_finds_only_estimate_scripts():
+    steps = pipeline_helper.discover()
+    assert steps
+    for name in steps:
+        assert name.split(os.sep)[0] not in pipeline_helper.EXCLUDED_DIRS
+        assert os.path.exists(os.path.join(pipeline_helper.ROOT, name[:-len('.py')] + '.ipynb')), name
@@ -14,10 +14,14 @@ get_ipython().magic(u'matplotlib inline')
 import sys
 sys.path.insert(0, '../../statistics_helper/')
 from CI_helper import *
+from random_helper import *
+from data_helper import *
+from results_helper import *
+from monte_carlo_helper import *
 pd.options.display.float_format = '{:,.0f}'.format
 
 # Load the data extracted from Brum et al.
-data = pd.read_excel('phage_size_data.xlsx',skiprows=1)
+data = read_excel('phage_size_data.xlsx',skiprows=1)
 data.head()
 
 
@@ -45,9 +49,6 @@ r = (data['95% diameter [nm]']-data['Median diameter [nm]']).mean()
 
 # In[4]:
 
-# Import uncertainties library to deal with the error propagation
-from uncertainties import ufloat
-
 ##############################
 # Define the model parameters#
 ##############################
@@ -56,19 +57,19 @@ from uncertainties import ufloat
 r_c = phage_rad
 
 # The thickness of the phage capsid [nm]
-h = ufloat(2.5,0.3*1.96)
+h = 2.5
 
 # The number of caron atoms in a single DNA base pair
-C_bp = ufloat(19.5,0.1*1.96)
+C_bp = 19.5
 
 # The fraction of the phage capsid filled with DNA
-fill = ufloat(0.53,0.04*1.96)
+fill = 0.53
 
 # The volume of a single base pair [nm^3]
-v_bp = ufloat(0.34*np.pi,0)
+v_bp = 0.34*np.pi
 
 # The number of carbon atoms per volume of proteins [# nm^-3]
-d_C = ufloat(31,1*1.96)
+d_C = 31
 
 #Avogadro's number [molecules per mol]
 Na = 6e23 
@@ -76,15 +77,21 @@ Na = 6e23
 # Molecular weight of carbon [g per mol]
 M_C = 12
 
-# Define the eqation for deriving the carbon content of a phage as a function of it's radius
-func = lambda x: ((4*np.pi*(x-h)**3*C_bp*fill)/(3*v_bp) + 4*np.pi*d_C*(3*x**2*h-3*h**2*x+h**3)/3)*M_C/Na
+# The parameters with uncertainties, and their uncertainties as reported in Jover et al. (v_bp has no uncertainty)
+params = {'h': h, 'C_bp': C_bp, 'fill': fill, 'd_C': d_C}
+param_std = {'h': 0.3*1.96, 'C_bp': 0.1*1.96, 'fill': 0.04*1.96, 'd_C': 1*1.96}
+
+# Define the eqation for deriving the carbon content of a phage as a function of it's radius. All the arguments can be
+# numpy arrays of samples, and the parameters default to our best estimates
+def phage_carbon(r_c, h=h, C_bp=C_bp, fill=fill, v_bp=v_bp, d_C=d_C):
+    return ((4*np.pi*(r_c-h)**3*C_bp*fill)/(3*v_bp) + 4*np.pi*d_C*(3*r_c**2*h-3*h**2*r_c+h**3)/3)*M_C/Na
 
 #C_head = (4*np.pi*(r_c-h)**3*C_bp*fill)/(3*v_bp) + 4*np.pi*d_C*(3*r_c**2*h-3*h**2*r_c+h**3)/3
 
 # Calculate our best estimate for the carbon content of a single phage
-best_estimate = func(r_c)
+best_estimate = phage_carbon(r_c)
 
-print(func(r_c)*1e31)
+print(best_estimate*1e31)
 print('Our best estimate for the carbon content of a single phage is ≈{:10.1e} g'.format(best_estimate))
 
 
@@ -110,16 +117,16 @@ rad_CI = np.max([intra_CI,inter_CI])
 # In[6]:
 
 # Sample 1000 from a log-normal distribution of radii
-rad_dist = np.random.lognormal(np.log(phage_rad),np.log(rad_CI)/1.96,1000)
+rad_dist = get_rng().lognormal(np.log(phage_rad),np.log(rad_CI)/1.96,1000)
 
 # Calculate the carbon content for each radius
-cc_dist = func(rad_dist)
+cc_dist = phage_carbon(rad_dist)
 
 # Calculate the upper and lower multiplicative ratios of the carbon content
-upper_CI = np.percentile([x.nominal_value for x in cc_dist],97.5)/best_estimate
-lower_CI = best_estimate/np.percentile([x.nominal_value for x in cc_dist],2.5)
+upper_CI = np.percentile(cc_dist,97.5)/best_estimate
+lower_CI = best_estimate/np.percentile(cc_dist,2.5)
 
-rad_cc_CI = np.mean([upper_CI,lower_CI]).nominal_value
+rad_cc_CI = np.mean([upper_CI,lower_CI])
 
 print('Our best estimate for the uncertainty of the carbon content of a single phage stemming from the uncertainty in our estimate for the radius of a single phage is ≈%.1f-fold' %rad_cc_CI)
 
@@ -128,7 +135,13 @@ print('Our best estimate for the uncertainty of the carbon content of a single p
 
 # In[7]:
 
-model_param_CI =  1+best_estimate.std_dev*1.96/best_estimate.nominal_value
+# Propagate the uncertainties of the parameters to first order, using the derivative of the model with respect to
+# each parameter (calculated by central differences)
+step = 1e-6
+partials = {name: (phage_carbon(r_c, **{name: value*(1+step)}) - phage_carbon(r_c, **{name: value*(1-step)}))/(2*step*value)
+            for name, value in params.items()}
+best_estimate_std = np.sqrt(np.sum([(partials[name]*param_std[name])**2 for name in params]))
+model_param_CI =  1+best_estimate_std*1.96/best_estimate
 print('The uncertainty associated with the parameters of the model is %.1f-fold' %model_param_CI)
 
 
@@ -139,22 +152,26 @@ print('The uncertainty associated with the parameters of the model is %.1f-fold'
 mul_CI = CI_prod_prop(np.array([rad_cc_CI,model_param_CI]))
 print('Our best projection for the uncertainty associated with the carbon content of a single phage is ≈%.1f-fold' %mul_CI)
 
+# As a check, sample the radius and the parameters of the model jointly, and calculate the carbon content for each sample
+joint_parameters = {'r_c': Parameter(r_c, rad_CI)}
+joint_parameters.update({name: Parameter(value, param_std[name]*1.96, 'normal') for name, value in params.items()})
+joint_dist = propagate(lambda p: phage_carbon(**p), joint_parameters, sample_size=1000000)
+joint_lower, joint_upper = joint_dist.percentile([2.5, 97.5])
+joint_CI = np.mean([joint_upper/best_estimate, best_estimate/joint_lower])
+print('Sampling the radius and the parameters of the model jointly, the uncertainty is ≈%.1f-fold' %joint_CI)
+
 
 # Our final parameters are:
 
 # In[9]:
 
-print('Our best estimate for the carbon content of a single phage: %.0e g' % best_estimate.nominal_value)
+print('Our best estimate for the carbon content of a single phage: %.0e g' % best_estimate)
 print('Uncertainty associated with the estiamte of the carbon content of a single phage: %.0f-fold' % mul_CI)
 
-old_results = pd.read_excel('../phage_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[1] = pd.Series({
+update_result('../phage_biomass_estimate.xlsx', 1, {
                 'Parameter': 'Carbon content of a single phage',
-                'Value': best_estimate.nominal_value,
+                'Value': best_estimate,
                 'Units': 'g C per individual',
                 'Uncertainty': mul_CI
                 })
 
-result.to_excel('../phage_biomass_estimate.xlsx',index=False)
-
@@ -12,10 +12,12 @@ import pandas as pd
 import sys
 sys.path.insert(0,'../statistics_helper/')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
 pd.options.display.float_format = '{:,.0e}'.format
 
 # Load estimates for the total number of phages and for the carbon cont
-estimate = pd.read_excel('phage_biomass_estimate.xlsx')
+estimate = load_results('phage_biomass_estimate.xlsx')
 estimate
 
 
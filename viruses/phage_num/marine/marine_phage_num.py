@@ -9,11 +9,17 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import sys
+sys.path.insert(0, '../../../statistics_helper')
+from depth_profile_helper import *
+from fit_helper import *
+from data_helper import *
+from results_helper import *
+from scenario_helper import *
 get_ipython().magic(u'matplotlib inline')
 from scipy.stats import  gmean
-from scipy.optimize import curve_fit
 pd.options.display.float_format = '{:,.1e}'.format
-data = pd.read_excel('marine_phage_data.xls')
+data = read_excel('marine_phage_data.xls')
 data.head()
 
 
@@ -22,18 +28,15 @@ data.head()
 # In[2]:
 
 # Bin data to 10 depth bins with equal data
-data['Depth_bin_equal'], bins = pd.qcut(data['DEPTH'], 10, retbins=True)
+bins = quantile_edges(data['DEPTH'], 10)
 
-# Group data by depth bins
-binned_data = data.groupby('Depth_bin_equal')
-
-# Calculate arithmetic and geometric means for each depth bin
-depth_bins_mean = binned_data['VIRUS'].aggregate(np.mean)
+# Calculate the arithmetic mean for each depth bin
+depth_bins_mean = bin_means(data['DEPTH'], data['VIRUS'], bins, include_lowest=True)
 
 def func(x,a,b):
     return a*x+b
 
-popt, pcov = curve_fit(func, np.log(bins[1:]), np.log(depth_bins_mean))
+popt = linear_fit(np.log(bins[1:]), np.log(depth_bins_mean))
 print(popt)
 # Plot mean virion concentrations 
 plt.loglog(depth_bins_mean,bins[1:],'.',label='Data')
@@ -49,7 +52,7 @@ plt.legend()
 # In[3]:
 
 # Ocean surface area in m^2
-ocean_surface_area = 3.6e14
+ocean_surface_area = get_constant('ocean_area')
 
 # m^3 in mL
 ml_m3_conv = 1e6
@@ -59,14 +62,10 @@ total_phage_mean = (depth_bins_mean*np.diff(bins)*ml_m3_conv*ocean_surface_area)
 
 print('Our best estimate for the total number of marine phages is %.0e' %total_phage_mean)
 
-old_results = pd.read_excel('../phage_num_estimate.xlsx')
-result = old_results.copy()
-result.loc[0] = pd.Series({
+update_result('../phage_num_estimate.xlsx', 0, {
                 'Parameter': 'Total number of marine phages',
                 'Value': total_phage_mean,
                 'Units': 'Number of individuals',
                 'Uncertainty': np.nan
                 })
 
-result.to_excel('../phage_num_estimate.xlsx',index=False)
-
@@ -14,9 +14,11 @@ get_ipython().magic(u'matplotlib inline')
 import sys
 sys.path.insert(0, '../../../statistics_helper')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
 
 # Load data extracted from Engelhardt et al.
-data = pd.read_excel('marine_deep_subsurface_phage_data.xlsx',skiprows=1)
+data = read_excel('marine_deep_subsurface_phage_data.xlsx',skiprows=1)
 
 # Plot the data
 plt.loglog(data['Cells concentration [cells cm^-3]'],data['Phage concentration [virions cm^-3]'],'.',label='Data')
@@ -41,18 +43,14 @@ print('Our best estimate for the ratio between the concentration of phage-like p
 
 # In[3]:
 
-prokaryote_estimate = pd.read_excel('../../../bacteria_archaea/marine_deep_subsurface/marine_deep_subsurface_prok_biomass_estimate.xlsx')
+prokaryote_estimate = load_results('../../../bacteria_archaea/marine_deep_subsurface/marine_deep_subsurface_prok_biomass_estimate.xlsx')
 best_estimate = prokaryote_estimate.loc[0]['Value']*geo_mean_ratio
 print('Our best estimate for the total number of phages in subseafloor sediments is ≈%.0e' %best_estimate)
 
-old_results = pd.read_excel('../phage_num_estimate.xlsx')
-result = old_results.copy()
-result.loc[1] = pd.Series({
+update_result('../phage_num_estimate.xlsx', 1, {
                 'Parameter': 'Total number of phages in the marine deep subsurface',
                 'Value': best_estimate,
                 'Units': 'Number of individuals',
                 'Uncertainty': np.nan
                 })
 
-result.to_excel('../phage_num_estimate.xlsx',index=False)
-
@@ -13,6 +13,9 @@ from scipy.stats import gmean
 import sys
 sys.path.insert(0, '../../../statistics_helper/')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
+from scenario_helper import *
 
 
 # Lower and upper bounds for the concentration of phages per gram
@@ -43,7 +46,7 @@ print('The upper bound of the number of phages per m^2 of soil is ≈%.1e phages
 best_phage_per_m2 = gmean([lower_phage_per_m2,upper_phage_per_m2])
 
 # The area of ice-free land surface in m^2
-area = 1.3e14
+area = get_constant('land_area')
 
 best_estimate = best_phage_per_m2*area
 
@@ -63,14 +66,10 @@ mul_CI = 10**1.5
 print('Our best estimate for the total number of phages in soils: %.0e Gt C' % best_estimate)
 print('Uncertainty associated with the estiamte of the total number of phages in soils: %.0f-fold' % mul_CI)
 
-old_results = pd.read_excel('../phage_num_estimate.xlsx')
-result = old_results.copy()
-result.loc[3] = pd.Series({
+update_result('../phage_num_estimate.xlsx', 3, {
                 'Parameter': 'Total number of phages in soils',
                 'Value': best_estimate,
                 'Units': 'Number of individuals',
                 'Uncertainty': mul_CI
                 })
 
-result.to_excel('../phage_num_estimate.xlsx',index=False)
-
@@ -44,9 +44,12 @@ import numpy as np
 import sys
 sys.path.insert(0, '../../../statistics_helper/')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
+from scenario_helper import *
 
 from scipy.stats import gmean
-pan_data = pd.read_excel('terrestrial_deep_subsurface_phage_num_data.xlsx','Pan',skiprows=1)
+pan_data = read_excel('terrestrial_deep_subsurface_phage_num_data.xlsx','Pan',skiprows=1)
 pan_ratio = gmean(pan_data['Virus-to-cell ratio (VCR)'])
 print('Our estimate for the ratio between the concentration of phage-like particles and prokaryotes based on Pan et al. is ≈%.0f.' % pan_ratio)
 
@@ -57,7 +60,7 @@ print('Our estimate for the ratio between the concentration of phage-like partic
 
 # In[5]:
 
-roundnew_data = pd.read_excel('terrestrial_deep_subsurface_phage_num_data.xlsx','Roundnew',skiprows=1)
+roundnew_data = read_excel('terrestrial_deep_subsurface_phage_num_data.xlsx','Roundnew',skiprows=1)
 roundnew_ratio = gmean(roundnew_data['Virus:Bacteria ratio'])
 print('Our estimate for the ratio between the concentration of phage-like particles and prokaryotes based on Roundnew et al. is ≈%.0f.' % roundnew_ratio)
 
@@ -77,7 +80,7 @@ print('Our estimate for the ratio between the concentration of phage-like partic
 
 # Load data on the concentrations of prokaryotes in each depth bin from our analysis of the biomass
 # of terrestrial deep subsurface prokaryotes
-prok_concentration = pd.read_excel('terrestrial_deep_subsurface_prok_num.xlsx','Cell concentration')
+prok_concentration = read_excel('terrestrial_deep_subsurface_prok_num.xlsx','Cell concentration')
 prok_concentration = prok_concentration.reset_index().set_index('Depth bin [m]')
 prok_concentration
 
@@ -88,7 +91,7 @@ prok_concentration
 
 # Load data on the total volume of groundwater in each depth bin from our analysis of the biomass
 # of terrestrial deep subsurface prokaryotes
-water_vol = pd.read_excel('terrestrial_deep_subsurface_prok_num.xlsx','Water volume')
+water_vol = read_excel('terrestrial_deep_subsurface_prok_num.xlsx','Water volume')
 water_vol = water_vol.reset_index().set_index('Depth bin [m]')
 water_vol
 
@@ -125,7 +128,7 @@ print('Our best estimate for the total number of prokaryotes in groundwater for
 
 # Define the scaling factor from number of cells in groundwater to cells relevant for calculating the total
 # Number of phages
-scaling_factor = gmean([1,100,1000])
+scaling_factor = get_constant('groundwater_scaling_factor')
 
 
 # Estimate the total number of phages based on the naive ratio of 10:1
@@ -269,14 +272,10 @@ print('Our best projection for the uncertainty associated with the total number
 print('Our best estimate for the total number of phages in the terrestrial deep subsurface: %.0e' % best_estimate)
 print('Uncertainty associated with the estiamte of the total number of phages in the terrestrial deep subsurface: %.0f-fold' % mul_CI)
 
-old_results = pd.read_excel('../phage_num_estimate.xlsx')
-result = old_results.copy()
-result.loc[2] = pd.Series({
+update_result('../phage_num_estimate.xlsx', 2, {
                 'Parameter': 'Total number of phages in the terrestrial deep subsurface',
                 'Value': best_estimate,
                 'Units': 'Number of individuals',
                 'Uncertainty': mul_CI
                 })
 
-result.to_excel('../phage_num_estimate.xlsx',index=False)
-
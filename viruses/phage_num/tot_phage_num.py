@@ -12,9 +12,11 @@ import sys
 import sys
 sys.path.insert(0, '../../statistics_helper/')
 from CI_helper import *
+from data_helper import *
+from results_helper import *
 
 pd.options.display.float_format = '{:,.1e}'.format
-estimate = pd.read_excel('phage_num_estimate.xlsx')
+estimate = load_results('phage_num_estimate.xlsx')
 estimate
 
 
@@ -54,14 +56,10 @@ print('Our best projection for the uncertainty associated with our estimate of t
 print('Our best estimate for the total number of phages : %.0e' % best_estimate)
 print('Uncertainty associated with the estiamte of the total number of phages: %.0f-fold' % mul_CI)
 
-old_results = pd.read_excel('../phage_biomass_estimate.xlsx')
-result = old_results.copy()
-result.loc[0] = pd.Series({
+update_result('../phage_biomass_estimate.xlsx', 0, {
                 'Parameter': 'Total number of phages',
                 'Value': best_estimate,
                 'Units': 'Number of individuals',
                 'Uncertainty': mul_CI
                 })
 
-result.to_excel('../phage_biomass_estimate.xlsx',index=False)
-